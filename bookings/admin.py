@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Booking, BookingAttachment
+from .models import Booking, BookingAttachment, BookingReminder
 
 
 @admin.register(Booking)
@@ -19,3 +19,10 @@ class BookingAttachmentAdmin(admin.ModelAdmin):
     list_display = ('booking', 'uploaded_by', 'description', 'created_at')
     list_filter = ('created_at',)
     search_fields = ('booking__service_title', 'uploaded_by__email', 'description')
+
+
+@admin.register(BookingReminder)
+class BookingReminderAdmin(admin.ModelAdmin):
+    list_display = ('booking', 'channel', 'status', 'attempts', 'claimed_at', 'sent_at')
+    list_filter = ('channel', 'status')
+    search_fields = ('booking__service_title',)
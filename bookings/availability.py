@@ -0,0 +1,282 @@
+"""
+Free slot availability
+
+A provider's open slots are their weekly ProviderAvailability template
+minus their non-cancelled bookings. Every day is handled as a sorted list
+of disjoint (start, end) intervals in minutes since midnight: the day's
+template windows are merged, the day's bookings are merged, and the busy
+intervals are subtracted from the free ones in a single sweep. Slots of
+the requested duration are then cut from what is left on a fixed grid.
+
+Whatever the date range or number of providers, the engine runs two
+queries (the templates and the bookings of the range, the latter on the
+(provider, booking_date) index), so a month for one provider is a few
+milliseconds of work.
+
+Double bookings are prevented by the bookings_no_overlap exclusion
+constraint on Booking.time_range. has_conflict is the same check as a
+cheap query on the constraint's GiST index, so a taken slot can be refused
+with the nearest open alternatives before anything is written.
+
+Service rules apply per provider:
+    duration: Slot length in minutes (Service.duration_minutes)
+    lead_hours: No slot starts sooner than this (Service.min_booking_hours)
+    max_per_day: Days with this many bookings are full
+        (Service.max_bookings_per_day). Not every booking is linked
+        to a service, so every booking of the provider counts.
+"""
+import datetime
+from django.db.backends.postgresql.psycopg_any import DateTimeTZRange
+from django.db.models import Max, Min
+from django.utils import timezone
+from providers.models import ProviderAvailability
+from .models import RELEASED_STATUSES, Booking
+
+SLOT_STEP_MINUTES = 30
+DEFAULT_DURATION_MINUTES = 60
+MAX_RANGE_DAYS = 62
+MAX_CATEGORY_PROVIDERS = 50
+ALTERNATIVES = 5
+ALTERNATIVE_DAYS = 3  # Days searched on either side of a taken slot
+
+
+def to_minutes(value):
+    """Minutes since midnight of a time"""
+    return value.hour * 60 + value.minute
+
+
+def to_time(minutes):
+    """Time of a number of minutes since midnight"""
+    return datetime.time(minutes // 60, minutes % 60)
+
+
+def merge_intervals(intervals):
+    """Sort intervals and merge the ones that overlap or touch"""
+    merged = []
+    for start, end in sorted(intervals):
+        if end <= start:
+            continue
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def subtract_intervals(free, busy):
+    """
+    Remove busy intervals from free ones
+
+    Both lists must be sorted and disjoint (see merge_intervals), and so
+    is the result.
+    """
+    result = []
+    index = 0
+    for start, end in free:
+        while index < len(busy) and busy[index][1] <= start:
+            index += 1
+        cursor = start
+        position = index
+        while position < len(busy) and busy[position][0] < end:
+            if busy[position][0] > cursor:
+                result.append((cursor, busy[position][0]))
+            cursor = max(cursor, busy[position][1])
+            position += 1
+        if cursor < end:
+            result.append((cursor, end))
+    return result
+
+
+def cut_slots(intervals, duration, earliest=0, step=SLOT_STEP_MINUTES):
+    """
+    Cut slots of a duration out of free intervals
+
+    Slots start on multiples of the step, no earlier than `earliest`.
+
+    Yields:
+        tuple: (start, end) in minutes since midnight
+    """
+    for start, end in intervals:
+        start = max(start, earliest)
+        start += -start % step
+        while start + duration <= end:
+            yield start, start + duration
+            start += step
+
+
+def get_default_rules(duration=None):
+    """Rules for slots that are not for a particular service"""
+    return {'duration': duration or DEFAULT_DURATION_MINUTES, 'lead_hours': 0, 'max_per_day': None}
+
+
+def get_service_rules(service, duration=None):
+    """Rules for the slots of a service; an explicit duration wins over the service's"""
+    return {
+        'duration': duration or service.duration_minutes or DEFAULT_DURATION_MINUTES,
+        'lead_hours': service.min_booking_hours,
+        'max_per_day': service.max_bookings_per_day,
+    }
+
+
+def get_category_rules(services, duration=None, limit=MAX_CATEGORY_PROVIDERS):
+    """
+    Rules for the best rated providers with active services in a category
+
+    A slot is open when any of a provider's services could be booked in
+    it, so each provider gets the most permissive rules of their services.
+    One grouped query.
+
+    Args:
+        services: Service queryset of the category
+
+    Returns:
+        dict: Provider ID to rules, best rated provider first
+    """
+    rows = (
+        services.filter(status='active', provider__status='approved', provider__is_available=True)
+        .order_by()
+        .values('provider_id')
+        .annotate(
+            duration=Min('duration_minutes'),
+            lead_hours=Min('min_booking_hours'),
+            max_per_day=Max('max_bookings_per_day'),
+        )
+        .order_by('-provider__average_rating', 'provider_id')[:limit]
+    )
+    return {
+        row['provider_id']: {
+            'duration': duration or row['duration'] or DEFAULT_DURATION_MINUTES,
+            'lead_hours': row['lead_hours'],
+            'max_per_day': row['max_per_day'],
+        }
+        for row in rows
+    }
+
+
+def load_templates(provider_ids):
+    """
+    Load the weekly availability of providers
+
+    Returns:
+        dict: (provider ID, weekday) to merged intervals
+    """
+    windows = {}
+    rows = ProviderAvailability.objects.filter(
+        provider_id__in=provider_ids,
+        is_available=True
+    ).values_list('provider_id', 'day_of_week', 'start_time', 'end_time')
+    for provider_id, day_of_week, start_time, end_time in rows:
+        windows.setdefault((provider_id, day_of_week), []).append((to_minutes(start_time), to_minutes(end_time)))
+    return {key: merge_intervals(intervals) for key, intervals in windows.items()}
+
+
+def load_bookings(provider_ids, start_date, end_date):
+    """
+    Load the busy intervals of providers between two dates (inclusive)
+
+    Returns:
+        dict: (provider ID, date) to booked intervals, in no particular order
+    """
+    busy = {}
+    rows = (
+        Booking.objects.filter(
+            provider_id__in=provider_ids,
+            booking_date__gte=start_date,
+            booking_date__lte=end_date
+        )
+        .exclude(status__in=RELEASED_STATUSES)
+        .order_by()
+        .values_list('provider_id', 'booking_date', 'start_time', 'end_time')
+    )
+    for provider_id, booking_date, start_time, end_time in rows:
+        busy.setdefault((provider_id, booking_date), []).append((to_minutes(start_time), to_minutes(end_time)))
+    return busy
+
+
+def get_open_slots(rules, start_date, end_date, now=None):
+    """
+    Find the open slots of providers between two dates (inclusive)
+
+    Args:
+        rules: Provider ID to rules (see get_service_rules)
+        now: Reference time for the lead time, defaults to the current time
+
+    Returns:
+        dict: Provider ID to a list of (date, start time, end time)
+    """
+    provider_ids = list(rules)
+    templates = load_templates(provider_ids)
+    busy = load_bookings(provider_ids, start_date, end_date)
+    now = timezone.localtime(now or timezone.now()).replace(tzinfo=None)
+
+    days = [start_date + datetime.timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+    slots = {}
+    for provider_id, provider_rules in rules.items():
+        cutoff = now + datetime.timedelta(hours=provider_rules['lead_hours'])
+        provider_slots = slots[provider_id] = []
+        for day in days:
+            if day < cutoff.date():
+                continue
+            free = templates.get((provider_id, day.weekday()))
+            if not free:
+                continue
+            booked = busy.get((provider_id, day), [])
+            if provider_rules['max_per_day'] and len(booked) >= provider_rules['max_per_day']:
+                continue
+
+            earliest = 0
+            if day == cutoff.date():
+                # Rounded up, so a slot never starts inside the lead time
+                earliest = cutoff.hour * 60 + cutoff.minute + bool(cutoff.second or cutoff.microsecond)
+            free = subtract_intervals(free, merge_intervals(booked))
+            provider_slots.extend(
+                (day, to_time(start), to_time(end))
+                for start, end in cut_slots(free, provider_rules['duration'], earliest)
+            )
+    return slots
+
+
+def get_time_range(day, start_time, end_time):
+    """The Booking.time_range of a date and times"""
+    return DateTimeTZRange(
+        datetime.datetime.combine(day, start_time, tzinfo=datetime.timezone.utc),
+        datetime.datetime.combine(day, end_time, tzinfo=datetime.timezone.utc),
+        '[)'
+    )
+
+
+def has_conflict(provider_id, day, start_time, end_time):
+    """Check whether a provider has an active booking overlapping a time"""
+    return (
+        Booking.objects.filter(provider_id=provider_id, time_range__overlap=get_time_range(day, start_time, end_time))
+        .exclude(status__in=RELEASED_STATUSES)
+        .exists()
+    )
+
+
+def find_alternatives(provider_id, day, start_time, end_time, limit=ALTERNATIVES, days=ALTERNATIVE_DAYS):
+    """
+    Find the open slots of the same length closest to a requested time
+
+    Returns:
+        list: (date, start time, end time), closest first
+    """
+    requested = datetime.datetime.combine(day, start_time)
+    duration = (datetime.datetime.combine(day, end_time) - requested).seconds // 60
+    start_date = max(day - datetime.timedelta(days=days), timezone.localdate())
+    end_date = day + datetime.timedelta(days=days)
+    if end_date < start_date:
+        return []
+
+    slots = get_open_slots({provider_id: get_default_rules(duration)}, start_date, end_date)[provider_id]
+    slots.sort(key=lambda slot: abs(datetime.datetime.combine(slot[0], slot[1]) - requested))
+    return slots[:limit]
+
+
+def serialize_slots(slots):
+    """Slots as JSON-ready dicts"""
+    return [
+        {'date': day.isoformat(), 'start_time': start_time.isoformat(), 'end_time': end_time.isoformat()}
+        for day, start_time, end_time in slots
+    ]
@@ -0,0 +1,217 @@
+"""
+iCalendar feed of a user's bookings
+
+Calendar apps subscribe to a per-user feed URL holding a signed token (see
+get_feed_token), since they cannot send the API's bearer tokens. The token
+carries the user's BookingCalendarFeed key, so rotating the key revokes
+every URL handed out before. The feed
+has every booking of the user as a customer or provider from
+FEED_PAST_DAYS ago onwards, one VEVENT per booking, cancelled ones
+included as STATUS:CANCELLED so they disappear from calendars that
+already have them.
+
+Calendar apps poll feeds every few minutes, so a poll costs the key lookup
+(which also finds the user's provider profile) and one aggregate query when
+nothing changed. The aggregate reads the user's bookings from the
+(customer, booking_date) and (provider, booking_date) indexes and covers
+the latest Booking.updated_at, the number of bookings and the names the
+events show. The ETag is derived from it and a matching If-None-Match gets
+a 304. Last-Modified is sent for information only, as a
+deleted booking or one leaving the feed's window does not move it, so
+If-Modified-Since alone never gets a 304. Otherwise the
+events are streamed from a server-side cursor as they are rendered, so
+a long history is never held in memory.
+"""
+import datetime
+import hashlib
+from django.core import signing
+from django.contrib.postgres.aggregates import StringAgg
+from django.db.models import CharField, Count, Max, Q, Value
+from django.db.models.functions import Concat
+from django.utils import timezone
+from .models import Booking, BookingCalendarFeed, generate_feed_key
+
+FEED_SALT = 'bookings.calendar'
+FEED_PAST_DAYS = 90
+FEED_CHUNK_SIZE = 500
+PRODUCT_ID = '-//ServiceHub//Bookings//EN'
+UID_DOMAIN = 'servicehub'
+MAX_LINE_OCTETS = 75
+EVENT_STATUSES = {
+    'pending': 'TENTATIVE',
+    'confirmed': 'CONFIRMED',
+    'in_progress': 'CONFIRMED',
+    'completed': 'CONFIRMED',
+    'cancelled': 'CANCELLED',
+    'refunded': 'CANCELLED',
+}
+FEED_FIELDS = (
+    'id', 'customer_id', 'service_title', 'service_description', 'booking_date', 'start_time', 'end_time',
+    'service_address', 'city', 'postal_code', 'status', 'updated_at', 'provider__business_name',
+    'customer__first_name', 'customer__last_name', 'customer__phone',
+)
+
+
+def get_feed_token(user, rotate=False):
+    """Get the signed token of a user's feed URL, with a new key if rotate is set"""
+    feed, created = BookingCalendarFeed.objects.get_or_create(user=user)
+    if rotate and not created:
+        feed.key = generate_feed_key()
+        feed.save(update_fields=['key', 'rotated_at'])
+    return signing.Signer(salt=FEED_SALT).sign(f'{user.pk}:{feed.key}')
+
+
+def get_feed_owner(token):
+    """
+    Get who a feed token belongs to
+
+    Returns:
+        tuple: (user ID, provider ID or None), or None if the token is
+            invalid or its key was rotated
+    """
+    try:
+        user_id, key = signing.Signer(salt=FEED_SALT).unsign(token).split(':')
+        user_id = int(user_id)
+    except (signing.BadSignature, ValueError):
+        return None
+    feed = BookingCalendarFeed.objects.filter(user_id=user_id, key=key).values_list(
+        'user__provider_profile__id', flat=True
+    )
+    for provider_id in feed:
+        return user_id, provider_id
+    return None
+
+
+def get_feed_queryset(user_id, provider_id=None, today=None):
+    """Bookings in a user's feed, as a customer or provider"""
+    start = (today or timezone.localdate()) - datetime.timedelta(days=FEED_PAST_DAYS)
+    # Both sides of the OR are on the bookings table, so each uses its index
+    owner = Q(customer_id=user_id)
+    if provider_id is not None:
+        owner |= Q(provider_id=provider_id)
+    return Booking.objects.filter(owner, booking_date__gte=start).order_by()
+
+
+def get_feed_version(queryset):
+    """
+    Get what identifies a feed's content, in one aggregate query
+
+    The count catches deleted bookings, which leave the latest update as is,
+    and the names catch renamed providers and customers, which leave the
+    bookings as they are.
+
+    Returns:
+        tuple: (latest updated_at or None, number of bookings, names)
+    """
+    names = Concat(
+        'provider__business_name', Value('\t'), 'customer__first_name', Value('\t'),
+        'customer__last_name', Value('\t'), 'customer__phone', output_field=CharField()
+    )
+    row = queryset.aggregate(
+        latest=Max('updated_at'),
+        count=Count('id'),
+        names=StringAgg(names, delimiter='\n', distinct=True, ordering=names)
+    )
+    return row['latest'], row['count'], row['names'] or ''
+
+
+def get_feed_etag(user_id, today, latest, count, names):
+    """Build the ETag of a feed version; the day is included as old bookings drop out daily"""
+    source = repr((user_id, today.isoformat(), latest.isoformat() if latest else None, count, names))
+    return f'"{hashlib.md5(source.encode()).hexdigest()}"'
+
+
+def escape_text(value):
+    """Escape a TEXT property value (RFC 5545 3.3.11)"""
+    return (
+        value.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n').replace('\r', '\\n')
+    )
+
+
+def fold_line(line):
+    """Fold a content line into lines of at most 75 octets, ending with CRLF (RFC 5545 3.1)"""
+    encoded = line.encode()
+    if len(encoded) <= MAX_LINE_OCTETS:
+        return line + '\r\n'
+
+    parts = []
+    start = 0
+    limit = MAX_LINE_OCTETS
+    while start < len(encoded):
+        end = min(start + limit, len(encoded))
+        # Never split a multi-byte character
+        while end < len(encoded) and (encoded[end] & 0xC0) == 0x80:
+            end -= 1
+        parts.append(encoded[start:end].decode())
+        start = end
+        limit = MAX_LINE_OCTETS - 1  # Continuation lines start with a space
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def format_datetime(value):
+    """Format an aware datetime in UTC"""
+    return value.astimezone(datetime.timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def format_booking_time(day, time):
+    """Format a booking's date and time, which are in UTC like Booking.time_range"""
+    return format_datetime(datetime.datetime.combine(day, time, tzinfo=datetime.timezone.utc))
+
+
+def render_event(row, user_id, stamp):
+    """Render a booking row (FEED_FIELDS) as a VEVENT"""
+    booking = dict(zip(FEED_FIELDS, row))
+    if booking['customer_id'] == user_id:
+        other = booking['provider__business_name']
+    else:
+        other = (
+            f"{booking['customer__first_name']} {booking['customer__last_name']}".strip()
+            or booking['customer__phone']
+        )
+    location = ', '.join(
+        part for part in (booking['service_address'], booking['city'], booking['postal_code']) if part
+    )
+    lines = [
+        'BEGIN:VEVENT',
+        f"UID:booking-{booking['id']}@{UID_DOMAIN}",
+        f'DTSTAMP:{stamp}',
+        f"LAST-MODIFIED:{format_datetime(booking['updated_at'])}",
+        f"DTSTART:{format_booking_time(booking['booking_date'], booking['start_time'])}",
+        f"DTEND:{format_booking_time(booking['booking_date'], booking['end_time'])}",
+        f"SUMMARY:{escape_text(booking['service_title'] + ' - ' + other)}",
+        f'LOCATION:{escape_text(location)}',
+        f"DESCRIPTION:{escape_text(booking['service_description'])}",
+        f"STATUS:{EVENT_STATUSES.get(booking['status'], 'CONFIRMED')}",
+        'END:VEVENT',
+    ]
+    return ''.join(fold_line(line) for line in lines)
+
+
+def iter_feed(queryset, user_id, chunk_size=FEED_CHUNK_SIZE):
+    """
+    Render a feed's calendar in pieces
+
+    The bookings are read from a server-side cursor chunk_size rows at a
+    time, and each chunk's events are sent as one piece.
+
+    Yields:
+        str: The calendar header, the VEVENTs of each chunk, then the footer
+    """
+    stamp = format_datetime(timezone.now())
+    yield ''.join(fold_line(line) for line in (
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:{PRODUCT_ID}',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        'X-WR-CALNAME:ServiceHub bookings',
+    ))
+    rows = queryset.order_by('booking_date', 'start_time', 'id').values_list(*FEED_FIELDS)
+    events = []
+    for row in rows.iterator(chunk_size=chunk_size):
+        events.append(render_event(row, user_id, stamp))
+        if len(events) >= chunk_size:
+            yield ''.join(events)
+            events = []
+    yield ''.join(events) + fold_line('END:VCALENDAR')
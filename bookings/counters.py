@@ -0,0 +1,228 @@
+"""
+Write-coalesced booking counters
+
+Provider.total_bookings, Provider.completed_bookings (with
+last_completed_at) and Service.bookings_count are not written by the
+booking endpoints. Creating or completing a booking inserts a
+BookingCounterDelta row in the booking's own transaction instead, so the
+hot path never locks or rewrites the provider row and a delta exists if
+and only if its booking change was committed. Unlike service views (see
+services.view_counter), booking counts must be exact, which is why the
+deltas live in the database rather than the cache.
+
+A periodic task takes the pending deltas (DELETE ... RETURNING, skipping
+rows another flush holds), sums them per provider and service and applies
+them with one F() UPDATE per distinct increment. The providers' ranking
+scores are then recomputed from the new counts and their profile documents
+rebuilt.
+
+reconcile_booking_counters recomputes drifted counters from the Booking
+rows while holding the delta table, e.g. for counters predating this.
+"""
+from collections import defaultdict
+from django.db import connection, transaction
+from django.db.models import Count, F, IntegerField, Max, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from providers.documents import schedule_rebuild
+from providers.models import Provider
+from providers.scoring import SCORE_INPUTS, compute_score
+from services.models import Service
+from services.rankings import mark_rankings_stale
+from utils.cache import invalidate_tags
+from .models import Booking, BookingCounterDelta
+
+FLUSH_BATCH_SIZE = 10_000
+
+
+def record_booking_created(booking):
+    """Count a new booking for its provider and service"""
+    BookingCounterDelta.objects.create(provider_id=booking.provider_id, service_id=booking.service_id, booked=1)
+
+
+def record_booking_completed(booking):
+    """Count a completed booking for its provider"""
+    BookingCounterDelta.objects.create(
+        provider_id=booking.provider_id,
+        completed=1,
+        completed_at=booking.completed_at
+    )
+
+
+def take_deltas(batch_size=FLUSH_BATCH_SIZE):
+    """
+    Remove up to a batch of pending deltas, summed per provider and service
+
+    Must run in a transaction, so the deltas come back if applying them fails.
+
+    Returns:
+        list: (provider ID, service ID, booked, completed, last completed at)
+    """
+    table = BookingCounterDelta._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(f'''
+            WITH taken AS (
+                DELETE FROM {table} WHERE id IN (
+                    SELECT id FROM {table} ORDER BY id LIMIT %s FOR UPDATE SKIP LOCKED
+                )
+                RETURNING provider_id, service_id, booked, completed, completed_at
+            )
+            SELECT provider_id, service_id, SUM(booked), SUM(completed), MAX(completed_at)
+            FROM taken GROUP BY provider_id, service_id
+        ''', [batch_size])
+        return cursor.fetchall()
+
+
+def apply_deltas(rows):
+    """
+    Apply summed deltas to the provider and service counters
+
+    Returns:
+        set: IDs of the providers that changed
+    """
+    providers = defaultdict(lambda: [0, 0, None])
+    services = defaultdict(int)
+    for provider_id, service_id, booked, completed, completed_at in rows:
+        totals = providers[provider_id]
+        totals[0] += booked
+        totals[1] += completed
+        if completed_at is not None and (totals[2] is None or completed_at > totals[2]):
+            totals[2] = completed_at
+        if service_id is not None and booked:
+            services[service_id] += booked
+
+    # Group by increment so each distinct change is one UPDATE
+    providers_by_delta = defaultdict(list)
+    for provider_id, (booked, completed, _) in providers.items():
+        if booked or completed:
+            providers_by_delta[(booked, completed)].append(provider_id)
+    for (booked, completed), ids in providers_by_delta.items():
+        Provider.objects.filter(pk__in=ids).update(
+            total_bookings=F('total_bookings') + booked,
+            completed_bookings=F('completed_bookings') + completed
+        )
+
+    services_by_delta = defaultdict(list)
+    for service_id, booked in services.items():
+        services_by_delta[booked].append(service_id)
+    for booked, ids in services_by_delta.items():
+        Service.objects.filter(pk__in=ids).update(bookings_count=F('bookings_count') + booked)
+
+    # The UPDATEs hold the provider rows, so the recency and score are computed from final counts
+    changed = list(Provider.objects.filter(pk__in=providers).only('ranking_score', *SCORE_INPUTS))
+    for provider in changed:
+        completed_at = providers[provider.pk][2]
+        if completed_at is not None and (provider.last_completed_at is None or completed_at > provider.last_completed_at):
+            provider.last_completed_at = completed_at
+    update_scores(changed)
+    return set(providers)
+
+
+def update_scores(providers):
+    """Recompute and store the ranking scores of loaded providers"""
+    for provider in providers:
+        provider.ranking_score = compute_score(provider)
+    Provider.objects.bulk_update(providers, ['last_completed_at', 'ranking_score'])
+
+
+def after_counters_changed(provider_ids):
+    """Refresh everything derived from the counters of providers"""
+    if not provider_ids:
+        return
+
+    invalidate_tags('providers')
+    schedule_rebuild(*provider_ids)
+    mark_rankings_stale()
+
+
+def flush_counters(batch_size=FLUSH_BATCH_SIZE):
+    """
+    Apply every pending counter delta
+
+    Returns:
+        int: Number of providers whose counters changed
+    """
+    changed = set()
+    while True:
+        with transaction.atomic():
+            rows = take_deltas(batch_size)
+            if not rows:
+                break
+            provider_ids = apply_deltas(rows)
+            after_counters_changed(provider_ids)
+        changed |= provider_ids
+    return len(changed)
+
+
+def get_expected_counters():
+    """Counter values recomputed from Booking rows, as provider and service annotations"""
+    bookings = Booking.objects.filter(provider=OuterRef('pk')).order_by().values('provider')
+    completed = bookings.filter(status='completed')
+    service_bookings = Booking.objects.filter(service=OuterRef('pk')).order_by().values('service')
+
+    def count(queryset):
+        return Coalesce(
+            Subquery(queryset.annotate(count=Count('id')).values('count')),
+            Value(0),
+            output_field=IntegerField()
+        )
+
+    provider_counters = {
+        'total_bookings': count(bookings),
+        'completed_bookings': count(completed),
+        'last_completed_at': Subquery(completed.annotate(last=Max('completed_at')).values('last')),
+    }
+    service_counters = {'bookings_count': count(service_bookings)}
+    return provider_counters, service_counters
+
+
+def get_drift():
+    """
+    Get the providers and services whose counters differ from their bookings
+
+    Returns:
+        tuple: (provider queryset, service queryset), annotated with the
+            expected values as expected_<counter>
+    """
+    provider_counters, service_counters = get_expected_counters()
+    providers = Provider.objects.annotate(
+        **{f'expected_{name}': expression for name, expression in provider_counters.items()}
+    ).filter(
+        ~Q(total_bookings=F('expected_total_bookings'))
+        | ~Q(completed_bookings=F('expected_completed_bookings'))
+        | Q(last_completed_at__isnull=True, expected_last_completed_at__isnull=False)
+        | Q(last_completed_at__isnull=False, expected_last_completed_at__isnull=True)
+        | Q(last_completed_at__lt=F('expected_last_completed_at'))
+        | Q(last_completed_at__gt=F('expected_last_completed_at'))
+    )
+    services = Service.objects.annotate(
+        **{f'expected_{name}': expression for name, expression in service_counters.items()}
+    ).filter(~Q(bookings_count=F('expected_bookings_count')))
+    return providers, services
+
+
+def reconcile_counters():
+    """
+    Recompute the drifted counters from the Booking rows
+
+    The delta table is locked meanwhile, so bookings committed before the
+    lock are in the recomputed counts (and their pending deltas are applied
+    first) while later ones leave deltas for the next flush.
+
+    Returns:
+        tuple: Number of providers and services corrected
+    """
+    provider_counters, service_counters = get_expected_counters()
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(f'LOCK TABLE {BookingCounterDelta._meta.db_table} IN EXCLUSIVE MODE')
+        while rows := take_deltas():
+            after_counters_changed(apply_deltas(rows))
+
+        providers, services = get_drift()
+        provider_ids = list(providers.values_list('pk', flat=True))
+        service_ids = list(services.values_list('pk', flat=True))
+        Provider.objects.filter(pk__in=provider_ids).update(**provider_counters)
+        Service.objects.filter(pk__in=service_ids).update(**service_counters)
+        update_scores(list(Provider.objects.filter(pk__in=provider_ids).only('ranking_score', *SCORE_INPUTS)))
+        after_counters_changed(provider_ids)
+    return len(provider_ids), len(service_ids)
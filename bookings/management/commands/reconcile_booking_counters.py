@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from bookings.counters import flush_counters, get_drift, reconcile_counters
+
+
+class Command(BaseCommand):
+    help = 'Recompute provider and service booking counters from the bookings'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Only report counters that differ from the bookings'
+        )
+
+    def handle(self, *args, **options):
+        if options['verify']:
+            flush_counters()
+            providers, services = get_drift()
+            count = 0
+            for provider in providers.only('id', 'business_name', 'total_bookings', 'completed_bookings'):
+                count += 1
+                self.stdout.write(
+                    f'  Provider #{provider.id} "{provider.business_name}": '
+                    f'stored {provider.total_bookings} bookings ({provider.completed_bookings} completed), '
+                    f'expected {provider.expected_total_bookings} ({provider.expected_completed_bookings} completed)'
+                )
+            for service in services.only('id', 'title', 'bookings_count'):
+                count += 1
+                self.stdout.write(
+                    f'  Service #{service.id} "{service.title}": '
+                    f'stored {service.bookings_count} bookings, expected {service.expected_bookings_count}'
+                )
+
+            if count:
+                self.stdout.write(self.style.WARNING(f'{count} counters are out of date'))
+            else:
+                self.stdout.write(self.style.SUCCESS('✓ All booking counters are up to date'))
+            return
+
+        providers, services = reconcile_counters()
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Reconciled counters of {providers} providers and {services} services'
+        ))
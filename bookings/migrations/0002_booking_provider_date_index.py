@@ -0,0 +1,20 @@
+# Generated by Django 5.0.1 on 2026-10-17 04:07
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0001_initial'),
+        ('providers', '0004_provider_trigram_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['provider', 'booking_date'], name='bookings_provider_date_idx'),
+        ),
+    ]
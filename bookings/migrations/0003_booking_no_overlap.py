@@ -0,0 +1,30 @@
+# Generated by Django 5.0.1 on 2026-10-17 04:08
+
+import django.contrib.postgres.constraints
+from django.contrib.postgres.operations import BtreeGistExtension
+import django.contrib.postgres.fields.ranges
+import django.db.models.expressions
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0002_booking_provider_date_index'),
+        ('providers', '0004_provider_trigram_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        BtreeGistExtension(),
+        migrations.AddField(
+            model_name='booking',
+            name='time_range',
+            field=models.GeneratedField(db_persist=True, expression=models.Func(models.Func(models.ExpressionWrapper(django.db.models.expressions.CombinedExpression(models.F('booking_date'), '+', models.F('start_time')), output_field=models.DateTimeField()), output_field=models.DateTimeField(), template="(%(expressions)s) AT TIME ZONE 'UTC'"), models.Func(models.ExpressionWrapper(django.db.models.expressions.CombinedExpression(models.F('booking_date'), '+', models.F('end_time')), output_field=models.DateTimeField()), output_field=models.DateTimeField(), template="(%(expressions)s) AT TIME ZONE 'UTC'"), models.Value('[)'), function='TSTZRANGE', output_field=django.contrib.postgres.fields.ranges.DateTimeRangeField()), output_field=django.contrib.postgres.fields.ranges.DateTimeRangeField()),
+        ),
+        migrations.AddConstraint(
+            model_name='booking',
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(condition=models.Q(('status__in', ('cancelled', 'refunded')), _negated=True), expressions=[('provider', '='), ('time_range', '&&')], name='bookings_no_overlap'),
+        ),
+    ]
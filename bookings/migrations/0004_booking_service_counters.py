@@ -0,0 +1,35 @@
+# Generated by Django 5.0.1 on 2026-10-17 04:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0003_booking_no_overlap'),
+        ('providers', '0006_provider_ranking_score'),
+        ('services', '0007_category_price_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='service',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='bookings', to='services.service'),
+        ),
+        migrations.CreateModel(
+            name='BookingCounterDelta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('booked', models.SmallIntegerField(default=0)),
+                ('completed', models.SmallIntegerField(default=0)),
+                ('completed_at', models.DateTimeField(null=True)),
+                ('provider', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='providers.provider')),
+                ('service', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='services.service')),
+            ],
+            options={
+                'db_table': 'booking_counter_deltas',
+            },
+        ),
+    ]
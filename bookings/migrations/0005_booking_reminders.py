@@ -0,0 +1,45 @@
+# Generated by Django 5.0.1 on 2026-10-17 04:29
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0004_booking_service_counters'),
+        ('providers', '0006_provider_ranking_score'),
+        ('services', '0007_category_price_stats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingReminder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('channel', models.CharField(choices=[('sms', 'SMS'), ('email', 'Email')], max_length=10)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('sent', 'Sent'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=1)),
+                ('claimed_at', models.DateTimeField()),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'booking_reminders',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['status', 'booking_date', 'start_time'], name='bookings_status_start_idx'),
+        ),
+        migrations.AddField(
+            model_name='bookingreminder',
+            name='booking',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reminders', to='bookings.booking'),
+        ),
+        migrations.AddConstraint(
+            model_name='bookingreminder',
+            constraint=models.UniqueConstraint(fields=('booking', 'channel'), name='booking_reminders_booking_channel'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.1 on 2026-10-17 04:43
+
+import bookings.models
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0005_booking_reminders'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingCalendarFeed',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(default=bookings.models.generate_feed_key, max_length=32)),
+                ('rotated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='booking_calendar_feed', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'booking_calendar_feeds',
+            },
+        ),
+    ]
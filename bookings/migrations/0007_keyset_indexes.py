@@ -0,0 +1,25 @@
+# Generated by Django 5.0.1 on 2026-10-17 05:01
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0006_booking_calendar_feeds'),
+        ('providers', '0006_provider_ranking_score'),
+        ('services', '0008_keyset_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['provider', '-booking_date', '-id'], name='bookings_provider_latest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['customer', '-booking_date', '-id'], name='bookings_customer_latest_idx'),
+        ),
+    ]
@@ -1,10 +1,27 @@
 from django.db import models
+from django.db.models import ExpressionWrapper, F, Func, Q, Value
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import DateTimeRangeField, RangeOperators
 from django.core.validators import MinValueValidator
+from django.utils.crypto import get_random_string
 from providers.models import Provider
 
 User = get_user_model()
 
+# Statuses that no longer hold the provider's time
+RELEASED_STATUSES = ('cancelled', 'refunded')
+NO_OVERLAP_CONSTRAINT = 'bookings_no_overlap'
+
+
+def at_utc(date_field, time_field):
+    """SQL timestamptz of a date and time column, read as UTC (settings.TIME_ZONE)"""
+    return Func(
+        ExpressionWrapper(F(date_field) + F(time_field), output_field=models.DateTimeField()),
+        template="(%(expressions)s) AT TIME ZONE 'UTC'",
+        output_field=models.DateTimeField()
+    )
+
 
 class Booking(models.Model):
     """Booking model for service appointments"""
@@ -21,6 +38,13 @@ class Booking(models.Model):
     # Relationships
     customer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='bookings')
     provider = models.ForeignKey(Provider, on_delete=models.CASCADE, related_name='bookings')
+    service = models.ForeignKey(
+        'services.Service',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='bookings'
+    )
     
     # Booking Details
     service_title = models.CharField(max_length=255)
@@ -29,6 +53,18 @@ class Booking(models.Model):
     start_time = models.TimeField()
     end_time = models.TimeField()
     duration_hours = models.DecimalField(max_digits=5, decimal_places=2, validators=[MinValueValidator(0.5)])
+    # Computed by PostgreSQL, for the double booking constraint and overlap lookups
+    time_range = models.GeneratedField(
+        expression=Func(
+            at_utc('booking_date', 'start_time'),
+            at_utc('booking_date', 'end_time'),
+            Value('[)'),
+            function='TSTZRANGE',
+            output_field=DateTimeRangeField()
+        ),
+        output_field=DateTimeRangeField(),
+        db_persist=True
+    )
     
     # Location
     service_address = models.TextField()
@@ -64,6 +100,25 @@ class Booking(models.Model):
     class Meta:
         db_table = 'bookings'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['provider', 'booking_date'], name='bookings_provider_date_idx'),
+            # Keyset pages of a provider's and a customer's bookings (see utils.pagination)
+            models.Index(fields=['provider', '-booking_date', '-id'], name='bookings_provider_latest_idx'),
+            models.Index(fields=['customer', '-booking_date', '-id'], name='bookings_customer_latest_idx'),
+            # Upcoming bookings of a status, e.g. confirmed ones due a reminder
+            models.Index(fields=['status', 'booking_date', 'start_time'], name='bookings_status_start_idx'),
+        ]
+        constraints = [
+            # A provider cannot have two active bookings at overlapping times (needs btree_gist)
+            ExclusionConstraint(
+                name=NO_OVERLAP_CONSTRAINT,
+                expressions=[
+                    ('provider', RangeOperators.EQUAL),
+                    ('time_range', RangeOperators.OVERLAPS),
+                ],
+                condition=~Q(status__in=RELEASED_STATUSES)
+            ),
+        ]
     
     def __str__(self):
         return f"{self.service_title} - {self.customer.email} - {self.booking_date}"
@@ -75,6 +130,70 @@ class Booking(models.Model):
         super().save(*args, **kwargs)
 
 
+class BookingCounterDelta(models.Model):
+    """Pending change to the booking counters of a provider and service (see bookings.counters)"""
+    provider = models.ForeignKey(Provider, on_delete=models.CASCADE, related_name='+')
+    service = models.ForeignKey('services.Service', on_delete=models.CASCADE, null=True, related_name='+')
+    booked = models.SmallIntegerField(default=0)
+    completed = models.SmallIntegerField(default=0)
+    completed_at = models.DateTimeField(null=True)
+    
+    class Meta:
+        db_table = 'booking_counter_deltas'
+    
+    def __str__(self):
+        return f"Provider {self.provider_id}: {self.booked:+} booked, {self.completed:+} completed"
+
+
+class BookingReminder(models.Model):
+    """Reminder of a booking on one channel, claimed before sending (see bookings.reminders)"""
+    
+    CHANNEL_CHOICES = (
+        ('sms', 'SMS'),
+        ('email', 'Email'),
+    )
+    
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    )
+    
+    booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name='reminders')
+    channel = models.CharField(max_length=10, choices=CHANNEL_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=1)
+    claimed_at = models.DateTimeField()
+    sent_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'booking_reminders'
+        constraints = [
+            models.UniqueConstraint(fields=['booking', 'channel'], name='booking_reminders_booking_channel'),
+        ]
+    
+    def __str__(self):
+        return f"Booking {self.booking_id} {self.channel} reminder - {self.status}"
+
+
+def generate_feed_key():
+    """Generate the secret of a calendar feed URL"""
+    return get_random_string(32)
+
+
+class BookingCalendarFeed(models.Model):
+    """Secret of a user's calendar feed URL, rotated to revoke old URLs (see bookings.calendar)"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='booking_calendar_feed')
+    key = models.CharField(max_length=32, default=generate_feed_key)
+    rotated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'booking_calendar_feeds'
+    
+    def __str__(self):
+        return f"Calendar feed of user {self.user_id}"
+
+
 class BookingAttachment(models.Model):
     """Attachments for bookings (images, documents)"""
     booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name='attachments')
@@ -0,0 +1,175 @@
+"""
+Booking reminders
+
+A periodic task reminds customers of their confirmed bookings starting
+within the next BOOKING_REMINDER_LEAD_HOURS, so each booking is reminded
+once, soon after it enters that window. The due bookings are found on the
+(status, booking_date, start_time) index and read in batches together
+with their customer's NotificationPreference, which decides the channels:
+SMS with sms_booking_updates and a phone, email with email_booking_updates
+and an address (the preference defaults when a customer has none).
+
+Every reminder is claimed before it is sent by inserting its
+BookingReminder row; rows that already exist are only claimed again when
+they failed (up to MAX_ATTEMPTS) or were claimed by a run that never
+finished (after CLAIM_TIMEOUT). A rerun or an overlapping run therefore
+never sends a reminder twice. The claimed reminders of a batch are sent
+by at most BOOKING_REMINDER_CONCURRENCY threads at a time, since each
+SMS or email is a blocking network call.
+"""
+import datetime
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+from notifications.models import NotificationPreference
+from utils.email import send_booking_reminder_email
+from utils.sms import send_booking_reminder_sms
+from .models import Booking, BookingReminder
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 100
+MAX_ATTEMPTS = 3
+CLAIM_TIMEOUT = datetime.timedelta(minutes=10)
+SENDERS = {
+    'sms': send_booking_reminder_sms,
+    'email': send_booking_reminder_email,
+}
+
+
+def get_lead_hours():
+    """Get how many hours before a booking its reminder is sent"""
+    return getattr(settings, 'BOOKING_REMINDER_LEAD_HOURS', 24)
+
+
+def get_concurrency():
+    """Get how many reminders are sent at the same time"""
+    return getattr(settings, 'BOOKING_REMINDER_CONCURRENCY', 8)
+
+
+def get_due_bookings(now=None, lead_hours=None):
+    """Confirmed bookings starting after now and within the lead time (booking times are UTC)"""
+    start = (now or timezone.now()).astimezone(datetime.timezone.utc)
+    end = start + datetime.timedelta(hours=lead_hours or get_lead_hours())
+    return Booking.objects.filter(
+        (Q(booking_date__gt=start.date()) | Q(start_time__gt=start.time()))
+        & (Q(booking_date__lt=end.date()) | Q(start_time__lte=end.time())),
+        status='confirmed',
+        booking_date__gte=start.date(),
+        booking_date__lte=end.date()
+    )
+
+
+def get_channels(booking):
+    """Get the channels a booking's customer wants its reminder on"""
+    customer = booking.customer
+    preferences = (
+        getattr(customer, 'notification_preferences', None)
+        or NotificationPreference(user=customer)
+    )
+    channels = []
+    if preferences.sms_booking_updates and customer.phone:
+        channels.append('sms')
+    if preferences.email_booking_updates and customer.email:
+        channels.append('email')
+    return channels
+
+
+def claim_reminders(reminders, now):
+    """
+    Claim the reminders that are not sent, failed for good or claimed elsewhere
+
+    Args:
+        reminders: (booking ID, channel) pairs
+
+    Returns:
+        list: (reminder ID, booking ID, channel) of the claimed reminders
+    """
+    if not reminders:
+        return []
+
+    table = BookingReminder._meta.db_table
+    values = ', '.join(["(%s, %s, 'pending', 1, %s)"] * len(reminders))
+    params = [value for booking_id, channel in reminders for value in (booking_id, channel, now)]
+    with connection.cursor() as cursor:
+        cursor.execute(f'''
+            INSERT INTO {table} (booking_id, channel, status, attempts, claimed_at)
+            VALUES {values}
+            ON CONFLICT (booking_id, channel) DO UPDATE
+            SET status = 'pending', attempts = {table}.attempts + 1, claimed_at = EXCLUDED.claimed_at
+            WHERE ({table}.status = 'failed' AND {table}.attempts < %s)
+                OR ({table}.status = 'pending' AND {table}.claimed_at < %s)
+            RETURNING id, booking_id, channel
+        ''', params + [MAX_ATTEMPTS, now - CLAIM_TIMEOUT])
+        return cursor.fetchall()
+
+
+def send_reminder(booking, channel):
+    """Send one reminder, from a worker thread"""
+    try:
+        return bool(SENDERS[channel](booking))
+    except Exception:
+        logger.exception('Sending the %s reminder of booking %s failed', channel, booking.pk)
+        return False
+    finally:
+        # Senders log to the database on the thread's own connection
+        connection.close()
+
+
+def send_batch(bookings, now, concurrency):
+    """
+    Claim and send the reminders of a batch of bookings
+
+    Returns:
+        tuple: Number of reminders sent and failed
+    """
+    by_id = {booking.pk: booking for booking in bookings}
+    claimed = claim_reminders(
+        [(booking.pk, channel) for booking in bookings for channel in get_channels(booking)],
+        now
+    )
+    if not claimed:
+        return 0, 0
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda row: send_reminder(by_id[row[1]], row[2]), claimed))
+
+    sent = [row[0] for row, result in zip(claimed, results) if result]
+    failed = [row[0] for row, result in zip(claimed, results) if not result]
+    BookingReminder.objects.filter(pk__in=sent).update(status='sent', sent_at=timezone.now())
+    BookingReminder.objects.filter(pk__in=failed).update(status='failed')
+    return len(sent), len(failed)
+
+
+def dispatch_reminders(now=None, batch_size=BATCH_SIZE, concurrency=None):
+    """
+    Send the reminders of every booking due one
+
+    Returns:
+        dict: Number of reminders 'sent' and 'failed'
+    """
+    now = now or timezone.now()
+    concurrency = concurrency or get_concurrency()
+    bookings = (
+        get_due_bookings(now)
+        .select_related('customer__notification_preferences', 'provider')
+        .order_by('booking_date', 'start_time', 'pk')
+    )
+
+    counts = {'sent': 0, 'failed': 0}
+    batch = []
+    for booking in bookings.iterator(chunk_size=batch_size):
+        batch.append(booking)
+        if len(batch) >= batch_size:
+            sent, failed = send_batch(batch, now, concurrency)
+            counts['sent'] += sent
+            counts['failed'] += failed
+            batch = []
+    if batch:
+        sent, failed = send_batch(batch, now, concurrency)
+        counts['sent'] += sent
+        counts['failed'] += failed
+    return counts
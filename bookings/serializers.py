@@ -1,5 +1,8 @@
 from rest_framework import serializers
-from .models import Booking, BookingAttachment
+from django.db import IntegrityError, transaction
+from .availability import find_alternatives, has_conflict, serialize_slots
+from .counters import record_booking_completed, record_booking_created
+from .models import NO_OVERLAP_CONSTRAINT, Booking, BookingAttachment
 from providers.serializers import ProviderListSerializer
 from users.serializers import UserSerializer
 
@@ -27,16 +30,20 @@ class BookingSerializer(serializers.ModelSerializer):
             'customer', 'total_amount', 'created_at', 'updated_at',
             'confirmed_at', 'completed_at', 'cancelled_at'
         )
+        expandable_fields = {
+            'cancelled_by': ('users.serializers.UserSerializer', {'read_only': True}),
+        }
 
 
 class BookingCreateSerializer(serializers.ModelSerializer):
     """Serializer for creating bookings"""
     provider_id = serializers.IntegerField(write_only=True)
+    service_id = serializers.IntegerField(write_only=True, required=False, allow_null=True)
     
     class Meta:
         model = Booking
         fields = (
-            'provider_id', 'service_title', 'service_description',
+            'provider_id', 'service_id', 'service_title', 'service_description',
             'booking_date', 'start_time', 'end_time', 'duration_hours',
             'service_address', 'city', 'postal_code', 'customer_notes'
         )
@@ -65,6 +72,17 @@ class BookingCreateSerializer(serializers.ModelSerializer):
         if attrs['end_time'] <= attrs['start_time']:
             raise serializers.ValidationError({"end_time": "End time must be after start time"})
         
+        # Validate the service belongs to the provider
+        if attrs.get('service_id') is not None and not provider.services.filter(
+            id=attrs['service_id'], status='active'
+        ).exists():
+            raise serializers.ValidationError({"service_id": "Service not found for this provider"})
+        
+        # Validate the provider is free, offering the closest open slots if not
+        slot = (provider.id, attrs['booking_date'], attrs['start_time'], attrs['end_time'])
+        if has_conflict(*slot):
+            self.raise_conflict(slot)
+        
         attrs['provider'] = provider
         attrs['hourly_rate'] = provider.hourly_rate
         
@@ -75,12 +93,29 @@ class BookingCreateSerializer(serializers.ModelSerializer):
         provider = validated_data.pop('provider')
         customer = self.context['request'].user
         
-        booking = Booking.objects.create(
-            customer=customer,
-            provider=provider,
-            **validated_data
-        )
+        # The exclusion constraint catches bookings made since validation
+        try:
+            with transaction.atomic():
+                booking = Booking.objects.create(
+                    customer=customer,
+                    provider=provider,
+                    **validated_data
+                )
+                record_booking_created(booking)
+        except IntegrityError as exc:
+            if NO_OVERLAP_CONSTRAINT not in str(exc):
+                raise
+            self.raise_conflict((
+                provider.id, validated_data['booking_date'],
+                validated_data['start_time'], validated_data['end_time']
+            ))
         return booking
+    
+    def raise_conflict(self, slot):
+        raise serializers.ValidationError({
+            "start_time": "Provider is already booked at this time",
+            "alternatives": serialize_slots(find_alternatives(*slot)),
+        })
 
 
 class BookingUpdateSerializer(serializers.ModelSerializer):
@@ -114,17 +149,20 @@ class BookingUpdateSerializer(serializers.ModelSerializer):
         from django.utils import timezone
         
         status = validated_data.get('status')
+        newly_completed = status == 'completed' and not instance.completed_at
         
         # Update timestamp based on status
         if status == 'confirmed' and not instance.confirmed_at:
             instance.confirmed_at = timezone.now()
-        elif status == 'completed' and not instance.completed_at:
+        elif newly_completed:
             instance.completed_at = timezone.now()
-            # Update provider stats
-            instance.provider.completed_bookings += 1
-            instance.provider.save()
         elif status == 'cancelled' and not instance.cancelled_at:
             instance.cancelled_at = timezone.now()
             instance.cancelled_by = self.context['request'].user
         
-        return super().update(instance, validated_data)
+        with transaction.atomic():
+            instance = super().update(instance, validated_data)
+            # Provider stats are updated by the counter flush
+            if newly_completed:
+                record_booking_completed(instance)
+        return instance
@@ -0,0 +1,15 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import Booking
+from .stats import get_stats_tag
+from utils.cache import invalidate_tags
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def booking_changed(sender, instance, **kwargs):
+    """Invalidate the cached booking stats of the customer and provider"""
+    invalidate_tags(
+        get_stats_tag('customer', instance.customer_id),
+        get_stats_tag('provider', instance.provider_id)
+    )
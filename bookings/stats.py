@@ -0,0 +1,109 @@
+"""
+Booking statistics
+
+Every status count of a customer's or provider's bookings comes from one
+conditional aggregation (COUNT(*) FILTER (WHERE status = ...)), so the
+totals always agree with each other. Date-bucketed stats (bookings per
+day, week or month) are the same aggregation grouped by the truncated
+booking date.
+
+Results are cached per customer or provider under a key that includes the
+version of their booking_stats cache tag (see utils.cache). Saving or
+deleting a booking, which covers every status transition, invalidates the
+tags of its customer and provider, so a cached result is never stale.
+"""
+import datetime
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+from django.utils import timezone
+from utils.cache import get_tag_versions
+from .models import Booking
+
+KEY_PREFIX = 'booking_stats'
+CACHE_TIMEOUT = 60 * 60
+STATUSES = [status for status, _ in Booking.STATUS_CHOICES]
+# Truncation and default look-back of each bucket size
+BUCKETS = {
+    'day': (TruncDay, datetime.timedelta(days=30)),
+    'week': (TruncWeek, datetime.timedelta(weeks=12)),
+    'month': (TruncMonth, datetime.timedelta(days=365)),
+}
+
+
+def get_stats_tag(scope, pk):
+    """Get the cache tag of a customer's ('customer') or provider's ('provider') stats"""
+    return f'{KEY_PREFIX}:{scope}:{pk}'
+
+
+def get_status_counts():
+    """Aggregates counting every status and the total"""
+    counts = {f'{status}_bookings': Count('id', filter=Q(status=status)) for status in STATUSES}
+    counts['total_bookings'] = Count('id')
+    return counts
+
+
+def add_completion_rate(stats):
+    """Add the percentage of bookings that were completed"""
+    total = stats['total_bookings']
+    stats['completion_rate'] = stats['completed_bookings'] / total * 100 if total else 0
+    return stats
+
+
+def compute_stats(queryset):
+    """Count a booking queryset by status in a single query"""
+    return add_completion_rate(queryset.order_by().aggregate(**get_status_counts()))
+
+
+def compute_bucketed_stats(queryset, bucket, start, end=None):
+    """
+    Count a booking queryset by status per day, week or month of the booking date
+
+    Returns:
+        list: Stats of every bucket with bookings, oldest first, with the
+            bucket's first day as `period`
+    """
+    trunc, _ = BUCKETS[bucket]
+    queryset = queryset.filter(booking_date__gte=start)
+    if end is not None:
+        queryset = queryset.filter(booking_date__lte=end)
+    rows = (
+        queryset.order_by()
+        .annotate(period=trunc('booking_date'))
+        .values('period')
+        .annotate(**get_status_counts())
+        .order_by('period')
+    )
+    return [add_completion_rate(row) for row in rows]
+
+
+def get_booking_stats(scope, pk, bucket=None, start=None, end=None):
+    """
+    Get the cached booking stats of a customer or provider
+
+    Args:
+        scope: 'customer' or 'provider'
+        pk: User ID of the customer or provider ID
+        bucket: Optional 'day', 'week' or 'month' to add per-period stats
+        start, end: Optional booking date range of the buckets; start
+            defaults to the bucket size's look-back before today
+
+    Returns:
+        dict: Status counts, completion rate and, with a bucket, `buckets`
+    """
+    if bucket is not None and start is None:
+        start = timezone.localdate() - BUCKETS[bucket][1]
+
+    tag = get_stats_tag(scope, pk)
+    version = get_tag_versions([tag])[tag]
+    key = f'{tag}:{version}:{bucket}:{start}:{end}'
+    stats = cache.get(key)
+    if stats is not None:
+        return stats
+
+    queryset = Booking.objects.filter(**{scope: pk})
+    stats = compute_stats(queryset)
+    if bucket is not None:
+        stats['buckets'] = compute_bucketed_stats(queryset, bucket, start, end)
+    cache.set(key, stats, timeout=CACHE_TIMEOUT)
+    return stats
@@ -0,0 +1,15 @@
+from celery import shared_task
+from .counters import flush_counters
+from .reminders import dispatch_reminders
+
+
+@shared_task
+def flush_booking_counters():
+    """Apply pending booking counter deltas to providers and services"""
+    return flush_counters()
+
+
+@shared_task
+def send_booking_reminders():
+    """Remind customers of their confirmed bookings starting soon"""
+    return dispatch_reminders()
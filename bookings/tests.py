@@ -1,9 +1,24 @@
-from django.test import TestCase
+import io
+import threading
+import time
+from unittest import mock
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
-from providers.models import Provider, ServiceCategory
-from .models import Booking
+from django.utils import timezone
+from notifications.models import NotificationPreference
+from providers.models import Provider, ProviderAvailability, ServiceCategory
+from services.models import Service
+from providers.scoring import compute_score
+from .availability import get_default_rules, get_open_slots, merge_intervals, subtract_intervals
+from .counters import flush_counters, reconcile_counters
+from .models import Booking, BookingCounterDelta
+from .reminders import MAX_ATTEMPTS, dispatch_reminders
 import datetime
 
 User = get_user_model()
@@ -105,3 +120,617 @@ class BookingAPITest(APITestCase):
         
         response = self.client.post('/api/bookings/create/', data, format='json')
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+
+class ProviderScheduleTestCase(APITestCase):
+    """Base for tests on a provider with a weekly schedule"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.customer = User.objects.create_user(phone='+15552100000')
+        self.category = ServiceCategory.objects.create(name='Plumbing')
+        self.provider = Provider.objects.create(
+            user=User.objects.create_user(phone='+15552100001'),
+            business_name='Test Services',
+            hourly_rate=50.00,
+            city='New York',
+            state='NY',
+            country='USA',
+            postal_code='10001',
+            status='approved'
+        )
+        # Weekdays 09:00-12:00 and 13:00-17:00
+        for day in range(5):
+            ProviderAvailability.objects.create(
+                provider=self.provider, day_of_week=day,
+                start_time=datetime.time(9), end_time=datetime.time(12)
+            )
+            ProviderAvailability.objects.create(
+                provider=self.provider, day_of_week=day,
+                start_time=datetime.time(13), end_time=datetime.time(17)
+            )
+        ProviderAvailability.objects.create(
+            provider=self.provider, day_of_week=5,
+            start_time=datetime.time(9), end_time=datetime.time(17), is_available=False
+        )
+        self.service = Service.objects.create(
+            provider=self.provider,
+            category=self.category,
+            title='Fix Leak',
+            description='Description',
+            base_price=100,
+            hourly_rate=50,
+            duration_minutes=120,
+            min_booking_hours=0,
+            max_bookings_per_day=2
+        )
+        today = timezone.localdate()
+        self.monday = today + datetime.timedelta(days=7 - today.weekday())
+    
+    def book(self, day, start, end, booking_status='confirmed'):
+        return Booking.objects.create(
+            customer=self.customer,
+            provider=self.provider,
+            service_title='Fix Leak',
+            service_description='Leak',
+            booking_date=day,
+            start_time=datetime.time(*start),
+            end_time=datetime.time(*end),
+            duration_hours=1,
+            service_address='123 Main St',
+            city='New York',
+            postal_code='10001',
+            hourly_rate=50,
+            total_amount=50,
+            status=booking_status
+        )
+
+
+class AvailableSlotsTest(ProviderScheduleTestCase):
+    """Test cases for the free slot availability engine"""
+    
+    def get_slots(self, params):
+        response = self.client.get('/api/bookings/availability/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['results']
+    
+    def test_interval_arithmetic(self):
+        """Test merging and subtracting sorted intervals"""
+        self.assertEqual(merge_intervals([(60, 120), (0, 30), (30, 45), (100, 150)]), [(0, 45), (60, 150)])
+        self.assertEqual(
+            subtract_intervals([(0, 100), (200, 300)], [(10, 20), (90, 210), (250, 260)]),
+            [(0, 10), (20, 90), (210, 250), (260, 300)]
+        )
+        self.assertEqual(subtract_intervals([(0, 100)], [(0, 100)]), [])
+    
+    def test_bookings_are_subtracted(self):
+        """Test booked time is not offered, unlike cancelled bookings"""
+        self.book(self.monday, (10, 0), (11, 30))
+        self.book(self.monday, (13, 0), (17, 0), booking_status='cancelled')
+        results = self.get_slots({
+            'provider': self.provider.id, 'start': self.monday, 'end': self.monday, 'duration': 60
+        })
+        starts = [slot['start_time'][:5] for slot in results[0]['slots']]
+        self.assertEqual(starts, ['09:00', '13:00', '13:30', '14:00', '14:30', '15:00', '15:30', '16:00'])
+    
+    def test_weekly_template(self):
+        """Test only available template days have slots"""
+        sunday = self.monday + datetime.timedelta(days=6)
+        slots = self.get_slots({'provider': self.provider.id, 'start': self.monday, 'end': sunday})[0]['slots']
+        self.assertEqual(
+            {slot['date'] for slot in slots},
+            {(self.monday + datetime.timedelta(days=i)).isoformat() for i in range(5)}
+        )
+    
+    def test_service_rules(self):
+        """Test the service duration, lead time and daily booking limit"""
+        tuesday = self.monday + datetime.timedelta(days=1)
+        self.book(self.monday, (9, 0), (10, 0))
+        self.book(self.monday, (16, 0), (17, 0))
+        slots = self.get_slots({'service': self.service.id, 'start': self.monday, 'end': tuesday})[0]['slots']
+        self.assertEqual({slot['date'] for slot in slots}, {tuesday.isoformat()})
+        self.assertEqual(slots[0], {'date': tuesday.isoformat(), 'start_time': '09:00:00', 'end_time': '11:00:00'})
+        
+        rules = {self.provider.id: {'duration': 60, 'lead_hours': 24, 'max_per_day': None}}
+        now = timezone.make_aware(datetime.datetime.combine(self.monday, datetime.time(14, 10)))
+        slots = get_open_slots(rules, self.monday, tuesday, now=now)[self.provider.id]
+        self.assertEqual(slots[0], (tuesday, datetime.time(14, 30), datetime.time(15, 30)))
+    
+    def test_category(self):
+        """Test the slots of every provider in a category"""
+        results = self.get_slots({'category': self.category.id, 'start': self.monday, 'end': self.monday})
+        self.assertEqual([result['provider'] for result in results], [self.provider.id])
+        self.assertEqual(results[0]['duration'], 120)
+    
+    def test_month_in_two_queries(self):
+        """Test a 30 day range for a provider runs a constant number of queries"""
+        for i in range(20):
+            self.book(self.monday + datetime.timedelta(days=i), (10, 0), (11, 0))
+        end = self.monday + datetime.timedelta(days=29)
+        with self.assertNumQueries(2):
+            slots = get_open_slots({self.provider.id: get_default_rules()}, self.monday, end)
+        self.assertTrue(slots[self.provider.id])
+    
+    def test_invalid_params(self):
+        """Test bad ranges and missing targets are rejected"""
+        url = '/api/bookings/availability/'
+        self.assertEqual(self.client.get(url, {'start': self.monday}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            self.client.get(url, {'provider': self.provider.id, 'start': 'soon'}).status_code,
+            status.HTTP_400_BAD_REQUEST
+        )
+        self.assertEqual(
+            self.client.get(url, {
+                'provider': self.provider.id, 'start': self.monday,
+                'end': self.monday + datetime.timedelta(days=100)
+            }).status_code,
+            status.HTTP_400_BAD_REQUEST
+        )
+        self.assertEqual(self.client.get(url, {'provider': 999999}).status_code, status.HTTP_404_NOT_FOUND)
+
+
+class DoubleBookingTest(ProviderScheduleTestCase):
+    """Test cases for double booking protection"""
+    
+    def booking_data(self, start='10:00', end='11:00'):
+        return {
+            'provider_id': self.provider.id,
+            'service_title': 'Fix Leak',
+            'service_description': 'Leak',
+            'booking_date': self.monday.isoformat(),
+            'start_time': start,
+            'end_time': end,
+            'duration_hours': 1.0,
+            'service_address': '123 Main St',
+            'city': 'New York',
+            'postal_code': '10001'
+        }
+    
+    def test_constraint_rejects_overlap(self):
+        """Test the database refuses overlapping active bookings"""
+        self.book(self.monday, (10, 0), (11, 0))
+        self.book(self.monday, (11, 0), (12, 0))
+        self.book(self.monday, (10, 0), (11, 0), booking_status='cancelled')
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self.book(self.monday, (10, 30), (11, 30))
+    
+    def test_check_slot(self):
+        """Test the pre-check offers the closest open slots for a taken one"""
+        self.book(self.monday, (10, 0), (11, 0))
+        url = '/api/bookings/availability/check/'
+        params = {'provider': self.provider.id, 'booking_date': self.monday, 'start_time': '09:00', 'end_time': '10:00'}
+        self.assertEqual(self.client.get(url, params).data, {'available': True, 'alternatives': []})
+        
+        response = self.client.get(url, {**params, 'start_time': '10:30', 'end_time': '11:30'})
+        self.assertFalse(response.data['available'])
+        self.assertEqual(
+            [(slot['date'], slot['start_time']) for slot in response.data['alternatives'][:2]],
+            [(self.monday.isoformat(), '11:00:00'), (self.monday.isoformat(), '09:00:00')]
+        )
+        self.assertEqual(self.client.get(url, {'provider': self.provider.id}).status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_create_conflict(self):
+        """Test booking a taken slot is refused with alternatives"""
+        self.client.force_authenticate(user=self.customer)
+        response = self.client.post('/api/bookings/create/', self.booking_data(), format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        
+        response = self.client.post('/api/bookings/create/', self.booking_data('10:30', '11:30'), format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('start_time', response.data)
+        self.assertEqual(response.data['alternatives'][0]['start_time'], '11:00:00')
+        self.assertEqual(Booking.objects.count(), 1)
+
+
+class ConcurrentBookingTest(TransactionTestCase):
+    """Test parallel attempts to book one slot"""
+    
+    ATTEMPTS = 8
+    
+    def setUp(self):
+        self.provider = Provider.objects.create(
+            user=User.objects.create_user(phone='+15552200000'),
+            business_name='Test Services',
+            hourly_rate=50.00,
+            city='New York',
+            state='NY',
+            country='USA',
+            postal_code='10001',
+            status='approved'
+        )
+        self.customers = [User.objects.create_user(phone=f'+1555220010{i}') for i in range(self.ATTEMPTS)]
+        self.day = timezone.localdate() + datetime.timedelta(days=3)
+    
+    def attempt(self, customer, barrier, results):
+        client = APIClient()
+        client.force_authenticate(user=customer)
+        try:
+            barrier.wait()
+            response = client.post('/api/bookings/create/', {
+                'provider_id': self.provider.id,
+                'service_title': 'Fix Leak',
+                'service_description': 'Leak',
+                'booking_date': self.day.isoformat(),
+                'start_time': '10:00',
+                'end_time': '11:00',
+                'duration_hours': 1.0,
+                'service_address': '123 Main St',
+                'city': 'New York',
+                'postal_code': '10001'
+            }, format='json')
+            results.append(response.status_code)
+        finally:
+            connection.close()
+    
+    def test_one_booking_wins(self):
+        """Test exactly one of several simultaneous bookings succeeds"""
+        barrier = threading.Barrier(self.ATTEMPTS)
+        results = []
+        threads = [
+            threading.Thread(target=self.attempt, args=(customer, barrier, results))
+            for customer in self.customers
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(sorted(results), [201] + [400] * (self.ATTEMPTS - 1))
+        self.assertEqual(Booking.objects.filter(provider=self.provider).count(), 1)
+
+
+class BookingCounterTest(ProviderScheduleTestCase):
+    """Test cases for the write-coalesced booking counters"""
+    
+    def post_booking(self, service_id):
+        self.client.force_authenticate(user=self.customer)
+        return self.client.post('/api/bookings/create/', {
+            'provider_id': self.provider.id,
+            'service_id': service_id,
+            'service_title': 'Fix Leak',
+            'service_description': 'Leak',
+            'booking_date': self.monday.isoformat(),
+            'start_time': '10:00',
+            'end_time': '11:00',
+            'duration_hours': 1.0,
+            'service_address': '123 Main St',
+            'city': 'New York',
+            'postal_code': '10001'
+        }, format='json')
+    
+    def create_booking(self):
+        response = self.post_booking(self.service.id)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return Booking.objects.get(pk=response.data['id'])
+    
+    def test_hot_path_does_not_write_provider(self):
+        """Test bookings record deltas that the flush applies"""
+        with CaptureQueriesContext(connection) as queries:
+            booking = self.create_booking()
+        self.assertFalse([query for query in queries if query['sql'].startswith('UPDATE "providers"')])
+        self.assertEqual(booking.service_id, self.service.id)
+        self.provider.refresh_from_db()
+        self.assertEqual(self.provider.total_bookings, 0)
+        
+        self.client.force_authenticate(user=self.provider.user)
+        for booking_status in ('confirmed', 'in_progress', 'completed'):
+            response = self.client.patch(f'/api/bookings/{booking.id}/update/', {'status': booking_status})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(BookingCounterDelta.objects.count(), 2)
+        
+        self.assertEqual(flush_counters(), 1)
+        self.provider.refresh_from_db()
+        self.service.refresh_from_db()
+        self.assertEqual((self.provider.total_bookings, self.provider.completed_bookings), (1, 1))
+        self.assertIsNotNone(self.provider.last_completed_at)
+        self.assertEqual(self.provider.ranking_score, compute_score(self.provider))
+        self.assertEqual(self.service.bookings_count, 1)
+        self.assertFalse(BookingCounterDelta.objects.exists())
+    
+    def test_service_must_belong_to_provider(self):
+        """Test bookings only link services of their provider"""
+        other = Service.objects.create(
+            provider=Provider.objects.create(
+                user=User.objects.create_user(phone='+15552100009'),
+                business_name='Other',
+                hourly_rate=50.00,
+                city='New York',
+                state='NY',
+                country='USA',
+                postal_code='10001',
+                status='approved'
+            ),
+            category=self.category,
+            title='Other',
+            description='Description',
+            base_price=100
+        )
+        response = self.post_booking(other.id)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('service_id', response.data)
+    
+    def test_reconcile(self):
+        """Test counters are recomputed from bookings without double counting pending deltas"""
+        self.book(self.monday, (9, 0), (10, 0))
+        self.book(self.monday, (13, 0), (14, 0), booking_status='completed')
+        self.create_booking()
+        
+        output = io.StringIO()
+        call_command('reconcile_booking_counters', '--verify', stdout=output)
+        self.assertIn(f'Provider #{self.provider.id}', output.getvalue())
+        
+        self.assertEqual(reconcile_counters(), (1, 0))
+        flush_counters()
+        self.provider.refresh_from_db()
+        self.assertEqual((self.provider.total_bookings, self.provider.completed_bookings), (3, 1))
+        
+        output = io.StringIO()
+        call_command('reconcile_booking_counters', '--verify', stdout=output)
+        self.assertIn('All booking counters are up to date', output.getvalue())
+
+
+class BookingStatsTest(ProviderScheduleTestCase):
+    """Test cases for aggregated booking statistics"""
+    
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.booking = self.book(self.monday, (9, 0), (10, 0))
+        self.book(self.monday, (10, 0), (11, 0), booking_status='completed')
+        self.book(self.monday + datetime.timedelta(days=7), (9, 0), (10, 0), booking_status='cancelled')
+    
+    def get_stats(self, user, params=None):
+        self.client.force_authenticate(user=user)
+        response = self.client.get('/api/bookings/stats/', params or {})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+    
+    def test_counts_in_one_query(self):
+        """Test all status counts come from one cached aggregation"""
+        # One query finds whether the user is a provider, one aggregates
+        with self.assertNumQueries(2):
+            stats = self.get_stats(self.customer)
+        self.assertEqual(
+            {key: stats[key] for key in ('total_bookings', 'confirmed_bookings', 'completed_bookings', 'cancelled_bookings')},
+            {'total_bookings': 3, 'confirmed_bookings': 1, 'completed_bookings': 1, 'cancelled_bookings': 1}
+        )
+        customer = User.objects.get(pk=self.customer.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.get_stats(customer), stats)
+        
+        provider_stats = self.get_stats(self.provider.user)
+        self.assertEqual(provider_stats['total_bookings'], 3)
+        self.assertAlmostEqual(provider_stats['completion_rate'], 100 / 3)
+    
+    def test_status_change_invalidates(self):
+        """Test a status transition shows up in the next stats"""
+        self.get_stats(self.customer)
+        self.get_stats(self.provider.user)
+        self.booking.status = 'completed'
+        self.booking.save()
+        self.assertEqual(self.get_stats(self.customer)['completed_bookings'], 2)
+        self.assertEqual(self.get_stats(self.provider.user)['completed_bookings'], 2)
+    
+    def test_weekly_buckets(self):
+        """Test bookings are counted per week"""
+        stats = self.get_stats(self.customer, {'bucket': 'week', 'start': self.monday})
+        self.assertEqual(
+            [(bucket['period'], bucket['total_bookings'], bucket['cancelled_bookings']) for bucket in stats['buckets']],
+            [(self.monday, 2, 0), (self.monday + datetime.timedelta(days=7), 1, 1)]
+        )
+        self.client.force_authenticate(user=self.customer)
+        response = self.client.get('/api/bookings/stats/', {'bucket': 'year'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BookingCalendarTest(ProviderScheduleTestCase):
+    """Test the iCalendar feed of a user's bookings"""
+    
+    def setUp(self):
+        super().setUp()
+        self.customer.first_name = 'Casey'
+        self.customer.last_name = 'Jones'
+        self.customer.save()
+        self.client.force_authenticate(user=self.customer)
+        self.url = self.client.get('/api/bookings/calendar/').data['url']
+        self.client.force_authenticate(user=None)
+    
+    def get_feed(self, url=None, **headers):
+        response = self.client.get(url or self.url, headers=headers)
+        if response.status_code == status.HTTP_200_OK:
+            response.text = b''.join(response.streaming_content).decode()
+        return response
+    
+    def test_feed(self):
+        """Test the feed has an event per recent booking, cancelled ones included"""
+        booking = self.book(self.monday, (9, 0), (11, 0))
+        self.book(self.monday + datetime.timedelta(days=1), (13, 0), (14, 0), booking_status='cancelled')
+        # Too old for the feed
+        self.book(timezone.localdate() - datetime.timedelta(days=200), (9, 0), (10, 0))
+        
+        response = self.get_feed()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        self.assertTrue(response.text.startswith('BEGIN:VCALENDAR\r\n'))
+        self.assertTrue(response.text.endswith('END:VCALENDAR\r\n'))
+        self.assertEqual(response.text.count('BEGIN:VEVENT'), 2)
+        self.assertIn(f'UID:booking-{booking.id}@servicehub\r\n', response.text)
+        self.assertIn(f'DTSTART:{self.monday:%Y%m%d}T090000Z\r\n', response.text)
+        self.assertIn(f'DTEND:{self.monday:%Y%m%d}T110000Z\r\n', response.text)
+        self.assertIn('SUMMARY:Fix Leak - Test Services\r\n', response.text)
+        self.assertIn('LOCATION:123 Main St\\, New York\\, 10001\r\n', response.text)
+        self.assertIn('STATUS:CANCELLED\r\n', response.text)
+        
+        # The provider's feed names the customer
+        self.client.force_authenticate(user=self.provider.user)
+        provider_url = self.client.get('/api/bookings/calendar/').data['url']
+        self.assertIn('SUMMARY:Fix Leak - Casey Jones\r\n', self.get_feed(provider_url).text)
+    
+    def test_long_lines_are_folded(self):
+        """Test content lines are folded at 75 octets"""
+        booking = self.book(self.monday, (9, 0), (11, 0))
+        Booking.objects.filter(pk=booking.pk).update(service_description='Leaking pipe; ' * 20)
+        text = self.get_feed().text
+        self.assertTrue(all(len(line.encode()) <= 75 for line in text.split('\r\n')))
+        unfolded = text.replace('\r\n ', '')
+        self.assertIn('DESCRIPTION:' + 'Leaking pipe\\; ' * 20 + '\r\n', unfolded)
+    
+    def test_conditional_requests(self):
+        """Test an unchanged feed gets a 304 for its ETag, but never for Last-Modified alone"""
+        booking = self.book(self.monday, (9, 0), (11, 0))
+        response = self.get_feed()
+        etag = response['ETag']
+        
+        with self.assertNumQueries(2):
+            response = self.get_feed(If_None_Match=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.get_feed(If_Modified_Since=response['Last-Modified'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        
+        booking.status = 'cancelled'
+        booking.save()
+        response = self.get_feed(If_None_Match=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        
+        # Deleting a booking leaves the latest update as is but still changes the feed
+        self.book(self.monday + datetime.timedelta(days=1), (9, 0), (10, 0))
+        response = self.get_feed()
+        etag, last_modified = response['ETag'], response['Last-Modified']
+        booking.delete()
+        self.assertEqual(self.get_feed(If_None_Match=etag).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.get_feed(If_Modified_Since=last_modified).status_code, status.HTTP_200_OK)
+    
+    def test_renames_change_etag(self):
+        """Test renaming the provider or the customer gives the feed a new ETag"""
+        self.book(self.monday, (9, 0), (11, 0))
+        etag = self.get_feed()['ETag']
+        
+        self.provider.business_name = 'Better Services'
+        self.provider.save()
+        response = self.get_feed(If_None_Match=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('SUMMARY:Fix Leak - Better Services\r\n', response.text)
+        
+        self.client.force_authenticate(user=self.provider.user)
+        provider_url = self.client.get('/api/bookings/calendar/').data['url']
+        etag = self.get_feed(provider_url)['ETag']
+        self.customer.first_name = 'Morgan'
+        self.customer.save()
+        response = self.get_feed(provider_url, If_None_Match=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('SUMMARY:Fix Leak - Morgan Jones\r\n', response.text)
+    
+    def test_rotating_revokes_url(self):
+        """Test a new feed URL revokes the old one"""
+        self.client.force_authenticate(user=self.customer)
+        self.assertEqual(self.client.get('/api/bookings/calendar/').data['url'], self.url)
+        
+        response = self.client.post('/api/bookings/calendar/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response.data['url'], self.url)
+        self.assertEqual(self.get_feed(response.data['url']).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.get_feed().status_code, status.HTTP_404_NOT_FOUND)
+    
+    def test_invalid_token(self):
+        """Test forged tokens are not found"""
+        response = self.client.get(f'/api/bookings/calendar/{self.customer.id}:forged/bookings.ics')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class BookingReminderTest(ProviderScheduleTestCase):
+    """Test the batch booking reminder dispatcher"""
+    
+    def setUp(self):
+        super().setUp()
+        self.customer.email = 'customer@example.com'
+        self.customer.save()
+        self.now = datetime.datetime.combine(
+            self.monday - datetime.timedelta(days=1), datetime.time(10), tzinfo=datetime.timezone.utc
+        )
+        self.sent = []
+        self.results = {'sms': True, 'email': True}
+        patcher = mock.patch.dict('bookings.reminders.SENDERS', {
+            'sms': lambda booking: self.send(booking, 'sms'),
+            'email': lambda booking: self.send(booking, 'email'),
+        })
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def send(self, booking, channel):
+        self.sent.append((booking.pk, channel))
+        return self.results[channel]
+    
+    def test_due_bookings_are_reminded_once(self):
+        """Test each due booking is reminded once, however often the dispatcher runs"""
+        NotificationPreference.objects.create(user=self.customer, sms_booking_updates=True)
+        due = self.book(self.monday, (9, 0), (10, 0))
+        self.book(self.monday, (10, 0), (11, 0), booking_status='pending')
+        self.book(self.monday, (11, 0), (12, 0), booking_status='cancelled')
+        # Outside the next 24 hours
+        self.book(self.monday, (13, 0), (14, 0))
+        self.book(self.monday - datetime.timedelta(days=1), (9, 0), (10, 0))
+        
+        self.assertEqual(dispatch_reminders(self.now), {'sent': 2, 'failed': 0})
+        self.assertCountEqual(self.sent, [(due.pk, 'sms'), (due.pk, 'email')])
+        self.assertEqual(set(due.reminders.values_list('status', flat=True)), {'sent'})
+        
+        # Reruns and later runs send nothing again
+        self.assertEqual(dispatch_reminders(self.now), {'sent': 0, 'failed': 0})
+        self.assertEqual(dispatch_reminders(self.now + datetime.timedelta(hours=1)), {'sent': 0, 'failed': 0})
+        self.assertEqual(len(self.sent), 2)
+    
+    def test_preferences(self):
+        """Test reminders follow the customer's notification preferences"""
+        booking = self.book(self.monday, (9, 0), (10, 0))
+        # Without preferences the defaults apply: email only
+        dispatch_reminders(self.now)
+        self.assertEqual(self.sent, [(booking.pk, 'email')])
+        
+        booking.reminders.all().delete()
+        self.sent.clear()
+        NotificationPreference.objects.create(
+            user=self.customer, sms_booking_updates=True, email_booking_updates=False
+        )
+        self.customer.refresh_from_db()
+        dispatch_reminders(self.now)
+        self.assertEqual(self.sent, [(booking.pk, 'sms')])
+    
+    def test_failures_are_retried(self):
+        """Test failed and stale reminders are claimed again up to the attempt limit"""
+        booking = self.book(self.monday, (9, 0), (10, 0))
+        self.results['email'] = False
+        for attempt in range(MAX_ATTEMPTS):
+            self.assertEqual(dispatch_reminders(self.now), {'sent': 0, 'failed': 1})
+        # Given up after the last attempt
+        self.assertEqual(dispatch_reminders(self.now), {'sent': 0, 'failed': 0})
+        reminder = booking.reminders.get()
+        self.assertEqual((reminder.status, reminder.attempts), ('failed', MAX_ATTEMPTS))
+        
+        # A claim left by a run that never finished is taken over once it is stale
+        self.results['email'] = True
+        booking.reminders.update(status='pending', claimed_at=self.now)
+        self.assertEqual(dispatch_reminders(self.now), {'sent': 0, 'failed': 0})
+        self.assertEqual(dispatch_reminders(self.now + datetime.timedelta(minutes=11)), {'sent': 1, 'failed': 0})
+    
+    def test_bounded_concurrency(self):
+        """Test no more reminders are sent at once than the concurrency allows"""
+        for day in range(5):
+            self.book(self.monday + datetime.timedelta(days=day), (9, 0), (10, 0))
+        lock = threading.Lock()
+        active = [0, 0]
+        
+        def send(booking):
+            with lock:
+                active[0] += 1
+                active[1] = max(active)
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+            return True
+        
+        with mock.patch.dict('bookings.reminders.SENDERS', {'email': send}):
+            with self.settings(BOOKING_REMINDER_LEAD_HOURS=24 * 7):
+                counts = dispatch_reminders(self.now, batch_size=3, concurrency=2)
+        self.assertEqual(counts, {'sent': 5, 'failed': 0})
+        self.assertEqual(active[1], 2)
@@ -8,7 +8,11 @@ from .views import (
     BookingAttachmentListView,
     BookingAttachmentDetailView,
     upcoming_bookings,
-    booking_stats
+    booking_stats,
+    available_slots,
+    check_slot,
+    calendar_feed_url,
+    calendar_feed
 )
 
 urlpatterns = [
@@ -17,6 +21,10 @@ urlpatterns = [
     path('create/', BookingCreateView.as_view(), name='booking-create'),
     path('upcoming/', upcoming_bookings, name='upcoming-bookings'),
     path('stats/', booking_stats, name='booking-stats'),
+    path('availability/', available_slots, name='available-slots'),
+    path('availability/check/', check_slot, name='check-slot'),
+    path('calendar/', calendar_feed_url, name='booking-calendar-feed-url'),
+    path('calendar/<str:token>/bookings.ics', calendar_feed, name='booking-calendar-feed'),
     path('<int:pk>/', BookingDetailView.as_view(), name='booking-detail'),
     path('<int:pk>/update/', BookingUpdateView.as_view(), name='booking-update'),
     path('<int:pk>/cancel/', BookingCancelView.as_view(), name='booking-cancel'),
@@ -2,18 +2,49 @@ from rest_framework import generics, status, permissions, filters
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from django.db.models import Q
+from django.http import JsonResponse, StreamingHttpResponse
+from django.urls import reverse
 from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+import datetime
+from .availability import (
+    MAX_RANGE_DAYS,
+    find_alternatives,
+    get_category_rules,
+    get_default_rules,
+    get_open_slots,
+    get_service_rules,
+    has_conflict,
+    serialize_slots
+)
+from .calendar import (
+    get_feed_etag,
+    get_feed_owner,
+    get_feed_queryset,
+    get_feed_token,
+    get_feed_version,
+    iter_feed
+)
 from .models import Booking, BookingAttachment
+from .stats import BUCKETS as STATS_BUCKETS, get_booking_stats
 from .serializers import (
     BookingSerializer,
     BookingCreateSerializer,
     BookingUpdateSerializer,
     BookingAttachmentSerializer
 )
+from providers.models import Provider
+from services.models import Service
+from utils.pagination import OptionalKeysetPagination
 from utils.permissions import IsCustomerOrProvider
+from utils.query_budget import query_budget
+from utils.sparse_fields import SparseFieldsetMixin
 
 
-class BookingListView(generics.ListAPIView):
+@query_budget(6)
+class BookingListView(SparseFieldsetMixin, generics.ListAPIView):
     """List all bookings for the authenticated user"""
     serializer_class = BookingSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -21,6 +52,7 @@ class BookingListView(generics.ListAPIView):
     search_fields = ['service_title', 'service_description', 'city']
     ordering_fields = ['booking_date', 'created_at', 'total_amount']
     ordering = ['-booking_date']
+    pagination_class = OptionalKeysetPagination
     
     def get_queryset(self):
         user = self.request.user
@@ -48,7 +80,8 @@ class BookingListView(generics.ListAPIView):
         return queryset
 
 
-class BookingDetailView(generics.RetrieveAPIView):
+@query_budget(5)
+class BookingDetailView(SparseFieldsetMixin, generics.RetrieveAPIView):
     """Retrieve booking details"""
     serializer_class = BookingSerializer
     permission_classes = [permissions.IsAuthenticated, IsCustomerOrProvider]
@@ -70,10 +103,6 @@ class BookingCreateView(generics.CreateAPIView):
         serializer.is_valid(raise_exception=True)
         booking = serializer.save()
         
-        # Update provider booking count
-        booking.provider.total_bookings += 1
-        booking.provider.save()
-        
         return Response(
             BookingSerializer(booking).data,
             status=status.HTTP_201_CREATED
@@ -182,24 +211,180 @@ def upcoming_bookings(request):
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def booking_stats(request):
-    """Get booking statistics for the user"""
+    """
+    Get booking statistics for the user
+    
+    Query parameters:
+        bucket: Optional 'day', 'week' or 'month' to add per-period counts
+        start, end: Optional booking date range (YYYY-MM-DD) of the buckets
+    """
     user = request.user
+    bucket = request.query_params.get('bucket') or None
+    if bucket is not None and bucket not in STATS_BUCKETS:
+        return Response(
+            {'error': f'bucket must be one of {", ".join(STATS_BUCKETS)}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    try:
+        start, end = [
+            datetime.date.fromisoformat(request.query_params[param]) if request.query_params.get(param) else None
+            for param in ('start', 'end')
+        ]
+    except ValueError:
+        return Response({'error': 'start and end must be dates (YYYY-MM-DD)'}, status=status.HTTP_400_BAD_REQUEST)
     
     if hasattr(user, 'provider_profile'):
-        provider = user.provider_profile
-        stats = {
-            'total_bookings': provider.total_bookings,
-            'completed_bookings': provider.completed_bookings,
-            'completion_rate': provider.completion_rate,
-            'pending_bookings': Booking.objects.filter(provider=provider, status='pending').count(),
-            'confirmed_bookings': Booking.objects.filter(provider=provider, status='confirmed').count(),
-        }
+        stats = get_booking_stats('provider', user.provider_profile.id, bucket, start, end)
     else:
-        stats = {
-            'total_bookings': Booking.objects.filter(customer=user).count(),
-            'completed_bookings': Booking.objects.filter(customer=user, status='completed').count(),
-            'pending_bookings': Booking.objects.filter(customer=user, status='pending').count(),
-            'cancelled_bookings': Booking.objects.filter(customer=user, status='cancelled').count(),
-        }
+        stats = get_booking_stats('customer', user.id, bucket, start, end)
     
     return Response(stats)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def available_slots(request):
+    """
+    Get the open slots of a provider, a service or a category over a date range
+    
+    Query parameters:
+        provider, service or category: What to find slots for
+        start, end: Dates (YYYY-MM-DD), default to the next 7 days
+        duration: Slot length in minutes, defaults to the service duration
+    """
+    params = request.query_params
+    try:
+        start = datetime.date.fromisoformat(params['start']) if params.get('start') else timezone.localdate()
+        end = datetime.date.fromisoformat(params['end']) if params.get('end') else start + datetime.timedelta(days=6)
+        duration = int(params['duration']) if params.get('duration') else None
+    except ValueError:
+        return Response(
+            {'error': 'start and end must be dates (YYYY-MM-DD) and duration a number of minutes'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    if end < start or (end - start).days >= MAX_RANGE_DAYS:
+        return Response(
+            {'error': f'end must be on or after start and at most {MAX_RANGE_DAYS} days later'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if duration is not None and not 0 < duration <= 24 * 60:
+        return Response({'error': 'duration must be between 1 and 1440 minutes'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        if params.get('service'):
+            service = Service.objects.get(
+                pk=int(params['service']),
+                status='active',
+                provider__status='approved',
+                provider__is_available=True
+            )
+            rules = {service.provider_id: get_service_rules(service, duration)}
+        elif params.get('provider'):
+            provider = Provider.objects.get(pk=int(params['provider']), status='approved', is_available=True)
+            rules = {provider.id: get_default_rules(duration)}
+        elif params.get('category'):
+            rules = get_category_rules(Service.objects.filter(category_id=int(params['category'])), duration)
+        else:
+            return Response(
+                {'error': 'provider, service or category is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+    except ValueError:
+        return Response({'error': 'provider, service and category must be IDs'}, status=status.HTTP_400_BAD_REQUEST)
+    except (Service.DoesNotExist, Provider.DoesNotExist):
+        return Response({'error': 'Not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    slots = get_open_slots(rules, start, end)
+    return Response({
+        'start': start,
+        'end': end,
+        'results': [
+            {
+                'provider': provider_id,
+                'duration': rules[provider_id]['duration'],
+                'slots': serialize_slots(provider_slots),
+            }
+            for provider_id, provider_slots in slots.items()
+        ],
+    })
+
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def check_slot(request):
+    """
+    Check whether a provider is free at a time, before booking it
+    
+    Query parameters:
+        provider: Provider ID
+        booking_date: Date (YYYY-MM-DD)
+        start_time, end_time: Times (HH:MM)
+    
+    Taken slots come with the closest open alternatives of the same length.
+    """
+    params = request.query_params
+    try:
+        provider_id = int(params['provider'])
+        slot = (
+            provider_id,
+            datetime.date.fromisoformat(params['booking_date']),
+            datetime.time.fromisoformat(params['start_time']),
+            datetime.time.fromisoformat(params['end_time']),
+        )
+    except (KeyError, ValueError):
+        return Response(
+            {'error': 'provider, booking_date (YYYY-MM-DD), start_time and end_time (HH:MM) are required'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if slot[3] <= slot[2]:
+        return Response({'error': 'End time must be after start time'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    if not has_conflict(*slot):
+        return Response({'available': True, 'alternatives': []})
+    return Response({'available': False, 'alternatives': serialize_slots(find_alternatives(*slot))})
+
+
+@api_view(['GET', 'POST'])
+@permission_classes([permissions.IsAuthenticated])
+def calendar_feed_url(request):
+    """
+    Get the URL calendar apps subscribe to for the user's bookings
+    
+    POST replaces it with a new URL, revoking the old one.
+    """
+    token = get_feed_token(request.user, rotate=request.method == 'POST')
+    url = request.build_absolute_uri(reverse('booking-calendar-feed', args=[token]))
+    return Response({'url': url})
+
+
+@query_budget(2)
+@require_safe
+def calendar_feed(request, token):
+    """
+    iCalendar feed of the bookings of the user a feed token belongs to
+    
+    A plain Django view, as calendar apps neither authenticate nor accept
+    JSON. Answers 304 Not Modified after two queries while the bookings are
+    unchanged, and otherwise streams the calendar (see bookings.calendar).
+    """
+    owner = get_feed_owner(token)
+    if owner is None:
+        return JsonResponse({'error': 'Calendar feed not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    user_id, provider_id = owner
+    today = timezone.localdate()
+    queryset = get_feed_queryset(user_id, provider_id, today)
+    latest, count, names = get_feed_version(queryset)
+    etag = get_feed_etag(user_id, today, latest, count, names)
+    
+    # Last-Modified is informational only: deletions do not move it
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = StreamingHttpResponse(iter_feed(queryset, user_id), content_type='text/calendar; charset=utf-8')
+        response['Content-Disposition'] = 'inline; filename="bookings.ics"'
+    response['ETag'] = etag
+    if latest is not None:
+        response['Last-Modified'] = http_date(latest.timestamp())
+    response['Cache-Control'] = 'private, no-cache'
+    return response
@@ -64,6 +64,10 @@ class Message(models.Model):
     class Meta:
         db_table = 'messages'
         ordering = ['created_at']
+        indexes = [
+            # A room's newest messages first, for its last message
+            models.Index(fields=['chatroom', '-created_at', '-id'], name='messages_room_newest_idx'),
+        ]
     
     def __str__(self):
         return f"Message from {self.sender.email} in {self.chatroom.id}"
@@ -34,12 +34,18 @@ class ChatRoomSerializer(serializers.ModelSerializer):
         read_only_fields = ('customer', 'provider', 'created_at', 'updated_at')
     
     def get_last_message(self, obj):
-        last_message = obj.messages.filter(is_deleted=False).last()
+        # Prefetched by the room views (see chat.views.with_room_summaries)
+        if hasattr(obj, 'last_messages'):
+            last_message = obj.last_messages[0] if obj.last_messages else None
+        else:
+            last_message = obj.messages.filter(is_deleted=False).last()
         if last_message:
             return MessageSerializer(last_message).data
         return None
     
     def get_unread_count(self, obj):
+        if hasattr(obj, 'unread_messages'):
+            return obj.unread_messages
         user = self.context.get('request').user
         return obj.messages.filter(is_read=False, is_deleted=False).exclude(sender=user).count()
 
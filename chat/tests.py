@@ -1,6 +1,15 @@
+from io import StringIO
+from unittest import mock
+import pytest
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
 from django.contrib.auth import get_user_model
+from rest_framework import status
+from rest_framework.test import APITestCase
+from utils.query_budget import QueryBudgetExceeded, QueryLog
 from .models import ChatRoom, Message
+from .views import ChatRoomListView
 
 User = get_user_model()
 
@@ -46,3 +55,80 @@ class ChatModelTest(TestCase):
         
         self.assertEqual(message.message_type, 'text')
         self.assertFalse(message.is_read)
+
+
+@pytest.mark.usefixtures('query_log')
+class ChatRoomQueryTest(APITestCase):
+    """Chat room endpoints run a fixed number of queries, whatever the number of rooms"""
+
+    def setUp(self):
+        self.customer = User.objects.create_user(phone='+15552300000', first_name='Casey')
+        self.rooms = []
+        for index in range(3):
+            provider = User.objects.create_user(phone=f'+1555230010{index}', first_name=f'Provider {index}')
+            room = ChatRoom.objects.create(customer=self.customer, provider=provider)
+            Message.objects.create(chatroom=room, sender=provider, content='First')
+            Message.objects.create(chatroom=room, sender=provider, content=f'Latest {index}')
+            Message.objects.create(chatroom=room, sender=self.customer, content='Reply', is_read=False)
+            self.rooms.append(room)
+        self.client.force_authenticate(user=self.customer)
+
+    def test_room_list(self):
+        """Test rooms are listed with their last message and unread count within budget"""
+        response = self.client.get('/api/chat/rooms/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertLessEqual(int(response['X-Query-Count']), ChatRoomListView.query_budget)
+        rooms = {room['id']: room for room in response.data['results']}
+        for index, room in enumerate(self.rooms):
+            self.assertEqual(rooms[room.pk]['last_message']['content'], 'Reply')
+            self.assertEqual(rooms[room.pk]['last_message']['sender']['id'], self.customer.pk)
+            # The customer's own reply is not unread for them
+            self.assertEqual(rooms[room.pk]['unread_count'], 2)
+            self.assertEqual(rooms[room.pk]['provider']['first_name'], f'Provider {index}')
+
+    def test_room_detail_skips_deleted_messages(self):
+        """Test a room's last message skips deleted messages"""
+        room = self.rooms[0]
+        room.messages.filter(content='Reply').update(is_deleted=True)
+        response = self.client.get(f'/api/chat/rooms/{room.pk}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['last_message']['content'], 'Latest 0')
+        self.assertEqual(response.data['unread_count'], 2)
+
+    def test_message_list(self):
+        """Test a room's messages are listed"""
+        response = self.client.get(f'/api/chat/rooms/{self.rooms[0].pk}/messages/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 3)
+
+    def test_over_budget_fails(self):
+        """Test a request over its view's budget fails in strict mode"""
+        with mock.patch.object(ChatRoomListView, 'query_budget', 1):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get('/api/chat/rooms/')
+
+    def test_repeated_shapes(self):
+        """Test a query shape run once per row is flagged"""
+        log = QueryLog()
+        with connection.execute_wrapper(log):
+            for room in self.rooms:
+                list(Message.objects.filter(chatroom=room))
+            list(ChatRoom.objects.filter(pk__in=[room.pk for room in self.rooms]))
+        repeated = log.get_repeated(threshold=3)
+        self.assertEqual(len(repeated), 1)
+        self.assertIn('"messages"', repeated[0][0])
+        self.assertEqual(repeated[0][1], 3)
+
+    def test_stats_are_reported(self):
+        """Test recorded requests are summed per view by the report command"""
+        self.client.get('/api/chat/rooms/')
+        self.client.get('/api/chat/rooms/')
+        out = StringIO()
+        call_command('query_budget_report', '--reset', stdout=out)
+        line = next(line for line in out.getvalue().splitlines() if 'ChatRoomListView' in line)
+        self.assertEqual(line.split()[2:4], [str(ChatRoomListView.query_budget), '2'])
+
+        out = StringIO()
+        call_command('query_budget_report', stdout=out)
+        line = next(line for line in out.getvalue().splitlines() if 'ChatRoomListView' in line)
+        self.assertEqual(line.split()[3], '-')
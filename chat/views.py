@@ -1,7 +1,7 @@
 from rest_framework import generics, status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
-from django.db.models import Q, Max
+from django.db.models import Count, Max, Prefetch, Q
 from django.contrib.auth import get_user_model
 from .models import ChatRoom, Message
 from .serializers import (
@@ -10,10 +10,37 @@ from .serializers import (
     MessageSerializer,
     MessageCreateSerializer
 )
+from utils.pagination import OptionalKeysetPagination
+from utils.query_budget import query_budget
 
 User = get_user_model()
 
 
+def with_room_summaries(queryset, user):
+    """
+    Fetch what ChatRoomSerializer shows for a user's rooms in a fixed number of queries
+
+    The participants are joined, the user's unread messages are counted in
+    the same query, and the last message of every room is prefetched at once
+    with DISTINCT ON, reading each room's newest messages from the
+    (chatroom, -created_at, -id) index.
+    """
+    last_messages = Message.objects.filter(is_deleted=False).order_by(
+        'chatroom_id', '-created_at', '-id'
+    ).distinct('chatroom_id').select_related('sender')
+    return queryset.select_related('customer', 'provider').annotate(
+        unread_messages=Count(
+            'messages',
+            filter=Q(messages__is_read=False, messages__is_deleted=False) & ~Q(messages__sender=user)
+        )
+    ).prefetch_related(Prefetch(
+        'messages',
+        queryset=last_messages,
+        to_attr='last_messages'
+    ))
+
+
+@query_budget(4)
 class ChatRoomListView(generics.ListAPIView):
     """List all chat rooms for authenticated user"""
     serializer_class = ChatRoomSerializer
@@ -21,14 +48,15 @@ class ChatRoomListView(generics.ListAPIView):
     
     def get_queryset(self):
         user = self.request.user
-        return ChatRoom.objects.filter(
+        return with_room_summaries(ChatRoom.objects.filter(
             Q(customer=user) | Q(provider=user),
             is_active=True
-        ).annotate(
+        ), user).annotate(
             last_message_time=Max('messages__created_at')
         ).order_by('-last_message_time')
 
 
+@query_budget(3)
 class ChatRoomDetailView(generics.RetrieveAPIView):
     """Retrieve chat room details"""
     serializer_class = ChatRoomSerializer
@@ -36,9 +64,9 @@ class ChatRoomDetailView(generics.RetrieveAPIView):
     
     def get_queryset(self):
         user = self.request.user
-        return ChatRoom.objects.filter(
+        return with_room_summaries(ChatRoom.objects.filter(
             Q(customer=user) | Q(provider=user)
-        )
+        ), user)
 
 
 class ChatRoomCreateView(generics.CreateAPIView):
@@ -78,10 +106,12 @@ class ChatRoomCreateView(generics.CreateAPIView):
         )
 
 
+@query_budget(5)
 class MessageListView(generics.ListAPIView):
     """List messages in a chat room"""
     serializer_class = MessageSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = OptionalKeysetPagination
     
     def get_queryset(self):
         chatroom_id = self.kwargs.get('chatroom_id')
@@ -106,7 +136,7 @@ class MessageListView(generics.ListAPIView):
         return Message.objects.filter(
             chatroom_id=chatroom_id,
             is_deleted=False
-        )
+        ).select_related('sender')
 
 
 class MessageCreateView(generics.CreateAPIView):
@@ -148,6 +178,7 @@ class MessageCreateView(generics.CreateAPIView):
         )
 
 
+@query_budget(2)
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def unread_messages_count(request):
@@ -0,0 +1,43 @@
+"""
+Test-wide query budgets (see utils.query_budget)
+
+Every request a test makes is recorded, and a request running more queries
+than its view's @query_budget raises QueryBudgetExceeded, failing the test.
+Tests that also want N+1 detection use the query_log fixture.
+"""
+import pytest
+from utils.query_budget import query_log_recorded
+
+
+@pytest.fixture(autouse=True)
+def query_budgets(settings, tmp_path):
+    """Fail requests that exceed their view's query budget"""
+    settings.QUERY_BUDGET_ENABLED = True
+    settings.QUERY_BUDGET_STRICT = True
+    settings.QUERY_BUDGET_STATS_FILE = str(tmp_path / 'query_budget_stats.jsonl')
+
+
+@pytest.fixture
+def query_log():
+    """
+    Record the queries of every request the test makes
+
+    Yields a list of (view name, request, QueryLog, budget) and fails the
+    test if any request ran the same query shape repeatedly (an N+1).
+    """
+    records = []
+
+    def receiver(sender, view_name, request, log, budget, **kwargs):
+        records.append((view_name, request, log, budget))
+
+    query_log_recorded.connect(receiver)
+    yield records
+    query_log_recorded.disconnect(receiver)
+
+    problems = [
+        f'{view_name} ({request.method} {request.path}) ran {times} times: {shape}'
+        for view_name, request, log, _ in records
+        for shape, times in log.get_repeated()
+    ]
+    if problems:
+        pytest.fail('Possible N+1 queries:\n' + '\n'.join(problems))
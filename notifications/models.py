@@ -47,6 +47,8 @@ class Notification(models.Model):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['user', 'is_read', '-created_at']),
+            # Keyset pages of a user's notifications (see utils.pagination)
+            models.Index(fields=['user', '-created_at', '-id'], name='notifications_user_newest_idx'),
         ]
     
     def __str__(self):
@@ -4,12 +4,14 @@ from rest_framework.response import Response
 from django.utils import timezone
 from .models import Notification, NotificationPreference
 from .serializers import NotificationSerializer, NotificationPreferenceSerializer
+from utils.pagination import OptionalKeysetPagination
 
 
 class NotificationListView(generics.ListAPIView):
     """List all notifications for authenticated user"""
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = OptionalKeysetPagination
     
     def get_queryset(self):
         user = self.request.user
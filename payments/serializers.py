@@ -16,6 +16,9 @@ class PaymentSerializer(serializers.ModelSerializer):
             'refund_amount', 'refunded_at', 'created_at',
             'updated_at', 'completed_at'
         )
+        expandable_fields = {
+            'customer': ('users.serializers.UserSerializer', {'read_only': True}),
+        }
 
 
 class PaymentCreateSerializer(serializers.Serializer):
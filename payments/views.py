@@ -12,9 +12,10 @@ from .serializers import (
     RefundSerializer
 )
 from bookings.models import Booking
+from utils.sparse_fields import SparseFieldsetMixin
 
 
-class PaymentListView(generics.ListAPIView):
+class PaymentListView(SparseFieldsetMixin, generics.ListAPIView):
     """List all payments for authenticated user"""
     serializer_class = PaymentSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -24,7 +25,7 @@ class PaymentListView(generics.ListAPIView):
         return Payment.objects.filter(customer=user)
 
 
-class PaymentDetailView(generics.RetrieveAPIView):
+class PaymentDetailView(SparseFieldsetMixin, generics.RetrieveAPIView):
     """Retrieve payment details"""
     serializer_class = PaymentSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -0,0 +1,206 @@
+"""
+Precomputed provider profile documents
+
+A provider's full profile (user, categories, availability and portfolio,
+as ProviderSerializer renders it) is built once and stored as a JSON
+document in the ProviderProfileDocument table and in the cache. Profile
+reads are then a single cache lookup, falling back to the table on a cache
+miss, and only build the document on the spot if it has never been built.
+
+Signals queue a rebuild after commit whenever the provider or one of the
+nested rows changes, and readers keep getting the previous document until
+the rebuild lands. The rebuild invalidates the provider's cache tag once
+more, so conditional GETs never keep an ETag of a stale document.
+
+Documents are stamped with the time their build started reading. A build
+only replaces a stored row or cache entry with an older stamp, so rebuilds
+finishing out of order never bring back an older document, and a reader
+filling the cache from the table after a miss only adds a missing entry.
+
+Image URLs are stored as relative media URLs and made absolute for each
+request. The check_profile_documents command compares every stored
+document with a fresh build.
+"""
+import json
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from utils.cache import invalidate_tags
+from .models import Provider, ProviderProfileDocument
+
+KEY_PREFIX = 'provider_profile'
+CACHE_TIMEOUT = 60 * 60 * 24
+BUILD_BATCH_SIZE = 500
+
+
+def get_document_key(provider_id):
+    """Get the cache key of a provider's document"""
+    return f'{KEY_PREFIX}:{provider_id}'
+
+
+def get_document_queryset():
+    """Providers with everything their document nests"""
+    return Provider.objects.select_related('user').prefetch_related('categories', 'availability', 'portfolio')
+
+
+def render_document(provider):
+    """Render a provider's profile as plain JSON data"""
+    from .serializers import ProviderSerializer
+    return json.loads(JSONRenderer().render(ProviderSerializer(provider).data))
+
+
+def build_documents(provider_ids, invalidate=True):
+    """
+    Build and store the documents of providers
+
+    Providers that no longer exist have their cached document removed.
+
+    Args:
+        invalidate: Whether to invalidate the providers' cache tags, which
+            is unnecessary when no document was served before
+
+    Returns:
+        int: Number of documents stored
+    """
+    provider_ids = set(provider_ids)
+    # Stamped before reading, so a build that read older data has an older stamp
+    now = timezone.now()
+    providers = list(get_document_queryset().filter(pk__in=provider_ids))
+    documents = {provider.pk: render_document(provider) for provider in providers}
+
+    stored = store_documents(documents, now)
+    keys = {get_document_key(pk): pk for pk in stored}
+    cached = cache.get_many(list(keys))
+    cache.set_many({
+        key: {'document': documents[pk], 'built_at': now.timestamp()}
+        for key, pk in keys.items()
+        if key not in cached or cached[key]['built_at'] < now.timestamp()
+    }, timeout=CACHE_TIMEOUT)
+    cache.delete_many([get_document_key(pk) for pk in provider_ids - set(documents)])
+    if invalidate:
+        invalidate_tags(*[f'provider:{pk}' for pk in provider_ids])
+    return len(stored)
+
+
+def store_documents(documents, built_at):
+    """
+    Upsert documents, keeping stored ones built later
+
+    Returns:
+        list: IDs of the providers whose document was stored
+    """
+    if not documents:
+        return []
+
+    table = ProviderProfileDocument._meta.db_table
+    values = ', '.join(['(%s, %s::jsonb, %s)'] * len(documents))
+    params = [value for pk, document in documents.items() for value in (pk, json.dumps(document), built_at)]
+    with connection.cursor() as cursor:
+        cursor.execute(f'''
+            INSERT INTO {table} (provider_id, document, built_at)
+            VALUES {values}
+            ON CONFLICT (provider_id) DO UPDATE
+            SET document = EXCLUDED.document, built_at = EXCLUDED.built_at
+            WHERE {table}.built_at < EXCLUDED.built_at
+            RETURNING provider_id
+        ''', params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def rebuild_all_documents(batch_size=BUILD_BATCH_SIZE):
+    """
+    Build the documents of every provider
+
+    Returns:
+        int: Number of documents stored
+    """
+    provider_ids = list(Provider.objects.order_by('pk').values_list('pk', flat=True))
+    return sum(
+        build_documents(provider_ids[start:start + batch_size])
+        for start in range(0, len(provider_ids), batch_size)
+    )
+
+
+def get_document(provider_id):
+    """
+    Get a provider's profile document
+
+    Returns:
+        dict: The document, or None if the provider does not exist
+    """
+    entry = cache.get(get_document_key(provider_id))
+    if entry is not None:
+        return entry['document']
+
+    document = load_stored_document(provider_id)
+    if document is not None or not Provider.objects.filter(pk=provider_id).exists():
+        return document
+    build_documents([provider_id], invalidate=False)
+    return load_stored_document(provider_id)
+
+
+def load_stored_document(provider_id):
+    """Read a provider's stored document into the cache, or None if it was never built"""
+    row = (
+        ProviderProfileDocument.objects.filter(provider_id=provider_id)
+        .values_list('document', 'built_at')
+        .first()
+    )
+    if row is None:
+        return None
+    # Never overwrite, as a rebuild may have cached a newer document meanwhile
+    cache.add(
+        get_document_key(provider_id),
+        {'document': row[0], 'built_at': row[1].timestamp()},
+        timeout=CACHE_TIMEOUT
+    )
+    return row[0]
+
+
+def schedule_rebuild(*provider_ids):
+    """Queue a rebuild of the providers' documents after commit"""
+    if not provider_ids:
+        return
+
+    from .tasks import rebuild_profile_documents
+    provider_ids = sorted(set(provider_ids))
+    transaction.on_commit(lambda: rebuild_profile_documents.delay(provider_ids))
+
+
+def absolutize_urls(data, request):
+    """Make the relative media URLs of a document absolute for a request"""
+    if isinstance(data, dict):
+        return {key: absolutize_urls(value, request) for key, value in data.items()}
+    if isinstance(data, list):
+        return [absolutize_urls(value, request) for value in data]
+    if isinstance(data, str) and data.startswith(settings.MEDIA_URL):
+        return request.build_absolute_uri(data)
+    return data
+
+
+def find_inconsistent_documents(batch_size=BUILD_BATCH_SIZE):
+    """
+    Compare every provider's stored and cached documents with a fresh build
+
+    Yields:
+        tuple: (provider ID, problem), the problem being 'missing' (never
+            built), 'stale' (stored document differs) or 'cache' (cached
+            document differs from the stored one)
+    """
+    provider_ids = list(Provider.objects.order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(provider_ids), batch_size):
+        batch = provider_ids[start:start + batch_size]
+        stored = dict(
+            ProviderProfileDocument.objects.filter(provider_id__in=batch).values_list('provider_id', 'document')
+        )
+        cached = cache.get_many([get_document_key(pk) for pk in batch])
+        for provider in get_document_queryset().filter(pk__in=batch).order_by('pk'):
+            key = get_document_key(provider.pk)
+            if provider.pk not in stored:
+                yield provider.pk, 'missing'
+            elif stored[provider.pk] != render_document(provider):
+                yield provider.pk, 'stale'
+            elif key in cached and cached[key]['document'] != stored[provider.pk]:
+                yield provider.pk, 'cache'
@@ -0,0 +1,223 @@
+"""
+Proximity search without PostGIS
+
+Every located provider is assigned to a cell of a fixed latitude/longitude
+grid, stored in the indexed Provider.geo_cell column. A radius query first
+narrows the candidates to the cells overlapping the circle's bounding box
+(an index lookup), then computes the exact great-circle distance for those
+candidates only. Large radii whose bounding box covers too many cells fall
+back to a latitude/longitude range on the bounding-box index instead.
+
+K-nearest queries search a growing radius until it contains at least k
+providers; the k closest inside that circle are the k closest overall.
+"""
+import math
+from django.db.models import ExpressionWrapper, F, FloatField
+from django.db.models.functions import ASin, Cast, Cos, Least, Power, Radians, Sin, Sqrt
+
+EARTH_RADIUS_KM = 6371.0
+CELL_SIZE = 0.1  # Degrees, about 11 km of latitude
+GRID_ROWS = int(180 / CELL_SIZE)
+GRID_COLUMNS = int(360 / CELL_SIZE)
+MAX_CELLS = 400  # Beyond this many cells the bounding-box range is cheaper
+MAX_RADIUS_KM = 500
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def get_row(latitude):
+    return min(int((float(latitude) + 90) // CELL_SIZE), GRID_ROWS - 1)
+
+
+def get_column(longitude):
+    return int((float(longitude) + 180) // CELL_SIZE) % GRID_COLUMNS
+
+
+def get_cell(latitude, longitude):
+    """
+    Get the grid cell of a coordinate
+
+    Returns:
+        int: Cell number, or None for a missing coordinate
+    """
+    if latitude is None or longitude is None:
+        return None
+    return get_row(latitude) * GRID_COLUMNS + get_column(longitude)
+
+
+def get_bounding_box(latitude, longitude, radius_km):
+    """
+    Get the bounding box of a circle
+
+    Returns:
+        tuple: (min_lat, max_lat, min_lng, max_lng). The longitudes span the
+            whole range near the poles and wrap across the antimeridian
+            (min_lng > max_lng).
+    """
+    lat_delta = radius_km / KM_PER_DEGREE
+    min_lat, max_lat = max(latitude - lat_delta, -90), min(latitude + lat_delta, 90)
+    if min_lat == -90 or max_lat == 90:
+        return min_lat, max_lat, -180, 180
+
+    # The longitude span is widest at the latitude closest to a pole
+    widest = max(abs(min_lat), abs(max_lat))
+    lng_delta = radius_km / (KM_PER_DEGREE * math.cos(math.radians(widest)))
+    if lng_delta >= 180:
+        return min_lat, max_lat, -180, 180
+
+    min_lng, max_lng = longitude - lng_delta, longitude + lng_delta
+    if min_lng < -180:
+        min_lng += 360
+    if max_lng > 180:
+        max_lng -= 360
+    return min_lat, max_lat, min_lng, max_lng
+
+
+def get_cells(bounding_box):
+    """
+    Get the grid cells overlapping a bounding box
+
+    Returns:
+        list: Cell numbers, or None if there are more than MAX_CELLS
+    """
+    min_lat, max_lat, min_lng, max_lng = bounding_box
+    rows = range(get_row(min_lat), get_row(max_lat) + 1)
+
+    first, last = get_column(min_lng), get_column(max_lng)
+    if (min_lng, max_lng) == (-180, 180):
+        columns = range(GRID_COLUMNS)
+    elif first <= last:
+        columns = range(first, last + 1)
+    else:
+        columns = list(range(first, GRID_COLUMNS)) + list(range(0, last + 1))
+
+    if len(rows) * len(columns) > MAX_CELLS:
+        return None
+    return [row * GRID_COLUMNS + column for row in rows for column in columns]
+
+
+def distance_expression(latitude, longitude, prefix=''):
+    """
+    Haversine distance in kilometres from a point to a provider
+
+    Args:
+        latitude, longitude: Origin coordinate
+        prefix: Lookup path to the provider (e.g. 'provider__')
+    """
+    lat = Radians(Cast(F(f'{prefix}latitude'), FloatField()))
+    lng = Radians(Cast(F(f'{prefix}longitude'), FloatField()))
+    origin_lat = math.radians(latitude)
+    origin_lng = math.radians(longitude)
+
+    haversine = (
+        Power(Sin((lat - origin_lat) / 2), 2)
+        + math.cos(origin_lat) * Cos(lat) * Power(Sin((lng - origin_lng) / 2), 2)
+    )
+    return ExpressionWrapper(
+        # Rounding can push the haversine of antipodal points just above 1
+        2 * EARTH_RADIUS_KM * ASin(Least(Sqrt(haversine), 1.0)),
+        output_field=FloatField()
+    )
+
+
+def within_radius(queryset, latitude, longitude, radius_km, prefix=''):
+    """
+    Filter a queryset to providers (or their services) within a radius
+
+    Args:
+        queryset: Provider queryset, or a queryset related to providers
+        latitude, longitude: Origin coordinate
+        radius_km: Search radius in kilometres
+        prefix: Lookup path to the provider (e.g. 'provider__')
+
+    Returns:
+        QuerySet: Annotated with distance_km and ordered by it
+    """
+    bounding_box = get_bounding_box(latitude, longitude, radius_km)
+    cells = get_cells(bounding_box)
+    if cells is not None:
+        queryset = queryset.filter(**{f'{prefix}geo_cell__in': cells})
+    else:
+        min_lat, max_lat, min_lng, max_lng = bounding_box
+        queryset = queryset.filter(**{
+            f'{prefix}latitude__gte': min_lat,
+            f'{prefix}latitude__lte': max_lat,
+        })
+        if min_lng <= max_lng:
+            queryset = queryset.filter(**{
+                f'{prefix}longitude__gte': min_lng,
+                f'{prefix}longitude__lte': max_lng,
+            })
+        else:
+            queryset = queryset.exclude(**{
+                f'{prefix}longitude__gt': max_lng,
+                f'{prefix}longitude__lt': min_lng,
+            })
+
+    return queryset.annotate(
+        distance_km=distance_expression(latitude, longitude, prefix)
+    ).filter(distance_km__lte=radius_km).order_by('distance_km', 'id')
+
+
+def nearest(queryset, latitude, longitude, k, max_radius_km=MAX_RADIUS_KM, prefix=''):
+    """
+    Get the k nearest providers (or their services) within max_radius_km
+
+    The radius starts at one cell and doubles until it holds k results.
+
+    Returns:
+        list: Up to k objects annotated with distance_km, nearest first
+    """
+    radius_km = CELL_SIZE * KM_PER_DEGREE
+    while True:
+        radius_km = min(radius_km, max_radius_km)
+        results = list(within_radius(queryset, latitude, longitude, radius_km, prefix)[:k])
+        if len(results) >= k or radius_km >= max_radius_km:
+            return results
+        radius_km *= 2
+
+
+def get_location_params(params, default_limit=10, max_limit=100):
+    """
+    Parse the proximity query parameters of a request
+
+    Args:
+        params: Request query params with lat, lng and optional radius (km)
+            or limit (number of nearest results)
+
+    Returns:
+        dict: latitude, longitude, radius_km (or None) and limit
+
+    Raises:
+        ValueError: With a message for the client if a parameter is invalid
+    """
+    try:
+        latitude = float(params['lat'])
+        longitude = float(params['lng'])
+    except (KeyError, ValueError):
+        raise ValueError('Query parameters "lat" and "lng" are required numbers')
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValueError('Coordinates are out of range')
+
+    radius_km = params.get('radius')
+    if radius_km is not None:
+        try:
+            radius_km = float(radius_km)
+        except ValueError:
+            raise ValueError('Invalid radius')
+        if not 0 < radius_km <= MAX_RADIUS_KM:
+            raise ValueError(f'Radius must be between 0 and {MAX_RADIUS_KM} km')
+
+    limit = params.get('limit', default_limit)
+    try:
+        limit = int(limit)
+    except ValueError:
+        raise ValueError('Invalid limit')
+    if not 1 <= limit <= max_limit:
+        raise ValueError(f'Limit must be between 1 and {max_limit}')
+
+    return {
+        'latitude': latitude,
+        'longitude': longitude,
+        'radius_km': radius_km,
+        'limit': limit,
+    }
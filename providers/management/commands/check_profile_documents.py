@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from providers.documents import build_documents, find_inconsistent_documents, rebuild_all_documents
+
+
+class Command(BaseCommand):
+    help = 'Verify the precomputed provider profile documents against a fresh build'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Rebuild the documents that are missing or out of date'
+        )
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Rebuild every document without checking'
+        )
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            count = rebuild_all_documents()
+            self.stdout.write(self.style.SUCCESS(f'✓ Rebuilt {count} profile documents'))
+            return
+
+        problems = {}
+        for provider_id, problem in find_inconsistent_documents():
+            problems[provider_id] = problem
+            self.stdout.write(f'  Provider #{provider_id}: {problem}')
+
+        if not problems:
+            self.stdout.write(self.style.SUCCESS('✓ All profile documents are up to date'))
+        elif options['fix']:
+            count = build_documents(problems)
+            self.stdout.write(self.style.SUCCESS(f'✓ Rebuilt {count} profile documents'))
+        else:
+            self.stdout.write(self.style.WARNING(f'{len(problems)} profile documents are inconsistent'))
@@ -0,0 +1,44 @@
+# Generated by Django 5.0.1 on 2026-10-17 03:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+# Frozen copy of providers.geo.get_cell so later grid changes need their own migration
+CELL_SIZE = 0.1
+GRID_ROWS = 1800
+GRID_COLUMNS = 3600
+
+
+def populate_geo_cells(apps, schema_editor):
+    Provider = apps.get_model('providers', 'Provider')
+    providers = Provider.objects.filter(latitude__isnull=False, longitude__isnull=False)
+    for provider in providers.only('id', 'latitude', 'longitude').iterator():
+        row = min(int((float(provider.latitude) + 90) // CELL_SIZE), GRID_ROWS - 1)
+        column = int((float(provider.longitude) + 180) // CELL_SIZE) % GRID_COLUMNS
+        provider.geo_cell = row * GRID_COLUMNS + column
+        provider.save(update_fields=['geo_cell'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('providers', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='provider',
+            name='geo_cell',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='provider',
+            index=models.Index(fields=['status', 'geo_cell'], name='providers_status_d1aba4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='provider',
+            index=models.Index(fields=['latitude', 'longitude'], name='providers_latitud_c73269_idx'),
+        ),
+        migrations.RunPython(populate_geo_cells, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.1 on 2026-10-17 03:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('providers', '0002_provider_geo_cell'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='providerportfolio',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='servicecategory',
+            name='icon_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.0.1 on 2026-10-17 04:05
+
+import unicodedata
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.conf import settings
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+# Frozen copy of providers.search.normalize_city
+def normalize_city(value):
+    value = unicodedata.normalize('NFKD', value or '')
+    value = ''.join(char for char in value if not unicodedata.combining(char))
+    return ' '.join(value.casefold().split())
+
+
+def populate_city_normalized(apps, schema_editor):
+    Provider = apps.get_model('providers', 'Provider')
+    for provider in Provider.objects.only('id', 'city').iterator():
+        provider.city_normalized = normalize_city(provider.city)
+        provider.save(update_fields=['city_normalized'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('providers', '0003_image_variants'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='provider',
+            name='city_normalized',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='provider',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['business_name'], name='providers_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='provider',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('business_name'), name='gin_trgm_ops'), name='providers_name_upper_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='provider',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('bio'), name='gin_trgm_ops'), name='providers_bio_upper_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='provider',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('state'), name='gin_trgm_ops'), name='providers_state_upper_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='provider',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['city_normalized'], name='providers_city_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.RunPython(populate_city_normalized, migrations.RunPython.noop),
+    ]
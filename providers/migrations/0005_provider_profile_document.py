@@ -0,0 +1,25 @@
+# Generated by Django 5.0.1 on 2026-10-17 04:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('providers', '0004_provider_trigram_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProviderProfileDocument',
+            fields=[
+                ('provider', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='profile_document', serialize=False, to='providers.provider')),
+                ('document', models.JSONField()),
+                ('built_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'provider_profile_documents',
+            },
+        ),
+    ]
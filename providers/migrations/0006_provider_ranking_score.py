@@ -0,0 +1,61 @@
+# Generated by Django 5.0.1 on 2026-10-17 04:17
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Max
+from django.utils import timezone
+
+
+# Frozen copy of providers.scoring.compute_score
+def compute_score(provider, now):
+    rating = (3.5 * 10 + float(provider.average_rating) * provider.total_reviews) / (10 + provider.total_reviews)
+    completion = (0.8 * 5 + provider.completed_bookings) / (5 + provider.total_bookings)
+    recency = 0
+    if provider.last_completed_at is not None:
+        age_days = max((now - provider.last_completed_at).days, 0)
+        recency = 0.5 ** (age_days / 90)
+    return round(0.7 * rating / 5 + 0.2 * min(completion, 1) + 0.1 * recency, 6)
+
+
+def populate_ranking_score(apps, schema_editor):
+    Provider = apps.get_model('providers', 'Provider')
+    Booking = apps.get_model('bookings', 'Booking')
+    last_completed = dict(
+        Booking.objects.filter(status='completed', completed_at__isnull=False)
+        .order_by()
+        .values('provider_id')
+        .annotate(last=Max('completed_at'))
+        .values_list('provider_id', 'last')
+    )
+    now = timezone.now()
+    for provider in Provider.objects.iterator():
+        provider.last_completed_at = last_completed.get(provider.pk)
+        provider.ranking_score = compute_score(provider, now)
+        provider.save(update_fields=['last_completed_at', 'ranking_score'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('providers', '0005_provider_profile_document'),
+        ('bookings', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='provider',
+            name='last_completed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='provider',
+            name='ranking_score',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='provider',
+            index=models.Index(fields=['status', '-ranking_score'], name='providers_status_score_idx'),
+        ),
+        migrations.RunPython(populate_ranking_score, migrations.RunPython.noop),
+    ]
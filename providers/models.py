@@ -1,4 +1,6 @@
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.db.models.functions import Upper
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, MaxValueValidator
 
@@ -10,6 +12,7 @@ class ServiceCategory(models.Model):
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField(blank=True)
     icon = models.ImageField(upload_to='category_icons/', blank=True, null=True)
+    icon_variants = models.JSONField(default=dict, blank=True, editable=False)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -42,11 +45,13 @@ class Provider(models.Model):
     
     # Location
     city = models.CharField(max_length=100)
+    city_normalized = models.CharField(max_length=100, blank=True, default='', editable=False)
     state = models.CharField(max_length=100)
     country = models.CharField(max_length=100)
     postal_code = models.CharField(max_length=20)
     latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
     longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    geo_cell = models.PositiveIntegerField(null=True, blank=True, editable=False)
     
     # Verification
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
@@ -65,6 +70,10 @@ class Provider(models.Model):
     # Stats
     total_bookings = models.PositiveIntegerField(default=0)
     completed_bookings = models.PositiveIntegerField(default=0)
+    last_completed_at = models.DateTimeField(null=True, blank=True, editable=False)
+    
+    # Ranking (see providers.scoring)
+    ranking_score = models.FloatField(default=0, editable=False)
     
     is_available = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -73,11 +82,38 @@ class Provider(models.Model):
     class Meta:
         db_table = 'providers'
         ordering = ['-average_rating', '-created_at']
+        indexes = [
+            models.Index(fields=['status', 'geo_cell']),
+            models.Index(fields=['status', '-ranking_score'], name='providers_status_score_idx'),
+            models.Index(fields=['latitude', 'longitude']),
+            # Trigram indexes for providers.search: icontains compares UPPER() values
+            GinIndex(fields=['business_name'], name='providers_name_trgm', opclasses=['gin_trgm_ops']),
+            GinIndex(OpClass(Upper('business_name'), name='gin_trgm_ops'), name='providers_name_upper_trgm'),
+            GinIndex(OpClass(Upper('bio'), name='gin_trgm_ops'), name='providers_bio_upper_trgm'),
+            GinIndex(OpClass(Upper('state'), name='gin_trgm_ops'), name='providers_state_upper_trgm'),
+            GinIndex(fields=['city_normalized'], name='providers_city_trgm', opclasses=['gin_trgm_ops']),
+        ]
     
     def __str__(self):
         user_identifier = self.user.email or self.user.phone or f"User #{self.user.pk}"
         return f"{self.business_name} - {user_identifier}"
     
+    def save(self, *args, **kwargs):
+        from .geo import get_cell
+        from .scoring import SCORE_INPUTS, compute_score
+        from .search import normalize_city
+        self.geo_cell = get_cell(self.latitude, self.longitude)
+        self.city_normalized = normalize_city(self.city)
+        self.ranking_score = compute_score(self)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = set(kwargs['update_fields']) | {'geo_cell'}
+        if update_fields is not None and 'city' in update_fields:
+            kwargs['update_fields'] = set(kwargs['update_fields']) | {'city_normalized'}
+        if update_fields is not None and set(SCORE_INPUTS) & set(update_fields):
+            kwargs['update_fields'] = set(kwargs['update_fields']) | {'ranking_score'}
+        super().save(*args, **kwargs)
+    
     @property
     def completion_rate(self):
         if self.total_bookings == 0:
@@ -119,6 +155,7 @@ class ProviderPortfolio(models.Model):
     title = models.CharField(max_length=255)
     description = models.TextField(blank=True)
     image = models.ImageField(upload_to='portfolio/')
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
@@ -127,3 +164,21 @@ class ProviderPortfolio(models.Model):
     
     def __str__(self):
         return f"{self.provider.business_name} - {self.title}"
+
+
+class ProviderProfileDocument(models.Model):
+    """Precomputed JSON of a provider's full profile (see providers.documents)"""
+    provider = models.OneToOneField(
+        Provider,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='profile_document'
+    )
+    document = models.JSONField()
+    built_at = models.DateTimeField()
+    
+    class Meta:
+        db_table = 'provider_profile_documents'
+    
+    def __str__(self):
+        return f"Profile document for provider {self.provider_id}"
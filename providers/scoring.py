@@ -0,0 +1,79 @@
+"""
+Provider ranking score
+
+Providers are ranked by a precomputed score between 0 and 1 that blends:
+
+    rating: Bayesian average of the reviews, i.e. the mean rating pulled
+        towards PRIOR_RATING as if every provider had PRIOR_REVIEWS extra
+        reviews at that rating, so one 5-star review does not beat hundreds
+        of 4.8s
+    completion: Share of completed bookings, smoothed the same way
+    recency: Decays by half every RECENCY_HALF_LIFE_DAYS since the last
+        completed booking
+
+The score is stored on Provider and indexed with the status, so the
+ranked listing is an index scan. Provider.save() recomputes it whenever
+one of its inputs is saved, and a periodic task refreshes every score so
+recency keeps decaying for providers without new activity.
+"""
+import datetime
+from django.utils import timezone
+from utils.cache import invalidate_tags
+
+PRIOR_RATING = 3.5
+PRIOR_REVIEWS = 10
+PRIOR_COMPLETION_RATE = 0.8
+PRIOR_BOOKINGS = 5
+RECENCY_HALF_LIFE_DAYS = 90
+RATING_WEIGHT = 0.7
+COMPLETION_WEIGHT = 0.2
+RECENCY_WEIGHT = 0.1
+SCORE_INPUTS = ('average_rating', 'total_reviews', 'total_bookings', 'completed_bookings', 'last_completed_at')
+REFRESH_BATCH_SIZE = 1000
+
+
+def compute_score(provider, now=None):
+    """Compute the ranking score of a provider from its stored stats"""
+    rating = (
+        (PRIOR_RATING * PRIOR_REVIEWS + float(provider.average_rating) * provider.total_reviews)
+        / (PRIOR_REVIEWS + provider.total_reviews)
+    )
+    completion = (
+        (PRIOR_COMPLETION_RATE * PRIOR_BOOKINGS + provider.completed_bookings)
+        / (PRIOR_BOOKINGS + provider.total_bookings)
+    )
+    recency = 0
+    if provider.last_completed_at is not None:
+        age_days = max((now or timezone.now()) - provider.last_completed_at, datetime.timedelta(0)).days
+        recency = 0.5 ** (age_days / RECENCY_HALF_LIFE_DAYS)
+
+    score = RATING_WEIGHT * rating / 5 + COMPLETION_WEIGHT * min(completion, 1) + RECENCY_WEIGHT * recency
+    return round(score, 6)
+
+
+def refresh_scores(batch_size=REFRESH_BATCH_SIZE):
+    """
+    Recompute every provider's score, writing only the ones that changed
+
+    Returns:
+        int: Number of providers updated
+    """
+    from .models import Provider
+
+    now = timezone.now()
+    changed = []
+    updated = 0
+    providers = Provider.objects.only('ranking_score', *SCORE_INPUTS).order_by('pk')
+    for provider in providers.iterator(chunk_size=batch_size):
+        score = compute_score(provider, now)
+        if score != provider.ranking_score:
+            provider.ranking_score = score
+            changed.append(provider)
+        if len(changed) >= batch_size:
+            updated += Provider.objects.bulk_update(changed, ['ranking_score'])
+            changed = []
+    if changed:
+        updated += Provider.objects.bulk_update(changed, ['ranking_score'])
+    if updated:
+        invalidate_tags('providers')
+    return updated
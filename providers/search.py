@@ -0,0 +1,89 @@
+"""
+Indexed provider search
+
+Text search uses pg_trgm GIN indexes: on UPPER() of business_name, bio
+and state for icontains (which Django runs as UPPER(column) LIKE
+UPPER('%term%')), on the normalized city for contains, and on
+business_name itself for the fuzzy word-similarity match, so neither a
+substring search nor a misspelt name needs a sequential scan. Results
+are ranked by how closely the business name matches unless an explicit
+ordering is requested.
+
+Provider.city_normalized holds the city lowercased, without accents and
+with whitespace collapsed, so city filters compare normalized values on
+the trigram index instead of applying ILIKE to the raw column.
+
+The category filter is an EXISTS subquery on the provider/category join
+table rather than a join, so it never duplicates providers and the list no
+longer needs DISTINCT.
+"""
+import unicodedata
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db.models import Exists, OuterRef, Q
+from rest_framework.filters import BaseFilterBackend
+
+SEARCH_PARAM = 'search'
+ORDERING_PARAM = 'ordering'
+
+
+def normalize_city(value):
+    """Lowercase a city name, strip its accents and collapse whitespace"""
+    value = unicodedata.normalize('NFKD', value or '')
+    value = ''.join(char for char in value if not unicodedata.combining(char))
+    return ' '.join(value.casefold().split())
+
+
+def filter_by_city(queryset, city):
+    """Keep providers whose normalized city contains the normalized value"""
+    return queryset.filter(city_normalized__contains=normalize_city(city))
+
+
+def filter_by_category(queryset, category_id):
+    """Keep providers offering a category, without joining their categories"""
+    from .models import Provider
+    return queryset.filter(Exists(
+        Provider.categories.through.objects.filter(
+            provider_id=OuterRef('pk'),
+            servicecategory_id=category_id
+        )
+    ))
+
+
+def search_providers(queryset, text):
+    """
+    Filter providers by every search term and annotate their name similarity
+
+    Each term must match one of the business name (substring or fuzzy
+    word match), bio, city or state.
+
+    Returns:
+        QuerySet: Providers annotated with `similarity`
+    """
+    for term in text.split():
+        queryset = queryset.filter(
+            Q(business_name__icontains=term)
+            | Q(business_name__trigram_word_similar=term)
+            | Q(bio__icontains=term)
+            | Q(city_normalized__contains=normalize_city(term))
+            | Q(state__icontains=term)
+        )
+    return queryset.annotate(similarity=TrigramWordSimilarity(text, 'business_name'))
+
+
+class ProviderSearchFilter(BaseFilterBackend):
+    """
+    Trigram search over providers with the `search` query parameter
+
+    Must come after OrderingFilter, as it ranks by name similarity when no
+    ordering is requested.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(SEARCH_PARAM, '').strip()
+        if not text:
+            return queryset
+
+        queryset = search_providers(queryset, text)
+        if not request.query_params.get(ORDERING_PARAM):
+            queryset = queryset.order_by('-similarity', '-ranking_score', 'id')
+        return queryset
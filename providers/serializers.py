@@ -1,10 +1,12 @@
 from rest_framework import serializers
 from .models import ServiceCategory, Provider, ProviderAvailability, ProviderPortfolio
 from users.serializers import UserSerializer
+from utils.images import ImageVariantsField
 
 
 class ServiceCategorySerializer(serializers.ModelSerializer):
     """Serializer for ServiceCategory model"""
+    icon_variants = ImageVariantsField()
     
     class Meta:
         model = ServiceCategory
@@ -24,6 +26,7 @@ class ProviderAvailabilitySerializer(serializers.ModelSerializer):
 
 class ProviderPortfolioSerializer(serializers.ModelSerializer):
     """Serializer for ProviderPortfolio model"""
+    image_variants = ImageVariantsField()
     
     class Meta:
         model = ProviderPortfolio
@@ -47,7 +50,7 @@ class ProviderSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Provider
-        fields = '__all__'
+        exclude = ('geo_cell', 'city_normalized', 'ranking_score')
         read_only_fields = (
             'user', 'average_rating', 'total_reviews',
             'total_bookings', 'completed_bookings', 'created_at', 'updated_at'
@@ -68,6 +71,14 @@ class ProviderListSerializer(serializers.ModelSerializer):
         )
 
 
+class ProviderNearbySerializer(ProviderListSerializer):
+    """Serializer for proximity search results"""
+    distance_km = serializers.FloatField(read_only=True)
+    
+    class Meta(ProviderListSerializer.Meta):
+        fields = ProviderListSerializer.Meta.fields + ('latitude', 'longitude', 'distance_km')
+
+
 class ProviderCreateSerializer(serializers.ModelSerializer):
     """Serializer for creating provider profile"""
     category_ids = serializers.PrimaryKeyRelatedField(
@@ -0,0 +1,74 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from .documents import schedule_rebuild
+from .models import ServiceCategory, Provider, ProviderAvailability, ProviderPortfolio
+from utils.cache import invalidate_tags
+from utils.images import schedule_image_variants
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=ServiceCategory)
+@receiver(post_delete, sender=ServiceCategory)
+def category_changed(sender, **kwargs):
+    """Invalidate cached responses that include categories"""
+    invalidate_tags('categories')
+
+
+@receiver(post_save, sender=Provider)
+@receiver(post_delete, sender=Provider)
+def provider_changed(sender, instance, **kwargs):
+    """Invalidate cached responses that include the provider"""
+    invalidate_tags('providers', f'provider:{instance.pk}')
+
+
+@receiver(m2m_changed, sender=Provider.categories.through)
+def provider_categories_changed(sender, instance, action, pk_set=None, **kwargs):
+    """Invalidate cached responses after a provider's categories change"""
+    if action.startswith('post_') and isinstance(instance, Provider):
+        invalidate_tags('providers', f'provider:{instance.pk}')
+        schedule_rebuild(instance.pk)
+    elif action.startswith('post_'):
+        invalidate_tags('providers', 'categories')
+        schedule_rebuild(*(pk_set or ()))
+
+
+@receiver(post_save, sender=ProviderAvailability)
+@receiver(post_delete, sender=ProviderAvailability)
+@receiver(post_save, sender=ProviderPortfolio)
+@receiver(post_delete, sender=ProviderPortfolio)
+def provider_details_changed(sender, instance, **kwargs):
+    """Invalidate cached responses that nest the provider's schedule or portfolio"""
+    invalidate_tags(f'provider:{instance.provider_id}')
+    schedule_rebuild(instance.provider_id)
+
+
+@receiver(post_save, sender=User)
+def provider_user_changed(sender, instance, created=False, **kwargs):
+    """Invalidate cached responses that nest the provider's user"""
+    if not created:
+        provider_ids = list(Provider.objects.filter(user=instance).values_list('id', flat=True))
+        invalidate_tags(*[f'provider:{pk}' for pk in provider_ids])
+        schedule_rebuild(*provider_ids)
+
+
+@receiver(post_save, sender=Provider)
+@receiver(post_delete, sender=Provider)
+def provider_document_changed(sender, instance, **kwargs):
+    """Rebuild the provider's profile document, or drop it once deleted"""
+    schedule_rebuild(instance.pk)
+
+
+@receiver(post_save, sender=ServiceCategory)
+@receiver(pre_delete, sender=ServiceCategory)
+def category_providers_changed(sender, instance, **kwargs):
+    """Rebuild the profile documents that nest the category"""
+    schedule_rebuild(*Provider.objects.filter(categories=instance).values_list('id', flat=True))
+
+
+@receiver(post_save, sender=ServiceCategory)
+@receiver(post_save, sender=ProviderPortfolio)
+def provider_image_saved(sender, instance, **kwargs):
+    """Render resized variants of new or replaced icons and portfolio images"""
+    schedule_image_variants(instance)
@@ -0,0 +1,15 @@
+from celery import shared_task
+from .documents import build_documents
+from .scoring import refresh_scores
+
+
+@shared_task
+def rebuild_profile_documents(provider_ids):
+    """Rebuild the precomputed profile documents of providers"""
+    return build_documents(provider_ids)
+
+
+@shared_task
+def refresh_provider_scores():
+    """Recompute the ranking score of every provider"""
+    return refresh_scores()
@@ -1,8 +1,18 @@
+import datetime
+import io
+from unittest import mock
 from django.test import TestCase
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.utils import timezone
+from django.db import connection
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
-from .models import ServiceCategory, Provider
+from .documents import build_documents, get_document_key, load_stored_document, render_document
+from .models import ServiceCategory, Provider, ProviderAvailability, ProviderProfileDocument
+from .scoring import compute_score, refresh_scores
+from .search import filter_by_category, filter_by_city, normalize_city, search_providers
 
 User = get_user_model()
 
@@ -84,3 +94,346 @@ class ProviderAPITest(APITestCase):
         
         response = self.client.get('/api/providers/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class ProviderNearbyTest(APITestCase):
+    """Test cases for proximity search"""
+    
+    LOCATIONS = {
+        'Denver': (39.739200, -104.990300),
+        'Boulder': (40.015000, -105.270500),
+        'Colorado Springs': (38.833900, -104.821400),
+        'New York': (40.712800, -74.006000),
+    }
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.category = ServiceCategory.objects.create(name='Plumbing')
+        self.providers = {}
+        for i, (city, (latitude, longitude)) in enumerate(self.LOCATIONS.items()):
+            provider = Provider.objects.create(
+                user=User.objects.create_user(phone=f'+1555100000{i}'),
+                business_name=f'{city} Plumbing',
+                hourly_rate=50.00,
+                city=city,
+                state='CO',
+                country='USA',
+                postal_code='80000',
+                latitude=latitude,
+                longitude=longitude,
+                average_rating=4.0 + i / 10,
+                status='approved'
+            )
+            self.providers[city] = provider
+        self.providers['Denver'].categories.add(self.category)
+        self.providers['Colorado Springs'].categories.add(self.category)
+    
+    def names(self, results):
+        return [item['business_name'].replace(' Plumbing', '') for item in results]
+    
+    def test_radius_search_orders_by_distance(self):
+        """Test radius queries return only providers inside the radius, nearest first"""
+        response = self.client.get('/api/providers/nearby/', {'lat': 39.75, 'lng': -105.0, 'radius': 120})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.names(response.data['results']), ['Denver', 'Boulder', 'Colorado Springs'])
+        distances = [item['distance_km'] for item in response.data['results']]
+        self.assertLess(distances[0], 2)
+        self.assertAlmostEqual(distances[1], 37.43, places=1)
+    
+    def test_nearest_expands_radius(self):
+        """Test k-nearest queries widen the search until k providers are found"""
+        response = self.client.get('/api/providers/nearby/', {'lat': 39.75, 'lng': -105.0, 'limit': 2})
+        self.assertEqual(self.names(response.data), ['Denver', 'Boulder'])
+        
+        response = self.client.get('/api/providers/nearby/', {'lat': 40.0, 'lng': -75.0, 'limit': 2})
+        self.assertEqual(self.names(response.data), ['New York'])
+    
+    def test_filters_combine_with_distance(self):
+        """Test category and rating filters apply to proximity results"""
+        response = self.client.get('/api/providers/nearby/', {
+            'lat': 39.75, 'lng': -105.0, 'radius': 120,
+            'category': self.category.id, 'min_rating': 4.1
+        })
+        self.assertEqual(self.names(response.data['results']), ['Colorado Springs'])
+        
+        response = self.client.get('/api/providers/nearby/', {'lat': 39.75, 'lng': -105.0, 'min_rating': 'abc'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('min_rating', response.data)
+        response = self.client.get('/api/providers/', {'min_rating': 'abc'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_invalid_location(self):
+        """Test missing or out of range parameters are rejected"""
+        for params in ({}, {'lat': 91, 'lng': 0}, {'lat': 0, 'lng': 0, 'radius': 10000}):
+            response = self.client.get('/api/providers/nearby/', params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_geo_cell_follows_location(self):
+        """Test the grid cell is kept in sync with the coordinates"""
+        provider = self.providers['New York']
+        provider.latitude, provider.longitude = 39.739200, -104.990300
+        provider.save(update_fields=['latitude', 'longitude'])
+        
+        provider.refresh_from_db()
+        self.assertEqual(provider.geo_cell, self.providers['Denver'].geo_cell)
+    
+    def test_cells_wrap_across_antimeridian(self):
+        """Test bounding boxes crossing 180 degrees cover both sides"""
+        from .geo import get_bounding_box, get_cell, get_cells
+        cells = get_cells(get_bounding_box(0.0, 179.95, 20))
+        self.assertIn(get_cell(0.0, 179.95), cells)
+        self.assertIn(get_cell(0.0, -179.95), cells)
+
+
+class ProviderSearchTest(APITestCase):
+    """Test cases for trigram provider search"""
+    
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.plumbing = ServiceCategory.objects.create(name='Plumbing')
+        self.painting = ServiceCategory.objects.create(name='Painting')
+        self.providers = []
+        for i, (name, city, bio) in enumerate((
+            ('Rapid Plumbers', 'São Paulo', 'Leaks and pipes'),
+            ('Bright Painters', 'New  York', 'Interior walls'),
+            ('Plumb Perfect', 'Newark', 'Boilers'),
+        )):
+            provider = Provider.objects.create(
+                user=User.objects.create_user(phone=f'+1555200000{i}'),
+                business_name=name,
+                bio=bio,
+                hourly_rate=50.00,
+                city=city,
+                state='NY',
+                country='USA',
+                postal_code='10001',
+                average_rating=4.0 + i / 10,
+                total_reviews=10,
+                status='approved'
+            )
+            provider.categories.add(self.plumbing, self.painting)
+            self.providers.append(provider)
+    
+    def get_names(self, params):
+        response = self.client.get('/api/providers/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [item['business_name'] for item in response.data['results']]
+    
+    def test_city_is_normalized(self):
+        """Test city filters ignore case, accents and extra whitespace"""
+        self.assertEqual(self.providers[0].city_normalized, 'sao paulo')
+        self.assertEqual(normalize_city(' NEW   york '), 'new york')
+        self.assertEqual(self.get_names({'city': 'sao paulo'}), ['Rapid Plumbers'])
+        self.assertEqual(self.get_names({'city': 'New York'}), ['Bright Painters'])
+        self.assertEqual(self.get_names({'city': 'new'}), ['Plumb Perfect', 'Bright Painters'])
+    
+    def test_search_is_fuzzy_and_ranked(self):
+        """Test misspelt names still match and closer names rank first"""
+        self.assertEqual(self.get_names({'search': 'plumb'}), ['Plumb Perfect', 'Rapid Plumbers'])
+        self.assertCountEqual(self.get_names({'search': 'plumbrs'}), ['Rapid Plumbers', 'Plumb Perfect'])
+        self.assertEqual(self.get_names({'search': 'paintrs'}), ['Bright Painters'])
+        self.assertEqual(self.get_names({'search': 'boilers'}), ['Plumb Perfect'])
+        self.assertEqual(
+            self.get_names({'search': 'plumb', 'ordering': 'average_rating'}),
+            ['Rapid Plumbers', 'Plumb Perfect']
+        )
+    
+    def test_category_filter_without_duplicates(self):
+        """Test the category filter uses EXISTS and returns each provider once"""
+        response = self.client.get('/api/providers/', {'category': self.plumbing.id})
+        self.assertEqual(response.data['count'], 3)
+        
+        sql = str(filter_by_category(Provider.objects.all(), self.plumbing.id).query)
+        self.assertIn('EXISTS', sql)
+        self.assertNotIn('DISTINCT', sql)
+    
+    def explain(self, queryset):
+        with connection.cursor() as cursor:
+            # The test tables are tiny, so make the planner show which indexes it can use
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        return queryset.explain()
+    
+    def test_explain_uses_trigram_indexes(self):
+        """Test search and city filters are planned as trigram index scans"""
+        plan = self.explain(search_providers(Provider.objects.all(), 'plumbrs'))
+        for index in (
+            'providers_name_trgm', 'providers_name_upper_trgm', 'providers_bio_upper_trgm',
+            'providers_state_upper_trgm', 'providers_city_trgm'
+        ):
+            self.assertIn(index, plan)
+        
+        plan = self.explain(filter_by_city(Provider.objects.all(), 'York'))
+        self.assertIn('providers_city_trgm', plan)
+        
+        plan = self.explain(filter_by_category(Provider.objects.all(), self.plumbing.id))
+        self.assertNotIn('Seq Scan on providers_categories', plan)
+        self.assertNotIn('Unique', plan)
+
+
+class ProfileDocumentTest(APITestCase):
+    """Test cases for precomputed provider profile documents"""
+    
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.category = ServiceCategory.objects.create(name='Plumbing')
+        self.provider = Provider.objects.create(
+            user=User.objects.create_user(phone='+15552300000'),
+            business_name='Rapid Plumbers',
+            hourly_rate=50.00,
+            city='New York',
+            state='NY',
+            country='USA',
+            postal_code='10001',
+            status='approved'
+        )
+        self.provider.categories.add(self.category)
+        self.url = f'/api/providers/{self.provider.id}/'
+    
+    def test_detail_is_one_lookup(self):
+        """Test a built document is served from the cache alone"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, render_document(Provider.objects.get(pk=self.provider.pk)))
+        self.assertEqual(response.data['categories'][0]['name'], 'Plumbing')
+        
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data['business_name'], 'Rapid Plumbers')
+        
+        cache.delete(get_document_key(self.provider.id))
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data['business_name'], 'Rapid Plumbers')
+        self.assertEqual(self.client.get('/api/providers/999999/').status_code, status.HTTP_404_NOT_FOUND)
+    
+    def test_changes_rebuild_document(self):
+        """Test nested changes are rebuilt after commit"""
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            ProviderAvailability.objects.create(
+                provider=self.provider, day_of_week=0,
+                start_time=datetime.time(9), end_time=datetime.time(17)
+            )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.name = 'Plumbing & Heating'
+            self.category.save()
+        
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.data['availability']), 1)
+        self.assertEqual(response.data['categories'][0]['name'], 'Plumbing & Heating')
+        
+        self.client.force_authenticate(user=self.provider.user)
+        response = self.client.get('/api/providers/me/')
+        self.assertEqual(response.data['id'], self.provider.id)
+    
+    def test_older_builds_never_replace_newer(self):
+        """Test a build finishing late and a reader filling the cache keep the newer document"""
+        self.client.get(self.url)
+        built_at = ProviderProfileDocument.objects.get(pk=self.provider.pk).built_at
+        Provider.objects.filter(pk=self.provider.pk).update(business_name='Renamed')
+        self.assertEqual(build_documents([self.provider.pk]), 1)
+        
+        # A rebuild that started before the last one finishes after it
+        Provider.objects.filter(pk=self.provider.pk).update(business_name='Rapid Plumbers')
+        with mock.patch('providers.documents.timezone.now', return_value=built_at):
+            self.assertEqual(build_documents([self.provider.pk]), 0)
+        self.assertEqual(ProviderProfileDocument.objects.get(pk=self.provider.pk).document['business_name'], 'Renamed')
+        self.assertEqual(self.client.get(self.url).data['business_name'], 'Renamed')
+        
+        # A reader that loaded the row before a rebuild cached a newer one
+        cache.set(get_document_key(self.provider.pk), {'document': {'business_name': 'Newer'}, 'built_at': 0})
+        load_stored_document(self.provider.pk)
+        self.assertEqual(self.client.get(self.url).data['business_name'], 'Newer')
+    
+    def test_sparse_fields_bypass_document(self):
+        """Test sparse fieldsets are still serialized on demand"""
+        response = self.client.get(self.url, {'fields': 'business_name'})
+        self.assertEqual(set(response.data), {'id', 'business_name'})
+    
+    def test_check_command(self):
+        """Test the checker reports and fixes inconsistent documents"""
+        output = io.StringIO()
+        call_command('check_profile_documents', stdout=output)
+        self.assertIn(f'Provider #{self.provider.id}: missing', output.getvalue())
+        
+        self.client.get(self.url)
+        Provider.objects.filter(pk=self.provider.pk).update(business_name='Renamed')
+        output = io.StringIO()
+        call_command('check_profile_documents', '--fix', stdout=output)
+        self.assertIn(f'Provider #{self.provider.id}: stale', output.getvalue())
+        self.assertEqual(ProviderProfileDocument.objects.get(pk=self.provider.pk).document['business_name'], 'Renamed')
+        self.assertEqual(self.client.get(self.url).data['business_name'], 'Renamed')
+        
+        output = io.StringIO()
+        call_command('check_profile_documents', stdout=output)
+        self.assertIn('All profile documents are up to date', output.getvalue())
+
+
+class ProviderScoreTest(APITestCase):
+    """Test cases for the provider ranking score"""
+    
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.providers = [
+            Provider.objects.create(
+                user=User.objects.create_user(phone=f'+155524000{i}'),
+                business_name=name,
+                hourly_rate=50.00,
+                city='New York',
+                state='NY',
+                country='USA',
+                postal_code='10001',
+                average_rating=rating,
+                total_reviews=reviews,
+                status='approved'
+            )
+            for i, (name, rating, reviews) in enumerate((
+                ('One Review', 5.0, 1),
+                ('Many Reviews', 4.8, 300),
+                ('No Reviews', 0, 0),
+            ))
+        ]
+    
+    def test_bayesian_rating_ranks_providers(self):
+        """Test many high reviews outrank a single perfect one"""
+        response = self.client.get('/api/providers/')
+        self.assertEqual(
+            [item['business_name'] for item in response.data['results']],
+            ['Many Reviews', 'One Review', 'No Reviews']
+        )
+        response = self.client.get('/api/providers/', {'ordering': '-average_rating'})
+        self.assertEqual(response.data['results'][0]['business_name'], 'One Review')
+    
+    def test_score_follows_its_inputs(self):
+        """Test saving an input updates the stored score"""
+        provider = self.providers[2]
+        before = Provider.objects.get(pk=provider.pk).ranking_score
+        provider.total_bookings = 4
+        provider.completed_bookings = 4
+        provider.last_completed_at = timezone.now()
+        provider.save(update_fields=['total_bookings', 'completed_bookings', 'last_completed_at'])
+        self.assertGreater(Provider.objects.get(pk=provider.pk).ranking_score, before)
+        
+        later = timezone.now() + datetime.timedelta(days=180)
+        self.assertLess(compute_score(provider, now=later), provider.ranking_score)
+    
+    def test_refresh_scores(self):
+        """Test the periodic refresh rewrites only outdated scores"""
+        Provider.objects.filter(pk=self.providers[0].pk).update(ranking_score=0)
+        self.assertEqual(refresh_scores(), 1)
+        self.assertEqual(
+            Provider.objects.get(pk=self.providers[0].pk).ranking_score,
+            compute_score(self.providers[0])
+        )
+        self.assertEqual(refresh_scores(), 0)
+    
+    def test_explain_uses_score_index(self):
+        """Test the ranked listing is planned on the (status, score) index"""
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        plan = Provider.objects.filter(status='approved').order_by('-ranking_score')[:20].explain()
+        self.assertIn('providers_status_score_idx', plan)
@@ -3,6 +3,7 @@ from .views import (
     ServiceCategoryListView,
     ServiceCategoryDetailView,
     ProviderListView,
+    ProviderNearbyView,
     ProviderDetailView,
     ProviderCreateView,
     ProviderUpdateView,
@@ -22,6 +23,7 @@ urlpatterns = [
     
     # Providers
     path('', ProviderListView.as_view(), name='provider-list'),
+    path('nearby/', ProviderNearbyView.as_view(), name='provider-nearby'),
     path('create/', ProviderCreateView.as_view(), name='provider-create'),
     path('me/', MyProviderProfileView.as_view(), name='my-provider-profile'),
     path('me/update/', ProviderUpdateView.as_view(), name='provider-update'),
@@ -1,5 +1,6 @@
 from rest_framework import generics, status, permissions, filters
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.response import Response
 from django.db.models import Q
 from .models import ServiceCategory, Provider, ProviderAvailability, ProviderPortfolio
@@ -7,18 +8,40 @@ from .serializers import (
     ServiceCategorySerializer,
     ProviderSerializer,
     ProviderListSerializer,
+    ProviderNearbySerializer,
     ProviderCreateSerializer,
     ProviderAvailabilitySerializer,
     ProviderPortfolioSerializer
 )
+from .documents import absolutize_urls, get_document
+from .geo import get_location_params, nearest, within_radius
+from .search import ProviderSearchFilter, filter_by_category, filter_by_city
+from utils.cache import cache_response, result_ids
+from utils.conditional import conditional_response
+from utils.sparse_fields import EXPAND_PARAM, FIELDS_PARAM, SparseFieldsetMixin
+
+
+def provider_tags(data):
+    """Cache tags for the providers in a response"""
+    return [f'provider:{pk}' for pk in result_ids(data)]
+
+
+def provider_detail_tags(view, request, pk):
+    """Conditional GET tags for a provider; deleting one changes its tag too"""
+    return [f'provider:{pk}']
 
 
 # Service Category Views
-class ServiceCategoryListView(generics.ListCreateAPIView):
+class ServiceCategoryListView(SparseFieldsetMixin, generics.ListCreateAPIView):
     """List all service categories or create a new one"""
     queryset = ServiceCategory.objects.filter(is_active=True)
     serializer_class = ServiceCategorySerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    
+    @conditional_response(tags=('categories',))
+    @cache_response(tags=('categories',))
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
 
 
 class ServiceCategoryDetailView(generics.RetrieveUpdateDestroyAPIView):
@@ -29,15 +52,14 @@ class ServiceCategoryDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 
 # Provider Views
-class ProviderListView(generics.ListAPIView):
-    """List all approved providers with search and filters"""
+class ProviderListView(SparseFieldsetMixin, generics.ListAPIView):
+    """List all approved providers with trigram search and filters"""
     queryset = Provider.objects.filter(status='approved')
     serializer_class = ProviderListSerializer
     permission_classes = [permissions.AllowAny]
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ['business_name', 'bio', 'city', 'state']
-    ordering_fields = ['average_rating', 'hourly_rate', 'created_at']
-    ordering = ['-average_rating']
+    filter_backends = [filters.OrderingFilter, ProviderSearchFilter]
+    ordering_fields = ['ranking_score', 'average_rating', 'hourly_rate', 'created_at']
+    ordering = ['-ranking_score']
     
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -45,12 +67,12 @@ class ProviderListView(generics.ListAPIView):
         # Filter by category
         category = self.request.query_params.get('category', None)
         if category:
-            queryset = queryset.filter(categories__id=category)
+            queryset = filter_by_category(queryset, category)
         
         # Filter by location
         city = self.request.query_params.get('city', None)
         if city:
-            queryset = queryset.filter(city__icontains=city)
+            queryset = filter_by_city(queryset, city)
         
         # Filter by availability
         is_available = self.request.query_params.get('is_available', None)
@@ -60,16 +82,85 @@ class ProviderListView(generics.ListAPIView):
         # Filter by rating
         min_rating = self.request.query_params.get('min_rating', None)
         if min_rating:
-            queryset = queryset.filter(average_rating__gte=float(min_rating))
+            try:
+                min_rating = float(min_rating)
+            except ValueError:
+                raise ValidationError({'min_rating': 'A number is required.'})
+            queryset = queryset.filter(average_rating__gte=min_rating)
+        
+        return queryset
+    
+    @cache_response(tags=('providers', 'categories'), item_tags=provider_tags)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+
+class ProviderNearbyView(SparseFieldsetMixin, generics.ListAPIView):
+    """
+    Find approved providers near a location, nearest first
+    
+    With `radius` (km) all providers within the radius are returned, paginated.
+    Otherwise the `limit` nearest providers are returned.
+    """
+    serializer_class = ProviderNearbySerializer
+    permission_classes = [permissions.AllowAny]
+    
+    def get_queryset(self):
+        queryset = Provider.objects.filter(status='approved').prefetch_related('categories').select_related('user')
+        
+        category = self.request.query_params.get('category', None)
+        if category:
+            queryset = filter_by_category(queryset, category)
+        
+        is_available = self.request.query_params.get('is_available', None)
+        if is_available:
+            queryset = queryset.filter(is_available=is_available.lower() == 'true')
+        
+        min_rating = self.request.query_params.get('min_rating', None)
+        if min_rating:
+            try:
+                min_rating = float(min_rating)
+            except ValueError:
+                raise ValidationError({'min_rating': 'A number is required.'})
+            queryset = queryset.filter(average_rating__gte=min_rating)
+        
+        return queryset
+    
+    def list(self, request, *args, **kwargs):
+        try:
+            location = get_location_params(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        if location['radius_km'] is None:
+            providers = nearest(
+                self.get_queryset(), location['latitude'], location['longitude'], location['limit']
+            )
+            return Response(self.get_serializer(providers, many=True).data)
         
-        return queryset.distinct()
+        queryset = within_radius(
+            self.get_queryset(), location['latitude'], location['longitude'], location['radius_km']
+        )
+        page = self.paginate_queryset(queryset)
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
 
 
-class ProviderDetailView(generics.RetrieveAPIView):
-    """Retrieve provider details"""
+class ProviderDetailView(SparseFieldsetMixin, generics.RetrieveAPIView):
+    """Retrieve provider details from the precomputed profile document"""
     queryset = Provider.objects.all()
     serializer_class = ProviderSerializer
     permission_classes = [permissions.AllowAny]
+    
+    @conditional_response(tags=('categories',), item_tags=provider_detail_tags)
+    def retrieve(self, request, *args, **kwargs):
+        # Sparse fieldsets are serialized on demand
+        if FIELDS_PARAM in request.query_params or EXPAND_PARAM in request.query_params:
+            return super().retrieve(request, *args, **kwargs)
+        
+        document = get_document(kwargs['pk'])
+        if document is None:
+            raise NotFound()
+        return Response(absolutize_urls(document, request))
 
 
 class ProviderCreateView(generics.CreateAPIView):
@@ -105,12 +196,16 @@ class ProviderUpdateView(generics.UpdateAPIView):
 
 
 class MyProviderProfileView(generics.RetrieveAPIView):
-    """Get current user's provider profile"""
+    """Get current user's provider profile from its precomputed document"""
     serializer_class = ProviderSerializer
     permission_classes = [permissions.IsAuthenticated]
     
-    def get_object(self):
-        return self.request.user.provider_profile
+    def retrieve(self, request, *args, **kwargs):
+        provider_id = Provider.objects.filter(user=request.user).values_list('id', flat=True).first()
+        document = get_document(provider_id) if provider_id is not None else None
+        if document is None:
+            raise NotFound('Provider profile not found')
+        return Response(absolutize_urls(document, request))
 
 
 # Provider Availability Views
@@ -0,0 +1,25 @@
+# Generated by Django 5.0.1 on 2026-10-17 05:01
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0007_keyset_indexes'),
+        ('providers', '0006_provider_ranking_score'),
+        ('reviews', '0002_image_variants'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['provider', '-created_at', '-id'], name='reviews_provider_newest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['customer', '-created_at', '-id'], name='reviews_customer_newest_idx'),
+        ),
+    ]
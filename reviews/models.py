@@ -3,6 +3,7 @@ from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, MaxValueValidator
 from providers.models import Provider
 from bookings.models import Booking
+from utils.cache import invalidate_tags
 
 User = get_user_model()
 
@@ -60,6 +61,11 @@ class Review(models.Model):
         db_table = 'reviews'
         ordering = ['-created_at']
         unique_together = ['booking', 'customer']
+        indexes = [
+            # Keyset pages of a provider's and a customer's reviews (see utils.pagination)
+            models.Index(fields=['provider', '-created_at', '-id'], name='reviews_provider_newest_idx'),
+            models.Index(fields=['customer', '-created_at', '-id'], name='reviews_customer_newest_idx'),
+        ]
     
     def __str__(self):
         return f"Review by {self.customer.email} for {self.provider.business_name} - {self.rating} stars"
@@ -69,19 +75,36 @@ class Review(models.Model):
         super().save(*args, **kwargs)
         
         # Update provider's average rating
-        if is_new or 'rating' in kwargs.get('update_fields', []):
+        update_fields = kwargs.get('update_fields')
+        if is_new or update_fields is None or {'rating', 'is_published'} & set(update_fields):
             self.update_provider_rating()
     
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        self.update_provider_rating()
+        return result
+    
     def update_provider_rating(self):
-        """Update provider's average rating and review count"""
-        reviews = Review.objects.filter(provider=self.provider, is_published=True)
-        total_reviews = reviews.count()
+        """Update provider's and its services' average rating and review count"""
+        from services.models import Service
+        
+        stats = Review.objects.filter(provider=self.provider, is_published=True).aggregate(
+            average_rating=models.Avg('rating'),
+            total_reviews=models.Count('id')
+        )
+        average_rating = round(stats['average_rating'] or 0, 2)
+        total_reviews = stats['total_reviews']
+        
+        self.provider.average_rating = average_rating
+        self.provider.total_reviews = total_reviews
+        self.provider.save()
         
-        if total_reviews > 0:
-            average_rating = sum(r.rating for r in reviews) / total_reviews
-            self.provider.average_rating = round(average_rating, 2)
-            self.provider.total_reviews = total_reviews
-            self.provider.save()
+        Service.objects.filter(provider=self.provider).update(
+            average_rating=average_rating,
+            total_reviews=total_reviews
+        )
+        # The update skips the service signals; ratings filter and order service lists
+        invalidate_tags('services')
 
 
 class ReviewResponse(models.Model):
@@ -103,6 +126,7 @@ class ReviewImage(models.Model):
     """Images attached to reviews"""
     review = models.ForeignKey(Review, on_delete=models.CASCADE, related_name='images')
     image = models.ImageField(upload_to='review_images/')
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     caption = models.CharField(max_length=255, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
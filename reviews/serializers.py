@@ -1,10 +1,12 @@
 from rest_framework import serializers
 from .models import Review, ReviewResponse, ReviewImage, ReviewHelpful
 from users.serializers import UserSerializer
+from utils.images import ImageVariantsField
 
 
 class ReviewImageSerializer(serializers.ModelSerializer):
     """Serializer for ReviewImage model"""
+    image_variants = ImageVariantsField()
     
     class Meta:
         model = ReviewImage
@@ -36,6 +38,9 @@ class ReviewSerializer(serializers.ModelSerializer):
             'customer', 'provider', 'booking', 'is_verified',
             'helpful_count', 'created_at', 'updated_at'
         )
+        expandable_fields = {
+            'provider': ('providers.serializers.ProviderListSerializer', {'read_only': True}),
+        }
 
 
 class ReviewCreateSerializer(serializers.ModelSerializer):
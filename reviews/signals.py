@@ -0,0 +1,10 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from .models import ReviewImage
+from utils.images import schedule_image_variants
+
+
+@receiver(post_save, sender=ReviewImage)
+def review_image_saved(sender, instance, **kwargs):
+    """Render resized variants of new or replaced review images"""
+    schedule_image_variants(instance)
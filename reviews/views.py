@@ -10,9 +10,11 @@ from .serializers import (
     ReviewResponseSerializer,
     ReviewImageSerializer
 )
+from utils.pagination import OptionalKeysetPagination
+from utils.sparse_fields import SparseFieldsetMixin
 
 
-class ReviewListView(generics.ListAPIView):
+class ReviewListView(SparseFieldsetMixin, generics.ListAPIView):
     """List all reviews with filters"""
     serializer_class = ReviewSerializer
     permission_classes = [permissions.AllowAny]
@@ -20,6 +22,7 @@ class ReviewListView(generics.ListAPIView):
     search_fields = ['title', 'comment']
     ordering_fields = ['rating', 'created_at', 'helpful_count']
     ordering = ['-created_at']
+    pagination_class = OptionalKeysetPagination
     
     def get_queryset(self):
         queryset = Review.objects.filter(is_published=True)
@@ -42,7 +45,7 @@ class ReviewListView(generics.ListAPIView):
         return queryset
 
 
-class ReviewDetailView(generics.RetrieveAPIView):
+class ReviewDetailView(SparseFieldsetMixin, generics.RetrieveAPIView):
     """Retrieve review details"""
     queryset = Review.objects.filter(is_published=True)
     serializer_class = ReviewSerializer
@@ -82,19 +85,21 @@ class ReviewDeleteView(generics.DestroyAPIView):
         return Review.objects.filter(customer=self.request.user)
 
 
-class MyReviewsView(generics.ListAPIView):
+class MyReviewsView(SparseFieldsetMixin, generics.ListAPIView):
     """List reviews created by authenticated user"""
     serializer_class = ReviewSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = OptionalKeysetPagination
     
     def get_queryset(self):
         return Review.objects.filter(customer=self.request.user)
 
 
-class ProviderReviewsView(generics.ListAPIView):
+class ProviderReviewsView(SparseFieldsetMixin, generics.ListAPIView):
     """List reviews for a specific provider"""
     serializer_class = ReviewSerializer
     permission_classes = [permissions.AllowAny]
+    pagination_class = OptionalKeysetPagination
     
     def get_queryset(self):
         provider_id = self.kwargs.get('provider_id')
@@ -1 +1,6 @@
 # ServiceHub Backend Package
+
+# Load the Celery app so shared tasks use its configuration
+from .celery import app as celery_app
+
+__all__ = ('celery_app',)
@@ -11,8 +11,9 @@ app = Celery('servicehub_backend')
 # Load config from Django settings with CELERY namespace
 app.config_from_object('django.conf:settings', namespace='CELERY')
 
-# Auto-discover tasks in all installed apps
+# Auto-discover tasks in all installed apps and the shared utils package
 app.autodiscover_tasks()
+app.autodiscover_tasks(['utils'])
 
 
 @app.task(bind=True)
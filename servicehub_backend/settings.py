@@ -25,6 +25,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     
     # Third-party apps
     'rest_framework',
@@ -46,6 +47,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'utils.query_budget.QueryBudgetMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -56,6 +58,15 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Query budgets (see utils.query_budget): record the SQL of every request in
+# development, flag N+1 query shapes and, when strict, fail requests that run
+# more queries than their view's budget
+QUERY_BUDGET_ENABLED = os.getenv('QUERY_BUDGET_ENABLED', str(DEBUG)) == 'True'
+QUERY_BUDGET_STRICT = os.getenv('QUERY_BUDGET_STRICT', 'False') == 'True'
+QUERY_BUDGET_REPEAT_THRESHOLD = int(os.getenv('QUERY_BUDGET_REPEAT_THRESHOLD', '3'))
+# Shared by every process, for the query_budget_report command
+QUERY_BUDGET_STATS_FILE = os.getenv('QUERY_BUDGET_STATS_FILE', str(BASE_DIR / 'query_budget_stats.jsonl'))
+
 ROOT_URLCONF = 'servicehub_backend.urls'
 
 TEMPLATES = [
@@ -178,6 +189,33 @@ else:
         }
     }
 
+# Anonymous catalog responses are cached for N seconds (invalidated by tags on change)
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', '300'))
+
+# Service view counts are buffered in the cache and written every N seconds
+SERVICE_VIEW_FLUSH_INTERVAL = int(os.getenv('SERVICE_VIEW_FLUSH_INTERVAL', '60'))
+
+# Featured/popular rankings are recomputed every N seconds when stale
+SERVICE_RANKINGS_REFRESH_INTERVAL = int(os.getenv('SERVICE_RANKINGS_REFRESH_INTERVAL', '60'))
+
+# "Customers also booked" recommendations are rebuilt from booking history every N seconds
+SERVICE_RECOMMENDATIONS_REBUILD_INTERVAL = int(os.getenv('SERVICE_RECOMMENDATIONS_REBUILD_INTERVAL', str(60 * 60 * 24)))
+
+# Category price statistics are recomputed into their rollup table every N seconds
+CATEGORY_PRICE_STATS_REFRESH_INTERVAL = int(os.getenv('CATEGORY_PRICE_STATS_REFRESH_INTERVAL', '3600'))
+
+# Pending booking counter changes are applied to providers and services every N seconds
+BOOKING_COUNTER_FLUSH_INTERVAL = int(os.getenv('BOOKING_COUNTER_FLUSH_INTERVAL', '30'))
+
+# Provider ranking scores are recomputed every N seconds so their recency decays
+PROVIDER_SCORE_REFRESH_INTERVAL = int(os.getenv('PROVIDER_SCORE_REFRESH_INTERVAL', str(60 * 60 * 24)))
+
+# Confirmed bookings starting within N hours are reminded by SMS/email, checked every N seconds
+BOOKING_REMINDER_LEAD_HOURS = int(os.getenv('BOOKING_REMINDER_LEAD_HOURS', '24'))
+BOOKING_REMINDER_INTERVAL = int(os.getenv('BOOKING_REMINDER_INTERVAL', '300'))
+# At most N reminders are sent at the same time
+BOOKING_REMINDER_CONCURRENCY = int(os.getenv('BOOKING_REMINDER_CONCURRENCY', '8'))
+
 # CORS Settings (for React frontend)
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",  # Create React App default
@@ -189,6 +227,7 @@ CORS_ALLOWED_ORIGINS = [
     "http://localhost:6397",
 ]
 CORS_ALLOW_CREDENTIALS = True
+CORS_EXPOSE_HEADERS = ['ETag', 'Last-Modified']
 CORS_ALLOW_ALL_ORIGINS = DEBUG  # Allow all origins in development
 
 # Channels Configuration
@@ -231,3 +270,35 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+# Like the cache, tasks need no Redis in development: they run in-process when queued
+CELERY_TASK_ALWAYS_EAGER = os.getenv('CELERY_TASK_ALWAYS_EAGER', str(DEBUG)) == 'True'
+CELERY_BEAT_SCHEDULE = {
+    'flush-service-view-counts': {
+        'task': 'services.tasks.flush_service_view_counts',
+        'schedule': SERVICE_VIEW_FLUSH_INTERVAL,
+    },
+    'refresh-service-rankings': {
+        'task': 'services.tasks.refresh_service_rankings',
+        'schedule': SERVICE_RANKINGS_REFRESH_INTERVAL,
+    },
+    'rebuild-service-recommendations': {
+        'task': 'services.tasks.rebuild_service_recommendations',
+        'schedule': SERVICE_RECOMMENDATIONS_REBUILD_INTERVAL,
+    },
+    'refresh-category-price-stats': {
+        'task': 'services.tasks.refresh_category_price_stats',
+        'schedule': CATEGORY_PRICE_STATS_REFRESH_INTERVAL,
+    },
+    'flush-booking-counters': {
+        'task': 'bookings.tasks.flush_booking_counters',
+        'schedule': BOOKING_COUNTER_FLUSH_INTERVAL,
+    },
+    'refresh-provider-scores': {
+        'task': 'providers.tasks.refresh_provider_scores',
+        'schedule': PROVIDER_SCORE_REFRESH_INTERVAL,
+    },
+    'send-booking-reminders': {
+        'task': 'bookings.tasks.send_booking_reminders',
+        'schedule': BOOKING_REMINDER_INTERVAL,
+    },
+}
@@ -23,7 +23,7 @@ class ServiceAdmin(admin.ModelAdmin):
     list_display = ('title', 'provider', 'category', 'pricing_type', 'base_price', 'status', 'views_count', 'bookings_count', 'created_at')
     list_filter = ('status', 'pricing_type', 'category', 'is_remote', 'is_onsite', 'created_at')
     search_fields = ('title', 'description', 'provider__business_name')
-    readonly_fields = ('views_count', 'bookings_count', 'created_at', 'updated_at')
+    readonly_fields = ('average_rating', 'total_reviews', 'views_count', 'bookings_count', 'created_at', 'updated_at')
     filter_horizontal = ()
     inlines = [ServiceImageInline, ServiceFAQInline]
     autocomplete_fields = ['provider', 'category']
@@ -42,7 +42,7 @@ class ServiceAdmin(admin.ModelAdmin):
             'fields': ('status', 'min_booking_hours', 'max_bookings_per_day')
         }),
         ('Statistics', {
-            'fields': ('views_count', 'bookings_count', 'created_at', 'updated_at'),
+            'fields': ('average_rating', 'total_reviews', 'views_count', 'bookings_count', 'created_at', 'updated_at'),
             'classes': ('collapse',)
         }),
     )
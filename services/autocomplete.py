@@ -0,0 +1,221 @@
+"""
+In-memory prefix index for search-as-you-type
+
+Active service titles, active category names and approved provider business
+names are normalized and stored in a sorted list per kind once per word
+start ("leak repair" is indexed as "leak repair" and "repair"), so a prefix
+lookup is a bisect plus a short scan of the requested kinds and never
+touches the database.
+
+Every process keeps its own copy. Model changes are appended to a shared
+change log in the cache (a sequence counter plus one key per change); each
+process replays the log before answering and reloads only the changed
+objects. If the log has a gap (evicted keys) or is too far ahead, the index
+is rebuilt from scratch instead. Replays change copies of the lists and swap
+them in, so searches never see a list being modified and need no lock.
+"""
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from django.core.cache import cache
+
+KEY_PREFIX = 'autocomplete'
+SEQUENCE_KEY = f'{KEY_PREFIX}:sequence'
+CHANGE_TIMEOUT = 60 * 60
+MAX_REPLAY = 1000  # Rebuild instead of replaying more changes than this
+SYNC_INTERVAL = 1.0  # Seconds between change log checks
+KINDS = ('service', 'category', 'provider')
+
+
+def normalize(text):
+    """Lowercase, strip accents and collapse punctuation to single spaces"""
+    text = unicodedata.normalize('NFKD', text or '').encode('ascii', 'ignore').decode()
+    return ' '.join(re.findall(r'[a-z0-9]+', text.lower()))
+
+
+def get_keys(label):
+    """Get the index keys of a label, one per word start"""
+    words = normalize(label).split(' ')
+    return [' '.join(words[i:]) for i in range(len(words)) if words[i]]
+
+
+def load_labels(kind, ids=None):
+    """
+    Load the indexable labels of a kind from the database
+
+    Args:
+        kind: 'service', 'category' or 'provider'
+        ids: Optional IDs to load (all objects if None)
+
+    Returns:
+        dict: ID to label, only for objects that belong in the index
+    """
+    from providers.models import Provider, ServiceCategory
+    from .models import Service
+
+    if kind == 'service':
+        queryset = Service.objects.filter(status='active').values_list('id', 'title')
+    elif kind == 'category':
+        queryset = ServiceCategory.objects.filter(is_active=True).values_list('id', 'name')
+    else:
+        queryset = Provider.objects.filter(status='approved').values_list('id', 'business_name')
+    if ids is not None:
+        queryset = queryset.filter(pk__in=ids)
+    return dict(queryset.iterator())
+
+
+def record_changes(kind, ids):
+    """Append changed objects to the shared change log"""
+    ids = list(ids)
+    if not ids:
+        return
+    cache.add(SEQUENCE_KEY, 0, timeout=None)
+    last = cache.incr(SEQUENCE_KEY, len(ids))
+    index.dirty = True
+    if len(ids) > MAX_REPLAY:
+        # Too many to replay; the gap in the log makes every process rebuild
+        return
+    first = last - len(ids) + 1
+    cache.set_many({
+        f'{KEY_PREFIX}:change:{sequence}': (kind, pk)
+        for sequence, pk in enumerate(ids, start=first)
+    }, timeout=CHANGE_TIMEOUT)
+
+
+def record_change(kind, pk):
+    """Append a changed object to the shared change log"""
+    record_changes(kind, [pk])
+
+
+class PrefixIndex:
+    """Sorted (key, id) entries per kind searched with bisect"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = None  # Kind to sorted (key, id) entries
+        self.labels = {}  # (kind, id) to (label, length of its normalized form)
+        self.sequence = 0
+        self.checked_at = 0
+        self.dirty = False
+
+    def build(self):
+        """Rebuild the index from the database"""
+        # Read the sequence first so changes made during the build are replayed
+        sequence = cache.get(SEQUENCE_KEY) or 0
+        labels = {}
+        entries = {}
+        for kind in KINDS:
+            kind_entries = entries[kind] = []
+            for pk, label in load_labels(kind).items():
+                keys = get_keys(label)
+                labels[(kind, pk)] = (label, len(keys[0]) if keys else 0)
+                kind_entries.extend((key, pk) for key in keys)
+            kind_entries.sort()
+        self.entries, self.labels, self.sequence = entries, labels, sequence
+
+    @staticmethod
+    def remove(entries, labels, kind, pk):
+        label, _ = labels.pop((kind, pk), (None, 0))
+        if label is None:
+            return
+        kind_entries = entries[kind]
+        for key in get_keys(label):
+            position = bisect_left(kind_entries, (key, pk))
+            if position < len(kind_entries) and kind_entries[position] == (key, pk):
+                del kind_entries[position]
+
+    @staticmethod
+    def add(entries, labels, kind, pk, label):
+        keys = get_keys(label)
+        labels[(kind, pk)] = (label, len(keys[0]) if keys else 0)
+        for key in keys:
+            insort(entries[kind], (key, pk))
+
+    def sync(self, force=False):
+        """
+        Bring the index up to date with the shared change log
+
+        Args:
+            force: Check the change log even if it was checked recently
+        """
+        now = time.monotonic()
+        if self.entries is not None and not force and not self.dirty and now - self.checked_at < SYNC_INTERVAL:
+            return
+
+        with self.lock:
+            self.checked_at = now
+            self.dirty = False
+            if self.entries is None:
+                self.build()
+                return
+
+            sequence = cache.get(SEQUENCE_KEY) or 0
+            if sequence == self.sequence:
+                return
+            if sequence < self.sequence or sequence - self.sequence > MAX_REPLAY:
+                self.build()
+                return
+
+            change_keys = [f'{KEY_PREFIX}:change:{n}' for n in range(self.sequence + 1, sequence + 1)]
+            changes = cache.get_many(change_keys)
+            if len(changes) != len(change_keys):
+                self.build()
+                return
+
+            changed = {}
+            for kind, pk in changes.values():
+                changed.setdefault(kind, set()).add(pk)
+            # Searches keep reading the current lists while the copies change
+            entries = dict(self.entries)
+            labels = dict(self.labels)
+            for kind, ids in changed.items():
+                entries[kind] = list(entries[kind])
+                new_labels = load_labels(kind, ids)
+                for pk in ids:
+                    self.remove(entries, labels, kind, pk)
+                    if pk in new_labels:
+                        self.add(entries, labels, kind, pk, new_labels[pk])
+            self.entries, self.labels, self.sequence = entries, labels, sequence
+
+    def search(self, prefix, limit=10, kinds=KINDS):
+        """
+        Find labels with a word starting with the prefix
+
+        Matches at the start of the label come first, then shorter labels.
+
+        Returns:
+            list: Dicts with type, id and label
+        """
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        self.sync()
+
+        entries, labels = self.entries, self.labels
+        matches = {}
+        for kind in kinds:
+            kind_entries = entries.get(kind, [])
+            found = 0
+            position = bisect_left(kind_entries, (prefix,))
+            # Scan a few times the limit so whole-label matches can outrank word matches
+            while position < len(kind_entries) and found < limit * 5:
+                key, pk = kind_entries[position]
+                if not key.startswith(prefix):
+                    break
+                label, length = labels.get((kind, pk), (None, 0))
+                if label is not None and (kind, pk) not in matches:
+                    # The first key of a label is the whole normalized label
+                    matches[(kind, pk)] = (len(key) != length, len(label), label)
+                    found += 1
+                position += 1
+
+        ranked = sorted(matches.items(), key=lambda item: item[1])[:limit]
+        return [
+            {'type': kind, 'id': pk, 'label': rank[2]}
+            for (kind, pk), rank in ranked
+        ]
+
+
+index = PrefixIndex()
@@ -0,0 +1,193 @@
+"""
+Bulk service import
+
+Rows are read lazily from a CSV or JSON Lines stream and handled in
+batches. Each batch is validated row by row against categories loaded once
+per import, then written with a single INSERT ... ON CONFLICT (provider,
+external_id) DO UPDATE, so new services are created and known ones updated
+in one statement. Which rows it updated is read back from their xmax in the
+same transaction, so a concurrent import of the same rows cannot skew the
+counts. The FAQs of updated services are replaced with one DELETE and one
+bulk INSERT per batch.
+
+Invalid rows are reported with their row number and skipped; they never
+abort the rest of the import. An imported row replaces every importable
+field of an existing service, falling back to the model defaults for
+omitted columns.
+"""
+import csv
+import json
+from django.db import transaction
+from django.db.models import BooleanField
+from django.db.models.expressions import RawSQL
+from rest_framework.exceptions import ValidationError
+from providers.models import ServiceCategory
+from utils.cache import invalidate_tags
+from .autocomplete import record_changes
+from .models import Service, ServiceFAQ
+from .rankings import mark_rankings_stale
+from .search import update_search_vectors
+from .serializers import ServiceImportSerializer
+
+BATCH_SIZE = 1000
+FORMATS = ('csv', 'jsonl')
+
+# Fields overwritten when a row matches an existing service
+UPDATE_FIELDS = [
+    'category', 'title', 'description', 'short_description', 'pricing_type',
+    'base_price', 'hourly_rate', 'duration_minutes', 'is_remote', 'is_onsite',
+    'status', 'min_booking_hours', 'max_bookings_per_day', 'updated_at'
+]
+
+
+def get_format(filename):
+    """Guess the import format from a file name"""
+    if filename.lower().endswith('.csv'):
+        return 'csv'
+    if filename.lower().endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    return None
+
+
+def read_rows(lines, format):
+    """
+    Parse rows from a text stream
+
+    CSV files have a header row, leave optional columns empty and put the
+    FAQs in a `faqs` column as a JSON array. JSON Lines files have one
+    object per line.
+
+    Yields:
+        tuple: (row number, data or None, parse error or None)
+    """
+    if format == 'csv':
+        for number, row in enumerate(csv.DictReader(lines), start=1):
+            data = {key: value for key, value in row.items() if key and value not in ('', None)}
+            if 'faqs' in data:
+                try:
+                    data['faqs'] = json.loads(data['faqs'])
+                except ValueError:
+                    yield number, None, {'faqs': ['Invalid JSON']}
+                    continue
+            yield number, data, None
+        return
+
+    number = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            data = json.loads(line)
+        except ValueError:
+            yield number, None, {'non_field_errors': ['Invalid JSON']}
+            continue
+        if not isinstance(data, dict):
+            yield number, None, {'non_field_errors': ['Expected a JSON object']}
+            continue
+        yield number, data, None
+
+
+def save_batch(provider, rows):
+    """
+    Upsert a batch of validated rows and their FAQs
+
+    Returns:
+        tuple: (created count, updated count)
+    """
+    services = []
+    for row in rows:
+        fields = {key: value for key, value in row.items() if key not in ('category', 'faqs')}
+        services.append(Service(
+            provider=provider,
+            category_id=row['category'],
+            average_rating=provider.average_rating,
+            total_reviews=provider.total_reviews,
+            **fields
+        ))
+
+    with transaction.atomic():
+        services = Service.objects.bulk_create(
+            services,
+            update_conflicts=True,
+            unique_fields=['provider', 'external_id'],
+            update_fields=UPDATE_FIELDS
+        )
+        service_ids = [service.pk for service in services]
+        # Rows the upsert updated hold its row lock in xmax, inserted ones have none
+        updated_ids = set(
+            Service.objects.filter(pk__in=service_ids)
+            .alias(inserted=RawSQL('xmax = 0', (), output_field=BooleanField()))
+            .filter(inserted=False)
+            .values_list('pk', flat=True)
+        )
+        faq_ids = [
+            service.pk for service, row in zip(services, rows)
+            if service.pk in updated_ids and 'faqs' in row
+        ]
+        if faq_ids:
+            ServiceFAQ.objects.filter(service_id__in=faq_ids).delete()
+        ServiceFAQ.objects.bulk_create([
+            ServiceFAQ(service=service, **faq)
+            for service, row in zip(services, rows)
+            for faq in row.get('faqs', [])
+        ])
+        update_search_vectors(Service.objects.filter(pk__in=service_ids))
+
+    # bulk_create skips the model signals, so apply their side effects here
+    invalidate_tags('services', *[f'service:{pk}' for pk in updated_ids])
+    mark_rankings_stale()
+    transaction.on_commit(lambda: record_changes('service', service_ids))
+    return len(rows) - len(updated_ids), len(updated_ids)
+
+
+def import_services(provider, lines, format, batch_size=BATCH_SIZE):
+    """
+    Import services for a provider from a CSV or JSON Lines stream
+
+    Args:
+        provider: Provider the services belong to
+        lines: Text stream or iterable of lines
+        format: 'csv' or 'jsonl'
+        batch_size: Rows validated and written together
+
+    Returns:
+        dict: created, updated and failed counts, and the errors of each
+            failed row
+    """
+    # One serializer validates every row, so its fields are only built once
+    serializer = ServiceImportSerializer(context={
+        'category_ids': set(ServiceCategory.objects.filter(is_active=True).values_list('id', flat=True))
+    })
+    result = {'created': 0, 'updated': 0, 'failed': 0, 'errors': []}
+    seen = set()
+    batch = []
+
+    def flush():
+        created, updated = save_batch(provider, batch)
+        result['created'] += created
+        result['updated'] += updated
+        batch.clear()
+
+    for number, data, errors in read_rows(lines, format):
+        if errors is None:
+            try:
+                validated_data = serializer.run_validation(data)
+            except ValidationError as e:
+                errors = e.detail
+            else:
+                if validated_data['external_id'] in seen:
+                    errors = {'external_id': ['Duplicate external_id in this import']}
+                else:
+                    seen.add(validated_data['external_id'])
+                    batch.append(validated_data)
+
+        if errors is not None:
+            result['failed'] += 1
+            result['errors'].append({'row': number, 'errors': errors})
+        if len(batch) >= batch_size:
+            flush()
+
+    if batch:
+        flush()
+    return result
@@ -0,0 +1,90 @@
+"""
+Facet counts for the services catalog
+
+All facets are computed from a single GROUP BY over the filtered services:
+the query groups by every facet dimension at once (category, pricing type,
+remote/onsite and price bucket) and the per-facet counts are summed from
+those rows in Python. The number of groups is bounded by the product of the
+facet sizes, not by the number of services.
+"""
+from collections import Counter
+from django.db.models import Case, Count, IntegerField, Value, When
+
+# Upper bounds of the price buckets; the last bucket is open-ended
+PRICE_BUCKET_BOUNDS = (50, 100, 250, 500)
+
+
+def get_price_buckets():
+    """
+    Get the price buckets in order
+
+    Returns:
+        list: Dicts with key, min and max (None for the open-ended bucket)
+    """
+    lows = (0,) + PRICE_BUCKET_BOUNDS
+    highs = PRICE_BUCKET_BOUNDS + (None,)
+    return [
+        {'key': f'{low}-{high}' if high is not None else f'{low}+', 'min': low, 'max': high}
+        for low, high in zip(lows, highs)
+    ]
+
+
+def price_bucket_expression():
+    """Annotate each service with the index of its price bucket"""
+    return Case(
+        *[When(base_price__lt=bound, then=Value(i)) for i, bound in enumerate(PRICE_BUCKET_BOUNDS)],
+        default=Value(len(PRICE_BUCKET_BOUNDS)),
+        output_field=IntegerField()
+    )
+
+
+def compute_facets(queryset):
+    """
+    Count the services of a queryset per facet value in one query
+
+    Args:
+        queryset: Filtered service queryset
+
+    Returns:
+        dict: Total and counts per category, pricing type, location and price
+    """
+    from .models import Service
+
+    rows = (
+        queryset.order_by()
+        .annotate(price_bucket=price_bucket_expression())
+        .values('category_id', 'category__name', 'pricing_type', 'is_remote', 'is_onsite', 'price_bucket')
+        .annotate(count=Count('id'))
+    )
+
+    categories = {}
+    pricing_types = Counter()
+    locations = Counter()
+    price_buckets = Counter()
+    total = 0
+    for row in rows:
+        count = row['count']
+        total += count
+        category = categories.setdefault(
+            row['category_id'],
+            {'id': row['category_id'], 'name': row['category__name'], 'count': 0}
+        )
+        category['count'] += count
+        pricing_types[row['pricing_type']] += count
+        locations['remote'] += count if row['is_remote'] else 0
+        locations['onsite'] += count if row['is_onsite'] else 0
+        price_buckets[row['price_bucket']] += count
+
+    return {
+        'total': total,
+        'category': sorted(categories.values(), key=lambda item: (-item['count'], item['name'])),
+        'pricing_type': [
+            {'value': value, 'label': label, 'count': pricing_types[value]}
+            for value, label in Service.PRICING_TYPE_CHOICES
+        ],
+        'location': {'remote': locations['remote'], 'onsite': locations['onsite']},
+        'price': [
+            dict(bucket, count=price_buckets[i])
+            for i, bucket in enumerate(get_price_buckets())
+        ],
+    }
@@ -0,0 +1,45 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from utils.images import IMAGE_FIELDS, has_current_variants, update_image_variants
+from utils.tasks import generate_image_variants
+
+
+class Command(BaseCommand):
+    help = 'Render missing or outdated image variants for existing media'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--model',
+            action='append',
+            dest='models',
+            choices=sorted(IMAGE_FIELDS),
+            help='Only backfill this model (can be repeated)'
+        )
+        parser.add_argument(
+            '--sync',
+            action='store_true',
+            help='Render in this process instead of queueing Celery tasks'
+        )
+
+    def handle(self, *args, **options):
+        for model_label in options['models'] or IMAGE_FIELDS:
+            model = apps.get_model(model_label)
+            image_field, variants_field = IMAGE_FIELDS[model_label]
+            queryset = model.objects.exclude(**{image_field: ''}).exclude(**{f'{image_field}__isnull': True})
+
+            count = 0
+            for instance in queryset.only('pk', image_field, variants_field).iterator():
+                if has_current_variants(instance):
+                    continue
+                if options['sync']:
+                    try:
+                        update_image_variants(model_label, instance.pk)
+                    except (OSError, ValueError) as e:
+                        self.stderr.write(f'{model_label} #{instance.pk}: {e}')
+                        continue
+                else:
+                    generate_image_variants.delay(model_label, instance.pk)
+                count += 1
+
+            action = 'Rendered' if options['sync'] else 'Queued'
+            self.stdout.write(f'{action} variants for {count} {model._meta.verbose_name_plural}')
@@ -0,0 +1,65 @@
+import statistics
+import time
+from django.db import transaction
+from rest_framework.test import APIClient
+from services.autocomplete import index
+from users.models import User
+from .benchmark_search import Command as SearchBenchmarkCommand, Rollback
+
+
+class Command(SearchBenchmarkCommand):
+    help = 'Benchmark the autocomplete prefix index against the SearchFilter (icontains) path'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--services', type=int, default=100000, help='Number of synthetic services')
+        parser.add_argument('--repeat', type=int, default=20, help='Requests per prefix and path')
+        parser.add_argument(
+            '--prefix',
+            action='append',
+            dest='prefixes',
+            help='Prefix to benchmark (can be repeated)'
+        )
+
+    def handle(self, *args, **options):
+        prefixes = options['prefixes'] or ['p', 'pl', 'plum', 'carpet cl']
+
+        try:
+            with transaction.atomic():
+                self.seed(options['services'])
+                self.run_prefixes(prefixes, options['repeat'])
+                raise Rollback()
+        except Rollback:
+            index.entries = None
+            self.stdout.write('Synthetic data rolled back')
+
+    def time_lookups(self, prefix, repeat):
+        """Return the median and p95 in-memory lookup time in microseconds"""
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            index.search(prefix)
+            timings.append((time.perf_counter() - start) * 1000000)
+        timings.sort()
+        return statistics.median(timings), timings[int(len(timings) * 0.95) - 1]
+
+    def run_prefixes(self, prefixes, repeat):
+        start = time.perf_counter()
+        index.entries = None
+        index.sync(force=True)
+        self.stdout.write(
+            f'Built index of {sum(len(entries) for entries in index.entries.values())} keys in {(time.perf_counter() - start) * 1000:.0f} ms'
+        )
+
+        # Authenticated requests bypass the response cache
+        client = APIClient()
+        client.force_authenticate(user=User.objects.create(phone='+18880000000'))
+        self.stdout.write(f'{"prefix":<16} {"path":<14} {"median ms":>10} {"p95 ms":>10}')
+        for prefix in prefixes:
+            for label, url in (
+                ('icontains', f'/api/services/?search={prefix}'),
+                ('autocomplete', f'/api/services/autocomplete/?q={prefix}'),
+            ):
+                median, p95 = self.time_requests(client, url, repeat)
+                self.stdout.write(f'{prefix:<16} {label:<14} {median:>10.1f} {p95:>10.1f}')
+            median, p95 = self.time_lookups(prefix, repeat)
+            self.stdout.write(f'{prefix:<16} {"index (us)":<14} {median:>10.1f} {p95:>10.1f}')
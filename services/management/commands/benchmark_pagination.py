@@ -0,0 +1,53 @@
+from django.db import transaction
+from rest_framework.test import APIClient
+from services.models import Service
+from users.models import User
+from utils.pagination import KeysetPagination
+from .benchmark_search import Command as SearchBenchmarkCommand, Rollback
+
+
+class Command(SearchBenchmarkCommand):
+    help = 'Benchmark page number pagination against keyset (cursor) pagination on the service list'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--services', type=int, default=100000, help='Number of synthetic services')
+        parser.add_argument('--repeat', type=int, default=20, help='Requests per page and path')
+        parser.add_argument('--page', type=int, default=5000, help='Deep page to compare against page 1')
+
+    def handle(self, *args, **options):
+        page_size = KeysetPagination.page_size
+        if options['services'] < options['page'] * page_size:
+            options['services'] = options['page'] * page_size
+
+        try:
+            with transaction.atomic():
+                self.seed(options['services'])
+                self.run_pages(options['page'], options['repeat'])
+                raise Rollback()
+        except Rollback:
+            self.stdout.write('Synthetic data rolled back')
+
+    def get_cursor(self, page):
+        """Build the cursor a client would hold after walking to the given page"""
+        paginator = KeysetPagination()
+        queryset = Service.objects.filter(status='active').order_by('-created_at')
+        paginator.ordering = paginator.get_ordering(queryset)
+        paginator.fields = [paginator.get_field(Service, name) for name in paginator.ordering]
+
+        offset = (page - 1) * paginator.page_size - 1
+        row = queryset.order_by(*paginator.ordering)[offset]
+        return paginator.encode_cursor(paginator.get_position(row))
+
+    def run_pages(self, page, repeat):
+        # Authenticated requests bypass the response cache
+        client = APIClient()
+        client.force_authenticate(user=User.objects.create(phone='+18880000000'))
+        self.stdout.write(f'{"page":<8} {"path":<12} {"median ms":>10} {"p95 ms":>10}')
+        cursor = self.get_cursor(page)
+        for number, page_url, cursor_url in (
+            (1, '/api/services/?page=1', '/api/services/?pagination=cursor'),
+            (page, f'/api/services/?page={page}', f'/api/services/?cursor={cursor}'),
+        ):
+            for label, url in (('page', page_url), ('cursor', cursor_url)):
+                median, p95 = self.time_requests(client, url, repeat)
+                self.stdout.write(f'{number:<8} {label:<12} {median:>10.1f} {p95:>10.1f}')
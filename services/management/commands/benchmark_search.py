@@ -0,0 +1,113 @@
+import random
+import statistics
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from rest_framework.test import APIClient
+from providers.models import Provider, ServiceCategory
+from services.models import Service
+from services.search import update_search_vectors
+from users.models import User
+
+WORDS = (
+    'plumbing leak repair pipe drain kitchen bathroom install electrical wiring '
+    'outlet panel lighting carpentry cabinet deck furniture cleaning deep carpet '
+    'window office painting interior exterior wall hvac heating cooling furnace '
+    'landscaping lawn garden tree pest termite rodent emergency licensed insured '
+    'affordable professional residential commercial same-day weekend certified'
+).split()
+
+
+class Rollback(Exception):
+    """Raised to discard the synthetic benchmark data"""
+
+
+class Command(BaseCommand):
+    help = 'Benchmark ranked full-text search against the SearchFilter (icontains) path'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--services', type=int, default=100000, help='Number of synthetic services')
+        parser.add_argument('--repeat', type=int, default=20, help='Requests per query and path')
+        parser.add_argument(
+            '--query',
+            action='append',
+            dest='queries',
+            help='Query to benchmark (can be repeated)'
+        )
+
+    def handle(self, *args, **options):
+        queries = options['queries'] or ['leak repair', 'carpet cleaning', 'licensed electrical panel']
+
+        try:
+            with transaction.atomic():
+                self.seed(options['services'])
+                self.run(queries, options['repeat'])
+                raise Rollback()
+        except Rollback:
+            self.stdout.write('Synthetic data rolled back')
+
+    def seed(self, count):
+        """Create synthetic providers and services inside the transaction"""
+        self.stdout.write(f'Seeding {count} services...')
+        rng = random.Random(42)
+        categories = [
+            ServiceCategory.objects.get_or_create(name=f'Benchmark {name}')[0]
+            for name in ('Plumbing', 'Electrical', 'Cleaning', 'Painting')
+        ]
+        providers = []
+        for i in range(max(1, count // 50)):
+            user = User.objects.create(phone=f'+1999{i:08d}')
+            providers.append(Provider(
+                user=user,
+                business_name=' '.join(rng.sample(WORDS, 2)).title() + f' {i}',
+                hourly_rate=50,
+                city='Benchmark City',
+                state='BC',
+                country='USA',
+                postal_code='00000',
+                status='approved'
+            ))
+        providers = Provider.objects.bulk_create(providers)
+
+        batch = []
+        for i in range(count):
+            batch.append(Service(
+                provider=rng.choice(providers),
+                category=rng.choice(categories),
+                title=' '.join(rng.sample(WORDS, 4)).capitalize(),
+                short_description=' '.join(rng.sample(WORDS, 10)),
+                description=' '.join(rng.choices(WORDS, k=60)),
+                base_price=rng.randint(20, 500),
+                hourly_rate=rng.randint(20, 150)
+            ))
+            if len(batch) == 5000:
+                Service.objects.bulk_create(batch)
+                batch = []
+        Service.objects.bulk_create(batch)
+
+        update_search_vectors(Service.objects.filter(category__in=categories))
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE services')
+            cursor.execute('ANALYZE providers')
+
+    def time_requests(self, client, url, repeat):
+        """Return the median and p95 response time in milliseconds"""
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            response = client.get(url, HTTP_HOST='localhost')
+            timings.append((time.perf_counter() - start) * 1000)
+            assert response.status_code == 200, response.status_code
+        timings.sort()
+        return statistics.median(timings), timings[int(len(timings) * 0.95) - 1]
+
+    def run(self, queries, repeat):
+        client = APIClient()
+        self.stdout.write(f'{"query":<30} {"path":<12} {"median ms":>10} {"p95 ms":>10}')
+        for query in queries:
+            for label, url in (
+                ('icontains', f'/api/services/?search={query}'),
+                ('fulltext', f'/api/services/search/?q={query}'),
+            ):
+                median, p95 = self.time_requests(client, url, repeat)
+                self.stdout.write(f'{query:<30} {label:<12} {median:>10.1f} {p95:>10.1f}')
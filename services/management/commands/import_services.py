@@ -0,0 +1,36 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from providers.models import Provider
+from services.bulk_import import BATCH_SIZE, FORMATS, get_format, import_services
+
+
+class Command(BaseCommand):
+    help = 'Create or update services (with FAQs) for a provider from a CSV or JSON Lines file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or JSON Lines file')
+        parser.add_argument('--provider', type=int, required=True, help='ID of the provider')
+        parser.add_argument('--format', choices=FORMATS, help='File format (guessed from the extension by default)')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Rows validated and written together')
+
+    def handle(self, *args, **options):
+        try:
+            provider = Provider.objects.get(pk=options['provider'])
+        except Provider.DoesNotExist:
+            raise CommandError(f'Provider {options["provider"]} does not exist')
+
+        file_format = options['format'] or get_format(options['path'])
+        if file_format is None:
+            raise CommandError('Could not guess the file format, pass --format')
+
+        start = time.perf_counter()
+        with open(options['path'], encoding='utf-8-sig', newline='') as lines:
+            result = import_services(provider, lines, file_format, options['batch_size'])
+        elapsed = time.perf_counter() - start
+
+        for error in result['errors']:
+            self.stderr.write(f'Row {error["row"]}: {error["errors"]}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {result["created"]}, updated {result["updated"]}, '
+            f'failed {result["failed"]} in {elapsed:.1f}s'
+        ))
@@ -0,0 +1,77 @@
+from django.core.management.base import BaseCommand
+from django.urls import URLPattern, URLResolver, get_resolver
+from utils.query_budget import get_budget, get_query_stats, get_view_name, reset_query_stats
+
+
+def iter_routes(patterns, prefix=''):
+    """
+    Walk URL patterns depth first
+
+    Yields:
+        tuple: (route, view function)
+    """
+    for pattern in patterns:
+        route = prefix + str(pattern.pattern)
+        if isinstance(pattern, URLResolver):
+            yield from iter_routes(pattern.url_patterns, route)
+        elif isinstance(pattern, URLPattern):
+            yield route, pattern.callback
+
+
+class Command(BaseCommand):
+    help = 'Show the query budget and recorded query counts of every URL route'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--include-admin',
+            action='store_true',
+            help='Also list the Django admin routes'
+        )
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Forget the recorded query counts after reporting them'
+        )
+
+    def handle(self, *args, **options):
+        routes = [
+            (route, view_func)
+            for route, view_func in iter_routes(get_resolver().url_patterns)
+            if options['include_admin'] or not route.startswith('admin/')
+        ]
+        view_names = sorted({get_view_name(view_func) for _, view_func in routes})
+        stats = get_query_stats(view_names)
+
+        self.stdout.write(
+            f'{"route":<55} {"view":<50} {"budget":>6} {"requests":>8} '
+            f'{"avg":>6} {"max":>5} {"over":>5} {"n+1":>5}'
+        )
+        for route, view_func in routes:
+            view_name = get_view_name(view_func)
+            budget = get_budget(view_func)
+            view_stats = stats.get(view_name)
+            line = f'{route:<55} {view_name:<50} {budget if budget is not None else "-":>6}'
+            if view_stats:
+                line += (
+                    f' {view_stats["requests"]:>8} {view_stats["average_queries"]:>6} '
+                    f'{view_stats["max_queries"]:>5} {view_stats["over_budget"]:>5} {view_stats["repeated"]:>5}'
+                )
+            else:
+                line += f' {"-":>8} {"-":>6} {"-":>5} {"-":>5} {"-":>5}'
+            self.stdout.write(line)
+
+        budgeted = sum(get_budget(view_func) is not None for _, view_func in routes)
+        self.stdout.write(self.style.SUCCESS(f'✓ {len(routes)} routes, {budgeted} with a query budget'))
+        for view_name, view_stats in stats.items():
+            if view_stats['over_budget']:
+                self.stdout.write(self.style.WARNING(
+                    f'{view_name} exceeded its budget in {view_stats["over_budget"]} requests'
+                ))
+            if view_stats['repeated']:
+                self.stdout.write(self.style.WARNING(
+                    f'{view_name} repeated a query shape (possible N+1) in {view_stats["repeated"]} requests'
+                ))
+
+        if options['reset']:
+            reset_query_stats(view_names)
+            self.stdout.write(self.style.SUCCESS('✓ Recorded query counts reset'))
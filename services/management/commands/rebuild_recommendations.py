@@ -0,0 +1,34 @@
+import resource
+import time
+from django.core.management.base import BaseCommand
+from services.recommendations import CHUNK_SIZE, MIN_CO_BOOKINGS, NEIGHBOURS, rebuild_recommendations
+
+
+class Command(BaseCommand):
+    help = 'Rebuild "customers also booked" similar services from booking history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--k', type=int, default=NEIGHBOURS, help='Similar services kept per service')
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=CHUNK_SIZE,
+            help='Customer/provider pairs held in memory at once'
+        )
+        parser.add_argument(
+            '--min-co-bookings',
+            type=int,
+            default=MIN_CO_BOOKINGS,
+            help='Customers two providers must share to be similar'
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        result = rebuild_recommendations(options['k'], options['chunk_size'], options['min_co_bookings'])
+        elapsed = time.perf_counter() - start
+        peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Stored {result["similar_services"]} similar services for '
+            f'{result["providers"]} providers in {elapsed:.1f}s (peak memory {peak_mb:.0f} MB)'
+        ))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from services.price_stats import refresh_price_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the price distribution rollup of every category'
+
+    def handle(self, *args, **options):
+        count = refresh_price_stats()
+        self.stdout.write(self.style.SUCCESS(f'Stored price stats for {count} categories'))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from django.urls import get_resolver
+from utils.cache import get_cache_stats
+
+
+class Command(BaseCommand):
+    help = 'Show hit/miss counts for views using the response cache'
+
+    def handle(self, *args, **options):
+        # Import every view module so all cached views are registered
+        get_resolver().url_patterns
+
+        stats = get_cache_stats()
+        self.stdout.write(f'{"view":<50} {"hits":>10} {"misses":>10} {"hit rate":>10}')
+        for view_name, counts in stats.items():
+            self.stdout.write(
+                f'{view_name:<50} {counts["hits"]:>10} {counts["misses"]:>10} '
+                f'{counts["hit_rate"]:>10.1%}'
+            )
@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Avg, Count, DecimalField, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Round
+from reviews.models import Review
+from services.models import Service
+
+
+class Command(BaseCommand):
+    help = 'Backfill and verify the denormalized rating columns on services'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Only report services whose stored ratings are out of date'
+        )
+
+    def handle(self, *args, **options):
+        reviews = Review.objects.filter(
+            provider=OuterRef('provider'),
+            is_published=True
+        ).order_by().values('provider')
+
+        expected_rating = Coalesce(
+            Subquery(reviews.annotate(avg=Round(Avg('rating'), 2)).values('avg')),
+            Value(0),
+            output_field=DecimalField(max_digits=3, decimal_places=2)
+        )
+        expected_count = Coalesce(
+            Subquery(reviews.annotate(count=Count('id')).values('count')),
+            Value(0),
+            output_field=IntegerField()
+        )
+
+        stale = Service.objects.annotate(
+            expected_rating=expected_rating,
+            expected_count=expected_count
+        ).filter(
+            ~Q(average_rating=expected_rating) | ~Q(total_reviews=expected_count)
+        )
+
+        if options['verify']:
+            count = 0
+            for service in stale.only('id', 'title', 'average_rating', 'total_reviews'):
+                count += 1
+                self.stdout.write(
+                    f'  Service #{service.id} "{service.title}": '
+                    f'stored {service.average_rating} ({service.total_reviews} reviews), '
+                    f'expected {service.expected_rating} ({service.expected_count} reviews)'
+                )
+
+            if count:
+                self.stdout.write(self.style.WARNING(f'{count} services have stale ratings'))
+            else:
+                self.stdout.write(self.style.SUCCESS('✓ All service ratings are up to date'))
+            return
+
+        updated = Service.objects.filter(pk__in=stale.values('pk')).update(
+            average_rating=expected_rating,
+            total_reviews=expected_count
+        )
+        self.stdout.write(self.style.SUCCESS(f'✓ Updated ratings for {updated} services'))
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.1 on 2026-10-17 03:24
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('providers', '0001_initial'),
+        ('services', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='service',
+            name='average_rating',
+            field=models.DecimalField(decimal_places=2, default=0.0, max_digits=3, validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(5)]),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='total_reviews',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='service',
+            index=models.Index(fields=['status', '-average_rating'], name='services_status_d5f558_idx'),
+        ),
+    ]
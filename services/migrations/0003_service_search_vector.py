@@ -0,0 +1,42 @@
+# Generated by Django 5.0.1 on 2026-10-17 03:26
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def populate_search_vectors(apps, schema_editor):
+    Service = apps.get_model('services', 'Service')
+    Provider = apps.get_model('providers', 'Provider')
+    business_name = Subquery(
+        Provider.objects.filter(pk=OuterRef('provider_id')).values('business_name')[:1]
+    )
+    Service.objects.update(search_vector=(
+        SearchVector('title', weight='A', config='english')
+        + SearchVector('short_description', weight='B', config='english')
+        + SearchVector(business_name, weight='B', config='english')
+        + SearchVector('description', weight='C', config='english')
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('providers', '0001_initial'),
+        ('services', '0002_service_rating_columns'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='service',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='service',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='services_search_vector_gin'),
+        ),
+        migrations.RunPython(populate_search_vectors, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.1 on 2026-10-17 03:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('providers', '0002_provider_geo_cell'),
+        ('services', '0003_service_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='service',
+            name='external_id',
+            field=models.CharField(blank=True, help_text="Provider's own identifier, used to upsert services in bulk imports", max_length=100, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='service',
+            constraint=models.UniqueConstraint(fields=('provider', 'external_id'), name='services_provider_external_id_unique'),
+        ),
+    ]
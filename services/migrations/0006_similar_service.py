@@ -0,0 +1,32 @@
+# Generated by Django 5.0.1 on 2026-10-17 03:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0005_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimilarService',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('service', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_services', to='services.service')),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_to', to='services.service')),
+            ],
+            options={
+                'db_table': 'similar_services',
+                'ordering': ['service', 'rank'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='similarservice',
+            constraint=models.UniqueConstraint(fields=('service', 'rank'), name='similar_services_service_rank_unique'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.1 on 2026-10-17 04:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('providers', '0003_image_variants'),
+        ('services', '0006_similar_service'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryPriceStats',
+            fields=[
+                ('category', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='price_stats', serialize=False, to='providers.servicecategory')),
+                ('service_count', models.PositiveIntegerField(default=0)),
+                ('base_price', models.JSONField(blank=True, null=True)),
+                ('hourly_rate', models.JSONField(blank=True, null=True)),
+                ('computed_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name_plural': 'category price stats',
+                'db_table': 'category_price_stats',
+            },
+        ),
+    ]
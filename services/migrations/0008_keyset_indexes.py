@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-17 05:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('providers', '0006_provider_ranking_score'),
+        ('services', '0007_category_price_stats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='service',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='services_status_newest_idx'),
+        ),
+    ]
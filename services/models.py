@@ -1,5 +1,7 @@
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator, MaxValueValidator
 from providers.models import Provider, ServiceCategory
 
@@ -26,6 +28,12 @@ class Service(models.Model):
     category = models.ForeignKey(ServiceCategory, on_delete=models.PROTECT, related_name='services')
     
     # Service Details
+    external_id = models.CharField(
+        max_length=100,
+        null=True,
+        blank=True,
+        help_text="Provider's own identifier, used to upsert services in bulk imports"
+    )
     title = models.CharField(max_length=255)
     description = models.TextField()
     short_description = models.CharField(max_length=500, blank=True)
@@ -47,10 +55,21 @@ class Service(models.Model):
     
     # Media
     image = models.ImageField(upload_to='services/', blank=True, null=True)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
+    
+    # Ratings (denormalized from the provider's published reviews)
+    average_rating = models.DecimalField(
+        max_digits=3,
+        decimal_places=2,
+        default=0.00,
+        validators=[MinValueValidator(0), MaxValueValidator(5)]
+    )
+    total_reviews = models.PositiveIntegerField(default=0)
     
     # Metadata
     views_count = models.PositiveIntegerField(default=0)
     bookings_count = models.PositiveIntegerField(default=0)
+    search_vector = SearchVectorField(null=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -61,30 +80,37 @@ class Service(models.Model):
             models.Index(fields=['provider', 'status']),
             models.Index(fields=['category', 'status']),
             models.Index(fields=['-created_at']),
+            models.Index(fields=['status', '-average_rating']),
+            # Keyset pages of the default list ordering (see utils.pagination)
+            models.Index(fields=['status', '-created_at', '-id'], name='services_status_newest_idx'),
+            GinIndex(fields=['search_vector'], name='services_search_vector_gin'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['provider', 'external_id'], name='services_provider_external_id_unique'),
         ]
     
     def __str__(self):
         return f"{self.title} - {self.provider.business_name}"
     
-    @property
-    def average_rating(self):
-        """Calculate average rating from reviews"""
-        from reviews.models import Review
-        reviews = Review.objects.filter(provider=self.provider)
-        if reviews.exists():
-            return reviews.aggregate(models.Avg('rating'))['rating__avg']
-        return 0
+    def save(self, *args, **kwargs):
+        # New services start with their provider's current rating stats
+        if self.pk is None and self.provider_id:
+            self.average_rating = self.provider.average_rating
+            self.total_reviews = self.provider.total_reviews
+        super().save(*args, **kwargs)
     
     def increment_views(self):
-        """Increment view count"""
+        """Increment view count (buffered in the cache and flushed periodically)"""
+        from .view_counter import record_service_view
+        record_service_view(self.pk)
         self.views_count += 1
-        self.save(update_fields=['views_count'])
 
 
 class ServiceImage(models.Model):
     """Additional images for services"""
     service = models.ForeignKey(Service, on_delete=models.CASCADE, related_name='images')
     image = models.ImageField(upload_to='services/gallery/')
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     caption = models.CharField(max_length=255, blank=True)
     order = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -111,3 +137,43 @@ class ServiceFAQ(models.Model):
     
     def __str__(self):
         return self.question
+
+
+class SimilarService(models.Model):
+    """Precomputed "customers also booked" neighbour of a service"""
+    service = models.ForeignKey(Service, on_delete=models.CASCADE, related_name='similar_services')
+    similar = models.ForeignKey(Service, on_delete=models.CASCADE, related_name='similar_to')
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+    
+    class Meta:
+        db_table = 'similar_services'
+        ordering = ['service', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['service', 'rank'], name='similar_services_service_rank_unique'),
+        ]
+    
+    def __str__(self):
+        return f"{self.service_id} -> {self.similar_id} ({self.score:.3f})"
+
+
+class CategoryPriceStats(models.Model):
+    """Rollup of the price distribution of a category's active services"""
+    category = models.OneToOneField(
+        ServiceCategory,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='price_stats'
+    )
+    service_count = models.PositiveIntegerField(default=0)
+    # Count, min, max, percentiles and histogram bins; null without prices
+    base_price = models.JSONField(null=True, blank=True)
+    hourly_rate = models.JSONField(null=True, blank=True)
+    computed_at = models.DateTimeField()
+    
+    class Meta:
+        db_table = 'category_price_stats'
+        verbose_name_plural = 'category price stats'
+    
+    def __str__(self):
+        return f"Price stats for category {self.category_id}"
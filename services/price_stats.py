@@ -0,0 +1,161 @@
+"""
+Price distribution statistics per category
+
+The min, max, percentiles and an equal-width histogram of the base prices
+and hourly rates of every category's active services are computed in
+PostgreSQL (PERCENTILE_CONT and WIDTH_BUCKET), two grouped queries per
+price field, and stored in the CategoryPriceStats rollup table. A periodic
+task refreshes the table, so the endpoint is a single primary key read and
+no prices are ever loaded into Python.
+"""
+from django.contrib.postgres.fields import ArrayField
+from django.db import connection, transaction
+from django.db.models import Aggregate, Count, FloatField, Max, Min
+from django.utils import timezone
+from .models import CategoryPriceStats, Service
+
+PRICE_FIELDS = ('base_price', 'hourly_rate')
+PERCENTILES = (10, 25, 50, 75, 90)
+HISTOGRAM_BINS = 10
+
+
+class PercentileCont(Aggregate):
+    """PostgreSQL PERCENTILE_CONT for several fractions at once, returning an array"""
+    function = 'PERCENTILE_CONT'
+    template = '%(function)s(ARRAY[%(fractions)s]::float8[]) WITHIN GROUP (ORDER BY %(expressions)s)'
+
+    def __init__(self, expression, fractions, **extra):
+        super().__init__(
+            expression,
+            fractions=', '.join(str(float(fraction)) for fraction in fractions),
+            output_field=ArrayField(FloatField()),
+            **extra
+        )
+
+
+def get_active_prices(field):
+    """Active services that have a value for a price field"""
+    return Service.objects.filter(status='active', **{f'{field}__isnull': False})
+
+
+def compute_summaries(field):
+    """
+    Compute the count, min, max and percentiles of a price field per category
+
+    Returns:
+        dict: Category ID to summary
+    """
+    rows = (
+        get_active_prices(field)
+        .order_by()
+        .values('category_id')
+        .annotate(
+            count=Count('id'),
+            min=Min(field),
+            max=Max(field),
+            percentiles=PercentileCont(field, [p / 100 for p in PERCENTILES]),
+        )
+    )
+    return {
+        row['category_id']: {
+            'count': row['count'],
+            'min': float(row['min']),
+            'max': float(row['max']),
+            'percentiles': {f'p{p}': round(value, 2) for p, value in zip(PERCENTILES, row['percentiles'])},
+        }
+        for row in rows
+    }
+
+
+def compute_histograms(field):
+    """
+    Count the prices of each category in equal-width bins between its min and max
+
+    Returns:
+        dict: Category ID to {bin index (1-based): count}
+    """
+    column = Service._meta.get_field(field).column
+    table = Service._meta.db_table
+    # WIDTH_BUCKET puts the maximum in bin n + 1, so it is folded into the last bin
+    sql = f'''
+        WITH prices AS (
+            SELECT category_id, {column} AS price FROM {table}
+            WHERE status = 'active' AND {column} IS NOT NULL
+        ), bounds AS (
+            SELECT category_id, MIN(price) AS low, MAX(price) AS high FROM prices GROUP BY category_id
+        )
+        SELECT prices.category_id,
+            CASE WHEN bounds.high = bounds.low THEN 1
+                ELSE LEAST(WIDTH_BUCKET(prices.price, bounds.low, bounds.high, %s), %s) END AS bin,
+            COUNT(*)
+        FROM prices JOIN bounds ON bounds.category_id = prices.category_id
+        GROUP BY 1, 2
+    '''
+    histograms = {}
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [HISTOGRAM_BINS, HISTOGRAM_BINS])
+        for category_id, bin_index, count in cursor.fetchall():
+            histograms.setdefault(category_id, {})[bin_index] = count
+    return histograms
+
+
+def build_histogram(summary, counts):
+    """Expand bin counts into the bins of a summary's price range"""
+    if summary['min'] == summary['max']:
+        return [{'min': summary['min'], 'max': summary['max'], 'count': summary['count']}]
+
+    width = (summary['max'] - summary['min']) / HISTOGRAM_BINS
+    return [
+        {
+            'min': round(summary['min'] + width * i, 2),
+            'max': round(summary['min'] + width * (i + 1), 2),
+            'count': counts.get(i + 1, 0),
+        }
+        for i in range(HISTOGRAM_BINS)
+    ]
+
+
+def compute_price_stats(field):
+    """
+    Compute the full price distribution of a field per category
+
+    Returns:
+        dict: Category ID to summary with histogram
+    """
+    summaries = compute_summaries(field)
+    histograms = compute_histograms(field)
+    for category_id, summary in summaries.items():
+        summary['histogram'] = build_histogram(summary, histograms.get(category_id, {}))
+    return summaries
+
+
+def refresh_price_stats():
+    """
+    Recompute the rollup rows of every category with active services
+
+    Returns:
+        int: Number of categories stored
+    """
+    stats = {field: compute_price_stats(field) for field in PRICE_FIELDS}
+    category_ids = set().union(*[stats[field].keys() for field in PRICE_FIELDS])
+    now = timezone.now()
+    rows = [
+        CategoryPriceStats(
+            category_id=category_id,
+            service_count=stats['base_price'].get(category_id, {}).get('count', 0),
+            base_price=stats['base_price'].get(category_id),
+            hourly_rate=stats['hourly_rate'].get(category_id),
+            computed_at=now,
+        )
+        for category_id in category_ids
+    ]
+
+    with transaction.atomic():
+        CategoryPriceStats.objects.exclude(category_id__in=category_ids).delete()
+        CategoryPriceStats.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['category'],
+            update_fields=['service_count', 'base_price', 'hourly_rate', 'computed_at']
+        )
+    return len(rows)
@@ -0,0 +1,107 @@
+"""
+Precomputed featured/popular service rankings
+
+The top services for the whole catalog and for every active category are
+serialized ahead of time and stored in the cache, so the featured and
+popular endpoints are a single cache read. Changes to the underlying
+counters (views, bookings, reviews, services) only mark the rankings
+stale; the periodic refresh task then recomputes them.
+"""
+from django.core.cache import cache
+from django.db.models import Count
+
+KEY_PREFIX = 'service_rankings'
+STALE_KEY = f'{KEY_PREFIX}:stale'
+RANKING_KINDS = ('featured', 'popular')
+RANKING_SIZE = 10
+RANKING_TIMEOUT = 60 * 60  # Rankings are served at most an hour after the last refresh
+
+
+def get_ranking_key(kind, category_id=None):
+    """Get the cache key for a ranking"""
+    return f'{KEY_PREFIX}:{kind}:{category_id or "all"}'
+
+
+def rank_services(kind, queryset):
+    """Order a service queryset for a ranking"""
+    queryset = queryset.filter(status='active')
+    if kind == 'featured':
+        return queryset.annotate(
+            booking_count=Count('provider__bookings')
+        ).order_by('-average_rating', '-booking_count', '-views_count')
+    return queryset.order_by('-views_count', '-average_rating')
+
+
+def compute_ranking(kind, category_id=None, queryset=None):
+    """
+    Compute a ranking payload from the database
+
+    Args:
+        kind: 'featured' or 'popular'
+        category_id: Optional category to rank within
+        queryset: Optional base queryset (defaults to all services)
+
+    Returns:
+        list: Serialized services, ready to be returned by the API
+    """
+    from .models import Service
+    from .serializers import ServiceListSerializer
+
+    if queryset is None:
+        queryset = Service.objects.select_related('provider', 'category')
+    if category_id:
+        queryset = queryset.filter(category_id=category_id)
+
+    services = rank_services(kind, queryset)[:RANKING_SIZE]
+    return list(ServiceListSerializer(services, many=True).data)
+
+
+def get_ranking(kind, category_id=None):
+    """Get a ranking from the cache, computing it on a miss"""
+    key = get_ranking_key(kind, category_id)
+    payload = cache.get(key)
+    if payload is None:
+        payload = compute_ranking(kind, category_id)
+        cache.set(key, payload, timeout=RANKING_TIMEOUT)
+    return payload
+
+
+def mark_rankings_stale():
+    """Flag the rankings for recomputation by the next refresh"""
+    cache.set(STALE_KEY, True, timeout=None)
+
+
+def refresh_rankings():
+    """
+    Recompute and cache every ranking
+
+    Returns:
+        int: Number of rankings stored
+    """
+    from providers.models import ServiceCategory
+
+    # Clear the flag first so changes made during the refresh flag it again
+    cache.delete(STALE_KEY)
+
+    category_ids = [None] + list(
+        ServiceCategory.objects.filter(is_active=True).values_list('id', flat=True)
+    )
+    payloads = {
+        get_ranking_key(kind, category_id): compute_ranking(kind, category_id)
+        for category_id in category_ids
+        for kind in RANKING_KINDS
+    }
+    cache.set_many(payloads, timeout=RANKING_TIMEOUT)
+    return len(payloads)
+
+
+def refresh_stale_rankings():
+    """
+    Recompute the rankings if they were flagged stale or have expired
+
+    Returns:
+        int: Number of rankings stored
+    """
+    if cache.get(STALE_KEY) or cache.get(get_ranking_key('featured')) is None:
+        return refresh_rankings()
+    return 0
@@ -0,0 +1,204 @@
+"""
+"Customers also booked" recommendations
+
+Bookings link customers to providers, so similarity is learned between
+providers and then spread to their services. The rebuild streams the
+distinct (customer, provider) pairs of all non-cancelled bookings from a
+server-side cursor in chunks of whole customers. Each chunk becomes a
+sparse customer x provider matrix X, and the provider co-booking counts are
+accumulated as the sum of X.T @ X over the chunks, so memory is bounded by
+the chunk size plus the number of co-booked provider pairs rather than by
+the number of bookings.
+
+Provider similarity is the cosine of their customer sets (co-bookings
+divided by the geometric mean of their customer counts). Every active
+service then gets the services of its provider's top neighbours, same
+category first, which are stored in the SimilarService table and served
+with a single indexed query.
+"""
+from array import array
+from collections import defaultdict
+from itertools import islice
+import numpy as np
+from scipy import sparse
+from django.db import transaction
+from bookings.models import Booking
+from providers.models import Provider
+from .models import Service, SimilarService
+
+NEIGHBOURS = 10
+CHUNK_SIZE = 500_000  # (customer, provider) pairs held in memory at once
+FETCH_SIZE = 10_000
+MAX_PROVIDERS_PER_CUSTOMER = 200  # Pairs grow quadratically, so very heavy customers are capped
+MIN_CO_BOOKINGS = 1
+EXCLUDED_STATUSES = ('cancelled', 'refunded')
+INSERT_BATCH_SIZE = 5_000
+
+
+def iter_booking_chunks(chunk_size=CHUNK_SIZE):
+    """
+    Stream the distinct (customer, provider) pairs of the booking history
+
+    Chunks only end between customers, so every customer's providers are
+    counted together.
+
+    Yields:
+        tuple: (customer IDs, provider IDs) as int64 arrays
+    """
+    pairs = (
+        Booking.objects.exclude(status__in=EXCLUDED_STATUSES)
+        .order_by('customer_id', 'provider_id')
+        .values_list('customer_id', 'provider_id')
+        .distinct()
+        .iterator(chunk_size=FETCH_SIZE)
+    )
+    customers, providers = array('q'), array('q')
+    current, count = None, 0
+    for customer_id, provider_id in pairs:
+        if customer_id != current:
+            if len(customers) >= chunk_size:
+                yield np.frombuffer(customers, dtype=np.int64), np.frombuffer(providers, dtype=np.int64)
+                customers, providers = array('q'), array('q')
+            current, count = customer_id, 0
+        count += 1
+        if count <= MAX_PROVIDERS_PER_CUSTOMER:
+            customers.append(customer_id)
+            providers.append(provider_id)
+
+    if customers:
+        yield np.frombuffer(customers, dtype=np.int64), np.frombuffer(providers, dtype=np.int64)
+
+
+def count_co_bookings(chunks, provider_ids):
+    """
+    Count the customers every pair of providers has in common
+
+    Args:
+        chunks: Iterable of (customer IDs, provider IDs) arrays
+        provider_ids: Sorted array of the providers to count
+
+    Returns:
+        csr_matrix: Provider x provider counts; the diagonal holds each
+            provider's number of customers
+    """
+    size = len(provider_ids)
+    counts = sparse.csr_matrix((size, size), dtype=np.int64)
+    if not size:
+        return counts
+
+    for customers, providers in chunks:
+        columns = np.searchsorted(provider_ids, providers)
+        known = provider_ids[np.minimum(columns, size - 1)] == providers
+        if not known.any():
+            continue
+        _, rows = np.unique(customers[known], return_inverse=True)
+        matrix = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.int64), (rows, columns[known])),
+            shape=(rows.max() + 1, size)
+        )
+        counts = counts + (matrix.T @ matrix).tocsr()
+    return counts
+
+
+def get_similarity(counts, min_co_bookings=MIN_CO_BOOKINGS):
+    """Get the cosine similarity between providers from their co-booking counts"""
+    customers = counts.diagonal().astype(np.float64)
+    scale = np.divide(1, np.sqrt(customers), out=np.zeros_like(customers), where=customers > 0)
+
+    counts = counts.tocoo()
+    keep = (counts.row != counts.col) & (counts.data >= min_co_bookings)
+    rows, columns = counts.row[keep], counts.col[keep]
+    scores = counts.data[keep] * scale[rows] * scale[columns]
+    return sparse.csr_matrix((scores, (rows, columns)), shape=counts.shape)
+
+
+def top_neighbours(similarity, k=NEIGHBOURS):
+    """
+    Get the k most similar columns of every row, best first
+
+    Yields:
+        tuple: (row, column indices, scores)
+    """
+    for row in range(similarity.shape[0]):
+        start, end = similarity.indptr[row], similarity.indptr[row + 1]
+        if start == end:
+            continue
+        columns, scores = similarity.indices[start:end], similarity.data[start:end]
+        if end - start > k:
+            top = np.argpartition(-scores, k)[:k]
+            columns, scores = columns[top], scores[top]
+        # Ties are broken by index so rebuilds are deterministic
+        order = np.lexsort((columns, -scores))
+        yield row, columns[order], scores[order]
+
+
+def iter_similar_services(neighbours, k=NEIGHBOURS):
+    """
+    Turn provider neighbours into ranked similar services
+
+    Args:
+        neighbours: Provider ID to (neighbour provider IDs, scores)
+
+    Yields:
+        SimilarService: Unsaved rows
+    """
+    services = defaultdict(list)
+    queryset = (
+        Service.objects.filter(status='active', provider__status='approved')
+        .order_by('-average_rating', '-bookings_count', 'id')
+        .values_list('id', 'provider_id', 'category_id')
+    )
+    for service_id, provider_id, category_id in queryset.iterator(chunk_size=FETCH_SIZE):
+        services[provider_id].append((service_id, category_id))
+
+    for provider_id, (neighbour_ids, scores) in neighbours.items():
+        candidates = [
+            (service_id, category_id, score)
+            for neighbour_id, score in zip(neighbour_ids.tolist(), scores.tolist())
+            for service_id, category_id in services.get(neighbour_id, ())[:k]
+        ]
+        for service_id, category_id in services.get(provider_id, ()):
+            # Stable sort, so the best rated services of equally similar providers come first
+            ranked = sorted(candidates, key=lambda candidate: (candidate[1] != category_id, -candidate[2]))
+            for rank, (similar_id, _, score) in enumerate(ranked[:k], start=1):
+                yield SimilarService(service_id=service_id, similar_id=similar_id, score=score, rank=rank)
+
+
+def rebuild_recommendations(k=NEIGHBOURS, chunk_size=CHUNK_SIZE, min_co_bookings=MIN_CO_BOOKINGS):
+    """
+    Rebuild the similar services of every active service from booking history
+
+    The previous recommendations are replaced in one transaction, so
+    readers never see a partial rebuild.
+
+    Args:
+        k: Neighbours kept per provider and similar services per service
+        chunk_size: (customer, provider) pairs held in memory at once
+        min_co_bookings: Customers two providers must share to be similar
+
+    Returns:
+        dict: Number of providers with neighbours and of rows stored
+    """
+    provider_ids = np.fromiter(
+        Provider.objects.filter(status='approved').order_by('id').values_list('id', flat=True).iterator(),
+        dtype=np.int64
+    )
+    counts = count_co_bookings(iter_booking_chunks(chunk_size), provider_ids)
+    similarity = get_similarity(counts, min_co_bookings)
+    del counts
+
+    neighbours = {
+        int(provider_ids[row]): (provider_ids[columns], scores)
+        for row, columns, scores in top_neighbours(similarity, k)
+    }
+    del similarity
+
+    rows = iter_similar_services(neighbours, k)
+    stored = 0
+    with transaction.atomic():
+        SimilarService.objects.all().delete()
+        while batch := list(islice(rows, INSERT_BATCH_SIZE)):
+            SimilarService.objects.bulk_create(batch)
+            stored += len(batch)
+
+    return {'providers': len(neighbours), 'similar_services': stored}
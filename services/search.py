@@ -0,0 +1,63 @@
+"""
+PostgreSQL full-text search for services
+
+Each service stores a weighted tsvector built from its title (A), short
+description and provider business name (B) and description (C). The
+vector is refreshed by the signals in services/signals.py and queried
+through the GIN index on Service.search_vector.
+"""
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank, SearchVector
+from django.db.models import F, OuterRef, Subquery
+from providers.models import Provider
+
+SEARCH_CONFIG = 'english'
+
+
+def build_search_vector():
+    """Build the weighted search vector expression for a service row"""
+    business_name = Subquery(
+        Provider.objects.filter(pk=OuterRef('provider_id')).values('business_name')[:1]
+    )
+    return (
+        SearchVector('title', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('short_description', weight='B', config=SEARCH_CONFIG)
+        + SearchVector(business_name, weight='B', config=SEARCH_CONFIG)
+        + SearchVector('description', weight='C', config=SEARCH_CONFIG)
+    )
+
+
+def update_search_vectors(queryset):
+    """
+    Recompute the search vector for every service in a queryset
+
+    Returns:
+        int: Number of services updated
+    """
+    return queryset.update(search_vector=build_search_vector())
+
+
+def search_services(queryset, text):
+    """
+    Filter services matching a web-style search query, best match first
+
+    Args:
+        queryset: Service queryset to search
+        text: Search text (supports "quoted phrases", OR and -exclusions)
+
+    Returns:
+        QuerySet annotated with `rank` and a highlighted `headline`
+    """
+    query = SearchQuery(text, search_type='websearch', config=SEARCH_CONFIG)
+    return queryset.filter(search_vector=query).annotate(
+        rank=SearchRank(F('search_vector'), query),
+        headline=SearchHeadline(
+            'description',
+            query,
+            config=SEARCH_CONFIG,
+            start_sel='<mark>',
+            stop_sel='</mark>',
+            max_words=35,
+            min_words=15,
+            max_fragments=2
+        )
+    ).order_by('-rank', '-id')
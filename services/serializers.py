@@ -1,23 +1,26 @@
 from rest_framework import serializers
-from .models import Service, ServiceImage, ServiceFAQ
+from .models import CategoryPriceStats, Service, ServiceImage, ServiceFAQ
 from providers.models import ServiceCategory
 from providers.serializers import ProviderSerializer
+from utils.images import ImageVariantsField, schedule_image_variants
 
 
 class ServiceCategorySerializer(serializers.ModelSerializer):
     """Serializer for service categories"""
+    icon_variants = ImageVariantsField()
     
     class Meta:
         model = ServiceCategory
-        fields = ['id', 'name', 'description', 'icon']
+        fields = ['id', 'name', 'description', 'icon', 'icon_variants']
 
 
 class ServiceImageSerializer(serializers.ModelSerializer):
     """Serializer for service images"""
+    image_variants = ImageVariantsField()
     
     class Meta:
         model = ServiceImage
-        fields = ['id', 'image', 'caption', 'order']
+        fields = ['id', 'image', 'image_variants', 'caption', 'order']
 
 
 class ServiceFAQSerializer(serializers.ModelSerializer):
@@ -34,22 +37,44 @@ class ServiceListSerializer(serializers.ModelSerializer):
     provider_rating = serializers.SerializerMethodField()
     category_name = serializers.CharField(source='category.name', read_only=True)
     average_rating = serializers.ReadOnlyField()
+    image_variants = ImageVariantsField()
     
     class Meta:
         model = Service
         fields = [
             'id', 'title', 'short_description', 'pricing_type', 'base_price',
             'hourly_rate', 'duration_minutes', 'is_remote', 'is_onsite',
-            'status', 'image', 'views_count', 'bookings_count',
+            'status', 'image', 'image_variants', 'views_count', 'bookings_count', 'provider',
             'provider_name', 'provider_rating', 'category_name', 'average_rating',
-            'created_at', 'updated_at'
+            'total_reviews', 'created_at', 'updated_at'
         ]
+        expandable_fields = {
+            'provider': ('providers.serializers.ProviderListSerializer', {'read_only': True}),
+        }
+        field_relations = {'provider_rating': ['provider']}
     
     def get_provider_rating(self, obj):
         """Get provider's average rating"""
         return obj.provider.rating if hasattr(obj.provider, 'rating') else 0
 
 
+class ServiceSearchSerializer(ServiceListSerializer):
+    """Serializer for ranked full-text search results"""
+    rank = serializers.FloatField(read_only=True)
+    headline = serializers.CharField(read_only=True)
+    
+    class Meta(ServiceListSerializer.Meta):
+        fields = ServiceListSerializer.Meta.fields + ['rank', 'headline']
+
+
+class ServiceNearbySerializer(ServiceListSerializer):
+    """Serializer for proximity search results"""
+    distance_km = serializers.FloatField(read_only=True)
+    
+    class Meta(ServiceListSerializer.Meta):
+        fields = ServiceListSerializer.Meta.fields + ['distance_km']
+
+
 class ServiceDetailSerializer(serializers.ModelSerializer):
     """Serializer for service detail view"""
     provider = ProviderSerializer(read_only=True)
@@ -57,6 +82,7 @@ class ServiceDetailSerializer(serializers.ModelSerializer):
     images = ServiceImageSerializer(many=True, read_only=True)
     faqs = ServiceFAQSerializer(many=True, read_only=True)
     average_rating = serializers.ReadOnlyField()
+    image_variants = ImageVariantsField()
     
     class Meta:
         model = Service
@@ -64,12 +90,20 @@ class ServiceDetailSerializer(serializers.ModelSerializer):
             'id', 'provider', 'category', 'title', 'description',
             'short_description', 'pricing_type', 'base_price', 'hourly_rate',
             'duration_minutes', 'is_remote', 'is_onsite', 'status',
-            'min_booking_hours', 'max_bookings_per_day', 'image', 'images',
+            'min_booking_hours', 'max_bookings_per_day', 'image', 'image_variants', 'images',
             'faqs', 'views_count', 'bookings_count', 'average_rating',
-            'created_at', 'updated_at'
+            'total_reviews', 'created_at', 'updated_at'
         ]
 
 
+class CategoryPriceStatsSerializer(serializers.ModelSerializer):
+    """Serializer for a category's price distribution"""
+    
+    class Meta:
+        model = CategoryPriceStats
+        fields = ['category', 'service_count', 'base_price', 'hourly_rate', 'computed_at']
+
+
 class ServiceCreateUpdateSerializer(serializers.ModelSerializer):
     """Serializer for creating and updating services"""
     images = ServiceImageSerializer(many=True, required=False)
@@ -110,13 +144,13 @@ class ServiceCreateUpdateSerializer(serializers.ModelSerializer):
         
         service = Service.objects.create(**validated_data)
         
-        # Create images
-        for image_data in images_data:
-            ServiceImage.objects.create(service=service, **image_data)
-        
-        # Create FAQs
-        for faq_data in faqs_data:
-            ServiceFAQ.objects.create(service=service, **faq_data)
+        # Create images and FAQs (bulk_create skips post_save, so queue the image variants here)
+        images = ServiceImage.objects.bulk_create([
+            ServiceImage(service=service, **image_data) for image_data in images_data
+        ])
+        for image in images:
+            schedule_image_variants(image)
+        ServiceFAQ.objects.bulk_create([ServiceFAQ(service=service, **faq_data) for faq_data in faqs_data])
         
         return service
     
@@ -133,13 +167,48 @@ class ServiceCreateUpdateSerializer(serializers.ModelSerializer):
         # Update images if provided
         if images_data is not None:
             instance.images.all().delete()
-            for image_data in images_data:
-                ServiceImage.objects.create(service=instance, **image_data)
+            images = ServiceImage.objects.bulk_create([
+                ServiceImage(service=instance, **image_data) for image_data in images_data
+            ])
+            for image in images:
+                schedule_image_variants(image)
         
         # Update FAQs if provided
         if faqs_data is not None:
             instance.faqs.all().delete()
-            for faq_data in faqs_data:
-                ServiceFAQ.objects.create(service=instance, **faq_data)
+            ServiceFAQ.objects.bulk_create([ServiceFAQ(service=instance, **faq_data) for faq_data in faqs_data])
         
         return instance
+
+
+class ServiceImportSerializer(serializers.ModelSerializer):
+    """
+    Serializer for one row of a bulk service import
+    
+    Categories are checked against the IDs in context['category_ids'] so a
+    batch of rows is validated without a query per row.
+    """
+    external_id = serializers.CharField(max_length=100)
+    category = serializers.IntegerField()
+    faqs = ServiceFAQSerializer(many=True, required=False)
+    
+    class Meta:
+        model = Service
+        fields = [
+            'external_id', 'category', 'title', 'description', 'short_description',
+            'pricing_type', 'base_price', 'hourly_rate', 'duration_minutes',
+            'is_remote', 'is_onsite', 'status', 'min_booking_hours',
+            'max_bookings_per_day', 'faqs'
+        ]
+    
+    def validate_category(self, value):
+        if value not in self.context['category_ids']:
+            raise serializers.ValidationError('Invalid category')
+        return value
+    
+    def validate(self, data):
+        if data.get('pricing_type') == 'hourly' and not data.get('hourly_rate'):
+            raise serializers.ValidationError({
+                'hourly_rate': 'Hourly rate is required for hourly pricing type'
+            })
+        return data
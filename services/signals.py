@@ -0,0 +1,137 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from bookings.models import Booking
+from providers.models import Provider, ServiceCategory
+from reviews.models import Review
+from .autocomplete import record_change
+from .models import Service, ServiceImage, ServiceFAQ
+from .rankings import mark_rankings_stale
+from .search import update_search_vectors
+from utils.cache import invalidate_tags
+from utils.images import schedule_image_variants
+
+SEARCH_FIELDS = {'title', 'description', 'short_description', 'provider'}
+
+# Fields that decide which service lists a service appears in, and where:
+# the filters, ?search= fields and ordering fields of the list
+LISTING_FIELDS = (
+    'provider_id', 'category_id', 'status', 'pricing_type', 'base_price',
+    'is_remote', 'is_onsite', 'created_at', 'title', 'description',
+    'short_description', 'average_rating', 'total_reviews', 'views_count',
+    'bookings_count'
+)
+
+# Fields that decide whether and how an object appears in the autocomplete index
+AUTOCOMPLETE_FIELDS = {
+    Service: ('service', ('title', 'status')),
+    ServiceCategory: ('category', ('name', 'is_active')),
+    Provider: ('provider', ('business_name', 'status')),
+}
+
+
+def get_listing_state(instance):
+    return tuple(instance.__dict__.get(field) for field in LISTING_FIELDS)
+
+
+@receiver(post_save, sender=Service)
+def refresh_service_search_vector(sender, instance, update_fields=None, **kwargs):
+    """Refresh the search vector when searchable service fields change"""
+    if update_fields is None or SEARCH_FIELDS & set(update_fields):
+        update_search_vectors(Service.objects.filter(pk=instance.pk))
+
+
+@receiver(post_init, sender=Provider)
+def remember_business_name(sender, instance, **kwargs):
+    """Remember the loaded business name to detect renames on save"""
+    instance._loaded_business_name = instance.__dict__.get('business_name')
+
+
+@receiver(post_save, sender=Provider)
+def refresh_provider_services_search_vector(sender, instance, created=False, **kwargs):
+    """Refresh the provider's services when its business name changes"""
+    if not created and instance.business_name != instance._loaded_business_name:
+        update_search_vectors(Service.objects.filter(provider=instance))
+        # ?search= matches the business name, so lists may gain or lose services
+        invalidate_tags('services')
+    instance._loaded_business_name = instance.business_name
+
+
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def service_rankings_changed(sender, **kwargs):
+    """Recompute rankings after services or ratings change"""
+    mark_rankings_stale()
+
+
+@receiver(post_save, sender=Booking)
+def booking_rankings_changed(sender, created=False, **kwargs):
+    """Recompute featured rankings after new bookings"""
+    if created:
+        mark_rankings_stale()
+
+
+@receiver(post_init, sender=Service)
+def remember_listing_state(sender, instance, **kwargs):
+    """Remember the loaded listing fields to detect list membership changes"""
+    instance._loaded_listing_state = get_listing_state(instance)
+
+
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+def service_changed(sender, instance, created=False, **kwargs):
+    """Invalidate cached responses that include the service"""
+    tags = [f'service:{instance.pk}']
+    if created or kwargs['signal'] is post_delete or (
+        get_listing_state(instance) != instance._loaded_listing_state
+    ):
+        # The service may enter, leave or move within cached lists
+        tags.append('services')
+    invalidate_tags(*tags)
+    instance._loaded_listing_state = get_listing_state(instance)
+
+
+@receiver(post_save, sender=ServiceImage)
+@receiver(post_delete, sender=ServiceImage)
+@receiver(post_save, sender=ServiceFAQ)
+@receiver(post_delete, sender=ServiceFAQ)
+def service_details_changed(sender, instance, **kwargs):
+    """Invalidate cached responses that nest the service's images or FAQs"""
+    invalidate_tags(f'service:{instance.service_id}')
+
+
+def get_autocomplete_state(instance):
+    return tuple(instance.__dict__.get(field) for field in AUTOCOMPLETE_FIELDS[type(instance)][1])
+
+
+@receiver(post_init, sender=Service)
+@receiver(post_init, sender=ServiceCategory)
+@receiver(post_init, sender=Provider)
+def remember_autocomplete_state(sender, instance, **kwargs):
+    """Remember the loaded indexed fields to detect autocomplete changes"""
+    instance._loaded_autocomplete_state = get_autocomplete_state(instance)
+
+
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+@receiver(post_save, sender=ServiceCategory)
+@receiver(post_delete, sender=ServiceCategory)
+@receiver(post_save, sender=Provider)
+@receiver(post_delete, sender=Provider)
+def autocomplete_changed(sender, instance, created=False, **kwargs):
+    """Queue the object for reindexing once the change is committed"""
+    state = get_autocomplete_state(instance)
+    if created or kwargs['signal'] is post_delete or state != instance._loaded_autocomplete_state:
+        kind = AUTOCOMPLETE_FIELDS[sender][0]
+        pk = instance.pk
+        transaction.on_commit(lambda: record_change(kind, pk))
+    instance._loaded_autocomplete_state = state
+
+
+@receiver(post_save, sender=Service)
+@receiver(post_save, sender=ServiceImage)
+def service_image_saved(sender, instance, **kwargs):
+    """Render resized variants of new or replaced service images"""
+    schedule_image_variants(instance)
@@ -0,0 +1,29 @@
+from celery import shared_task
+from .price_stats import refresh_price_stats
+from .rankings import refresh_stale_rankings
+from .recommendations import rebuild_recommendations
+from .view_counter import flush_service_views
+
+
+@shared_task
+def flush_service_view_counts():
+    """Write buffered service view counts to the database"""
+    return flush_service_views()
+
+
+@shared_task
+def refresh_service_rankings():
+    """Recompute featured/popular rankings if they are stale"""
+    return refresh_stale_rankings()
+
+
+@shared_task
+def rebuild_service_recommendations():
+    """Rebuild "customers also booked" recommendations from booking history"""
+    return rebuild_recommendations()
+
+
+@shared_task
+def refresh_category_price_stats():
+    """Recompute the price distribution rollup of every category"""
+    return refresh_price_stats()
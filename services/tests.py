@@ -1,3 +1,1417 @@
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+from providers.models import Provider, ServiceCategory
+from bookings.models import Booking
+from reviews.models import Review
+from servicehub_backend.celery import app as celery_app
+from PIL import Image
+from .autocomplete import index as autocomplete_index
+from .bulk_import import import_services
+from .models import CategoryPriceStats, Service, ServiceFAQ, SimilarService
+from .price_stats import refresh_price_stats
+from .rankings import refresh_rankings, refresh_stale_rankings
+from .recommendations import rebuild_recommendations
+from .serializers import ServiceDetailSerializer, ServiceListSerializer
+from .view_counter import (
+    flush_bucket, flush_service_views, get_bucket, get_flushed_slot, record_service_view, set_flushed_slot
+)
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO, StringIO
+from unittest import mock
+import datetime
+import json
+import tempfile
+import time
 
-# Create your tests here.
+User = get_user_model()
+
+
+class ServiceRatingTest(APITestCase):
+    """Test cases for the denormalized service rating columns"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.customer = User.objects.create_user(phone='+15550000001')
+        self.provider_user = User.objects.create_user(phone='+15550000002')
+        self.category = ServiceCategory.objects.create(name='Plumbing')
+        self.provider = Provider.objects.create(
+            user=self.provider_user,
+            business_name='Test Services',
+            hourly_rate=50.00,
+            city='New York',
+            state='NY',
+            country='USA',
+            postal_code='10001',
+            status='approved'
+        )
+        self.services = [
+            Service.objects.create(
+                provider=self.provider,
+                category=self.category,
+                title=f'Service {i}',
+                description='Description',
+                base_price=100,
+                hourly_rate=50
+            )
+            for i in range(3)
+        ]
+
+    def create_review(self, rating):
+        booking = Booking.objects.create(
+            customer=self.customer,
+            provider=self.provider,
+            service_title='Fix Leak',
+            service_description='Need to fix kitchen sink leak',
+            # A day each, as a provider's bookings cannot overlap
+            booking_date=datetime.date.today() - datetime.timedelta(days=Booking.objects.count()),
+            start_time=datetime.time(10, 0),
+            end_time=datetime.time(12, 0),
+            duration_hours=2.0,
+            service_address='123 Main St',
+            city='New York',
+            postal_code='10001',
+            hourly_rate=self.provider.hourly_rate,
+            status='completed'
+        )
+        return Review.objects.create(
+            booking=booking,
+            provider=self.provider,
+            customer=self.customer,
+            rating=rating,
+            title='Review',
+            comment='Comment'
+        )
+
+    def test_review_changes_update_services(self):
+        """Test creating, updating and deleting reviews keeps service ratings current"""
+        self.create_review(5)
+        review = self.create_review(4)
+
+        service = Service.objects.get(pk=self.services[0].pk)
+        self.assertEqual(float(service.average_rating), 4.5)
+        self.assertEqual(service.total_reviews, 2)
+
+        review.rating = 2
+        review.save()
+        service.refresh_from_db()
+        self.assertEqual(float(service.average_rating), 3.5)
+
+        review.delete()
+        service.refresh_from_db()
+        self.assertEqual(float(service.average_rating), 5.0)
+        self.assertEqual(service.total_reviews, 1)
+
+    def test_list_query_count_is_constant(self):
+        """Test the list endpoint does not query ratings per service"""
+        self.create_review(5)
+
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/services/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['average_rating'], 5.0)
+
+        for i in range(5):
+            Service.objects.create(
+                provider=self.provider,
+                category=self.category,
+                title=f'Extra {i}',
+                description='Description',
+                base_price=100,
+                hourly_rate=50
+            )
+        with self.assertNumQueries(2):
+            self.client.get('/api/services/')
+
+    def test_min_rating_filter(self):
+        """Test services are filtered by rating and a malformed rating is rejected"""
+        self.create_review(4)
+        Service.objects.filter(pk=self.services[0].pk).update(average_rating=2)
+
+        response = self.client.get('/api/services/?min_rating=3')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 2)
+
+        response = self.client.get('/api/services/?min_rating=abc')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('min_rating', response.data)
+
+    def test_rating_change_invalidates_lists(self):
+        """Test new ratings invalidate cached lists filtered by rating"""
+        url = '/api/services/?min_rating=3'
+        self.assertEqual(self.client.get(url).data['count'], 0)
+
+        self.create_review(4)
+
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['count'], 3)
+
+    def test_sync_command_backfills_stale_ratings(self):
+        """Test the sync command repairs and verifies stored ratings"""
+        self.create_review(3)
+        Service.objects.update(average_rating=0, total_reviews=0)
+
+        out = StringIO()
+        call_command('sync_service_ratings', '--verify', stdout=out)
+        self.assertIn('3 services have stale ratings', out.getvalue())
+
+        call_command('sync_service_ratings', stdout=StringIO())
+        self.assertFalse(Service.objects.exclude(average_rating=3, total_reviews=1).exists())
+
+        out = StringIO()
+        call_command('sync_service_ratings', '--verify', stdout=out)
+        self.assertIn('up to date', out.getvalue())
+
+
+class ServiceViewCounterTest(TransactionTestCase):
+    """Test cases for the buffered service view counter"""
+
+    def setUp(self):
+        cache.clear()
+        provider_user = User.objects.create_user(phone='+15550000003')
+        category = ServiceCategory.objects.create(name='Cleaning')
+        provider = Provider.objects.create(
+            user=provider_user,
+            business_name='Clean Co',
+            hourly_rate=30.00,
+            city='Boston',
+            state='MA',
+            country='USA',
+            postal_code='02101',
+            status='approved'
+        )
+        self.service = Service.objects.create(
+            provider=provider,
+            category=category,
+            title='Deep Clean',
+            description='Description',
+            base_price=80,
+            hourly_rate=30
+        )
+
+    def view_service(self, _):
+        try:
+            return APIClient().get(f'/api/services/{self.service.pk}/').status_code
+        finally:
+            connection.close()
+
+    def test_parallel_views_are_not_lost(self):
+        """Test concurrent detail requests are all counted after a flush"""
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            codes = list(pool.map(self.view_service, range(200)))
+        self.assertEqual(codes, [status.HTTP_200_OK] * 200)
+
+        # Nothing is written until the buckets are closed
+        self.service.refresh_from_db()
+        self.assertEqual(self.service.views_count, 0)
+
+        flushed = flush_service_views(now=time.time() + 600)
+        self.assertEqual(flushed, 200)
+        self.service.refresh_from_db()
+        self.assertEqual(self.service.views_count, 200)
+
+        # Flushing again does not double count
+        self.assertEqual(flush_service_views(now=time.time() + 600), 0)
+        self.service.refresh_from_db()
+        self.assertEqual(self.service.views_count, 200)
+
+    def test_idle_gap_only_flushes_buckets_with_views(self):
+        """Test the first view after an idle day flushes the buckets with views, not every bucket since"""
+        start = time.time()
+        with mock.patch('services.view_counter.time.time', return_value=start):
+            record_service_view(self.service.pk)
+
+        with mock.patch('services.view_counter.flush_bucket', wraps=flush_bucket) as flush:
+            with mock.patch('services.view_counter.time.time', return_value=start + 60 * 60 * 23):
+                record_service_view(self.service.pk)
+        self.assertEqual(flush.call_count, 1)
+        self.service.refresh_from_db()
+        self.assertEqual(self.service.views_count, 1)
+
+        self.assertEqual(flush_service_views(now=start + 60 * 60 * 24), 1)
+        self.service.refresh_from_db()
+        self.assertEqual(self.service.views_count, 2)
+
+
+    def test_missing_slot_does_not_stall_flushes(self):
+        """Test a bucket slot deleted by an overlapping flush is skipped, and the position never moves back"""
+        start = time.time()
+        for offset in (0, 120):
+            with mock.patch('services.view_counter.time.time', return_value=start + offset):
+                record_service_view(self.service.pk)
+        # A flush that lost its lock flushed the first bucket and deleted its slot
+        flush_bucket(get_bucket(start))
+        cache.delete('service_views:buckets:slot:1')
+        self.service.refresh_from_db()
+        self.assertEqual(self.service.views_count, 1)
+
+        self.assertEqual(flush_service_views(now=start + 600), 1)
+        self.assertEqual(get_flushed_slot(), 2)
+        set_flushed_slot(1)
+        self.assertEqual(get_flushed_slot(), 2)
+        self.service.refresh_from_db()
+        self.assertEqual(self.service.views_count, 2)
+
+class ServiceSearchTest(APITestCase):
+    """Test cases for ranked full-text service search"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        provider_user = User.objects.create_user(phone='+15550000004')
+        category = ServiceCategory.objects.create(name='Plumbing')
+        self.provider = Provider.objects.create(
+            user=provider_user,
+            business_name='Rapid Pipes',
+            hourly_rate=50.00,
+            city='New York',
+            state='NY',
+            country='USA',
+            postal_code='10001',
+            status='approved'
+        )
+        self.title_match = Service.objects.create(
+            provider=self.provider,
+            category=category,
+            title='Leak repair',
+            description='We repair every kind of leak under the kitchen sink.',
+            base_price=100,
+            hourly_rate=50
+        )
+        self.description_match = Service.objects.create(
+            provider=self.provider,
+            category=category,
+            title='Bathroom remodel',
+            description='Full remodel, including fixing any leak we find.',
+            base_price=900,
+            hourly_rate=50
+        )
+
+    def test_search_ranks_and_highlights(self):
+        """Test results are ordered by relevance and include snippets"""
+        response = self.client.get('/api/services/search/', {'q': 'leak'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        results = response.data['results']
+        self.assertEqual(
+            [result['id'] for result in results],
+            [self.title_match.id, self.description_match.id]
+        )
+        self.assertGreater(results[0]['rank'], results[1]['rank'])
+        self.assertIn('<mark>leak</mark>', results[0]['headline'])
+
+    def test_search_follows_provider_rename(self):
+        """Test renaming a provider updates its services' search vectors"""
+        response = self.client.get('/api/services/search/', {'q': 'Plumbright'})
+        self.assertEqual(response.data['count'], 0)
+
+        self.provider.business_name = 'Plumbright'
+        self.provider.save()
+
+        response = self.client.get('/api/services/search/', {'q': 'Plumbright'})
+        self.assertEqual(response.data['count'], 2)
+
+    def test_search_requires_query(self):
+        """Test the search action rejects an empty query"""
+        response = self.client.get('/api/services/search/')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ServiceRankingTest(APITestCase):
+    """Test cases for precomputed featured/popular rankings"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        provider_user = User.objects.create_user(phone='+15550000005')
+        self.plumbing = ServiceCategory.objects.create(name='Plumbing')
+        self.painting = ServiceCategory.objects.create(name='Painting')
+        self.provider = Provider.objects.create(
+            user=provider_user,
+            business_name='Handy Co',
+            hourly_rate=40.00,
+            city='Austin',
+            state='TX',
+            country='USA',
+            postal_code='73301',
+            status='approved'
+        )
+        self.services = [
+            Service.objects.create(
+                provider=self.provider,
+                category=self.plumbing if i % 2 else self.painting,
+                title=f'Service {i}',
+                description='Description',
+                base_price=100,
+                hourly_rate=40,
+                views_count=i * 10
+            )
+            for i in range(4)
+        ]
+        refresh_rankings()
+
+    def test_rankings_are_served_from_cache(self):
+        """Test featured and popular endpoints do not query the database"""
+        with self.assertNumQueries(0):
+            popular = self.client.get('/api/services/popular/')
+            featured = self.client.get('/api/services/featured/')
+        self.assertEqual(popular.status_code, status.HTTP_200_OK)
+        self.assertEqual(featured.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [service['id'] for service in popular.data],
+            [service.id for service in reversed(self.services)]
+        )
+
+    def test_category_rankings(self):
+        """Test per-category rankings only contain that category"""
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/services/popular/', {'category': self.plumbing.id})
+        self.assertEqual(
+            [service['id'] for service in response.data],
+            [self.services[3].id, self.services[1].id]
+        )
+
+    def test_changes_mark_rankings_stale(self):
+        """Test counter changes are picked up by the next refresh"""
+        self.assertEqual(refresh_stale_rankings(), 0)
+
+        self.services[0].views_count = 1000
+        self.services[0].save()
+        self.assertGreater(refresh_stale_rankings(), 0)
+
+        response = self.client.get('/api/services/popular/')
+        self.assertEqual(response.data[0]['id'], self.services[0].id)
+
+    def test_filtered_rankings_fall_back_to_live(self):
+        """Test ad-hoc filters are computed from the database"""
+        response = self.client.get('/api/services/popular/', {'max_price': 50})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [])
+
+
+class ResponseCacheTest(APITestCase):
+    """Test cases for the tag-invalidated response cache"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        provider_user = User.objects.create_user(phone='+15550000006')
+        self.category = ServiceCategory.objects.create(name='Electrical')
+        self.provider = Provider.objects.create(
+            user=provider_user,
+            business_name='Spark Bros',
+            hourly_rate=60.00,
+            city='Denver',
+            state='CO',
+            country='USA',
+            postal_code='80201',
+            status='approved'
+        )
+        self.service, self.other_service = [
+            Service.objects.create(
+                provider=self.provider,
+                category=self.category,
+                title=title,
+                description='Description',
+                base_price=100,
+                hourly_rate=60
+            )
+            for title in ('Rewiring', 'Panel upgrade')
+        ]
+
+    def test_list_is_cached_per_normalized_query(self):
+        """Test equivalent query strings share one cache entry"""
+        first = self.client.get('/api/services/?pricing_type=hourly&ordering=title')
+        self.assertEqual(first['X-Cache'], 'MISS')
+
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/services/?ordering=title&pricing_type=hourly&search=')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.data, first.data)
+
+    def test_changes_invalidate_precisely(self):
+        """Test only entries containing the changed service are invalidated"""
+        self.client.get(f'/api/services/{self.service.pk}/')
+        self.client.get(f'/api/services/{self.other_service.pk}/')
+
+        self.service.title = 'Full rewiring'
+        self.service.save()
+
+        response = self.client.get(f'/api/services/{self.service.pk}/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['title'], 'Full rewiring')
+        response = self.client.get(f'/api/services/{self.other_service.pk}/')
+        self.assertEqual(response['X-Cache'], 'HIT')
+
+    def test_provider_change_invalidates_its_services(self):
+        """Test renaming a provider invalidates service and provider entries"""
+        self.client.get('/api/services/')
+        self.client.get(f'/api/providers/{self.provider.pk}/')
+
+        self.provider.business_name = 'Spark Brothers'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.provider.save()
+
+        response = self.client.get('/api/services/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['results'][0]['provider_name'], 'Spark Brothers')
+        response = self.client.get(f'/api/providers/{self.provider.pk}/')
+        self.assertEqual(response.data['business_name'], 'Spark Brothers')
+
+    def test_search_field_change_invalidates_lists(self):
+        """Test a service renamed into a cached search result invalidates it"""
+        url = '/api/services/?search=rewiring'
+        self.assertEqual(self.client.get(url).data['count'], 1)
+
+        self.other_service.title = 'Rewiring inspection'
+        self.other_service.save()
+
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['count'], 2)
+
+    def test_provider_change_invalidates_sparse_list(self):
+        """Test a list whose fields leave out the provider ID is still tagged with the provider"""
+        url = '/api/services/?fields=id,provider_name'
+        self.client.get(url)
+
+        self.provider.business_name = 'Spark Brothers'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.provider.save()
+
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['results'][0]['provider_name'], 'Spark Brothers')
+
+    def test_provider_change_invalidates_sparse_detail(self):
+        """Test a detail whose fields leave out the provider ID is still tagged with the provider"""
+        url = f'/api/services/{self.service.pk}/?fields=average_rating'
+        self.client.get(url)
+
+        # As Review.update_provider_rating writes it: the services by .update(), the provider by save()
+        self.provider.average_rating = 4.5
+        with self.captureOnCommitCallbacks(execute=True):
+            self.provider.save()
+            Service.objects.filter(provider=self.provider).update(average_rating=4.5)
+
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(float(response.data['average_rating']), 4.5)
+
+    def test_authenticated_requests_bypass_cache(self):
+        """Test authenticated users always get fresh responses"""
+        self.client.force_authenticate(user=self.provider.user)
+        response = self.client.get('/api/services/')
+        self.assertNotIn('X-Cache', response)
+
+    def test_cached_detail_still_counts_views(self):
+        """Test cache hits on service details are still counted as views"""
+        self.client.get(f'/api/services/{self.service.pk}/')
+        self.client.get(f'/api/services/{self.service.pk}/')
+
+        flush_service_views(now=time.time() + 600)
+        self.service.refresh_from_db()
+        self.assertEqual(self.service.views_count, 2)
+
+
+class KeysetPaginationTest(APITestCase):
+    """Test cases for opt-in cursor pagination"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(user=User.objects.create_user(phone='+15550000007'))
+        provider_user = User.objects.create_user(phone='+15550000008')
+        self.category = ServiceCategory.objects.create(name='Gardening')
+        self.provider = Provider.objects.create(
+            user=provider_user,
+            business_name='Green Thumb',
+            hourly_rate=30.00,
+            city='Portland',
+            state='OR',
+            country='USA',
+            postal_code='97201',
+            status='approved'
+        )
+        # Identical prices force the id tiebreaker to keep pages disjoint
+        Service.objects.bulk_create([
+            Service(
+                provider=self.provider,
+                category=self.category,
+                title=f'Service {i}',
+                description='Description',
+                base_price=50 if i % 2 else 75,
+                hourly_rate=30
+            )
+            for i in range(45)
+        ])
+
+    def walk(self, url):
+        """Follow next links and return the IDs of every page"""
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            pages.append([item['id'] for item in response.data['results']])
+            url = response.data['next']
+        return pages
+
+    def test_cursor_pages_cover_all_rows_once(self):
+        """Test walking the cursor pages returns every service exactly once"""
+        pages = self.walk('/api/services/?pagination=cursor&ordering=base_price')
+        ids = [pk for page in pages for pk in page]
+
+        self.assertEqual([len(page) for page in pages], [20, 20, 5])
+        self.assertEqual(len(ids), len(set(ids)))
+        expected = list(
+            Service.objects.order_by('base_price', 'id').values_list('id', flat=True)
+        )
+        self.assertEqual(ids, expected)
+
+    def test_previous_link_returns_previous_page(self):
+        """Test the previous cursor returns the same rows as the forward walk"""
+        first = self.client.get('/api/services/?pagination=cursor')
+        second = self.client.get(first.data['next'])
+        previous = self.client.get(second.data['previous'])
+
+        self.assertEqual(previous.data['results'], first.data['results'])
+        self.assertIsNone(previous.data['previous'])
+
+    def test_cursor_page_skips_count_query(self):
+        """Test a cursor page runs no COUNT query"""
+        first = self.client.get('/api/services/?pagination=cursor')
+        with self.assertNumQueries(1) as queries:
+            self.client.get(first.data['next'])
+        self.assertFalse(any('COUNT(' in query['sql'] for query in queries.captured_queries))
+
+    def test_page_numbers_remain_default(self):
+        """Test requests without a cursor keep page number pagination"""
+        response = self.client.get('/api/services/')
+        self.assertEqual(response.data['count'], 45)
+
+    def test_invalid_cursor(self):
+        """Test malformed cursors are rejected"""
+        response = self.client.get('/api/services/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ServiceNearbyTest(APITestCase):
+    """Test cases for proximity search over services"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.category = ServiceCategory.objects.create(name='Locksmith')
+        other_category = ServiceCategory.objects.create(name='Moving')
+        self.services = {}
+        for i, (city, latitude, longitude) in enumerate((
+            ('Denver', 39.739200, -104.990300),
+            ('Boulder', 40.015000, -105.270500),
+            ('New York', 40.712800, -74.006000),
+        )):
+            provider = Provider.objects.create(
+                user=User.objects.create_user(phone=f'+1555200000{i}'),
+                business_name=f'{city} Locks',
+                hourly_rate=40.00,
+                city=city,
+                state='CO',
+                country='USA',
+                postal_code='80000',
+                latitude=latitude,
+                longitude=longitude,
+                status='approved'
+            )
+            for category in (self.category, other_category):
+                self.services[(city, category.name)] = Service.objects.create(
+                    provider=provider,
+                    category=category,
+                    title=f'{city} {category.name}',
+                    description='Description',
+                    base_price=80
+                )
+
+    def test_radius_search_with_filters(self):
+        """Test services are filtered by category and ordered by provider distance"""
+        response = self.client.get('/api/services/nearby/', {
+            'lat': 40.0, 'lng': -105.25, 'radius': 50, 'category': self.category.id
+        })
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item['title'] for item in response.data['results']],
+            ['Boulder Locksmith', 'Denver Locksmith']
+        )
+        self.assertIn('distance_km', response.data['results'][0])
+
+    def test_nearest_services(self):
+        """Test k-nearest queries stop at the maximum search radius"""
+        response = self.client.get('/api/services/nearby/', {'lat': 40.7, 'lng': -74.0, 'limit': 3})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item['title'] for item in response.data],
+            ['New York Locksmith', 'New York Moving']
+        )
+
+    def test_location_required(self):
+        """Test the location parameters are required"""
+        response = self.client.get('/api/services/nearby/')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ServiceFacetTest(APITestCase):
+    """Test cases for catalog facet counts"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        provider = Provider.objects.create(
+            user=User.objects.create_user(phone='+15550000009'),
+            business_name='Handy Co',
+            hourly_rate=40.00,
+            city='Austin',
+            state='TX',
+            country='USA',
+            postal_code='73301',
+            status='approved'
+        )
+        self.repairs = ServiceCategory.objects.create(name='Repairs')
+        self.tutoring = ServiceCategory.objects.create(name='Tutoring')
+        for category, pricing_type, price, is_remote, is_onsite, service_status in (
+            (self.repairs, 'hourly', 30, False, True, 'active'),
+            (self.repairs, 'fixed', 120, False, True, 'active'),
+            (self.repairs, 'fixed', 900, False, True, 'active'),
+            (self.tutoring, 'hourly', 45, True, False, 'active'),
+            (self.tutoring, 'hourly', 60, True, True, 'active'),
+            (self.tutoring, 'package', 60, True, True, 'draft'),
+        ):
+            Service.objects.create(
+                provider=provider,
+                category=category,
+                title=f'{category.name} {price}',
+                description='Description',
+                pricing_type=pricing_type,
+                base_price=price,
+                is_remote=is_remote,
+                is_onsite=is_onsite,
+                status=service_status
+            )
+
+    def test_facets_in_one_query(self):
+        """Test every facet is counted from a single query"""
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/services/facets/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total'], 5)
+        self.assertEqual(
+            [(item['name'], item['count']) for item in response.data['category']],
+            [('Repairs', 3), ('Tutoring', 2)]
+        )
+        self.assertEqual(
+            {item['value']: item['count'] for item in response.data['pricing_type']},
+            {'hourly': 3, 'fixed': 2, 'package': 0}
+        )
+        self.assertEqual(response.data['location'], {'remote': 2, 'onsite': 4})
+        self.assertEqual(
+            [(item['key'], item['count']) for item in response.data['price']],
+            [('0-50', 2), ('50-100', 1), ('100-250', 1), ('250-500', 0), ('500+', 1)]
+        )
+
+    def test_facets_follow_filters(self):
+        """Test facet counts apply the list filters"""
+        response = self.client.get('/api/services/facets/', {'is_remote': 'true', 'max_price': 50})
+        self.assertEqual(response.data['total'], 1)
+        self.assertEqual(response.data['category'], [
+            {'id': self.tutoring.id, 'name': 'Tutoring', 'count': 1}
+        ])
+
+    def test_facets_cached_per_filter_set(self):
+        """Test repeated filter sets are served from the cache until services change"""
+        self.client.get('/api/services/facets/', {'category': self.repairs.id})
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/services/facets/', {'category': self.repairs.id})
+        self.assertEqual(response['X-Cache'], 'HIT')
+
+        Service.objects.filter(category=self.repairs).first().delete()
+        response = self.client.get('/api/services/facets/', {'category': self.repairs.id})
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['total'], 2)
+
+
+class AutocompleteTest(APITestCase):
+    """Test cases for the in-memory autocomplete index"""
+
+    def setUp(self):
+        cache.clear()
+        autocomplete_index.entries = None
+        self.client = APIClient()
+        self.category = ServiceCategory.objects.create(name='Plumbing')
+        self.provider = Provider.objects.create(
+            user=User.objects.create_user(phone='+15550000010'),
+            business_name='Plumb Perfect',
+            hourly_rate=40.00,
+            city='Austin',
+            state='TX',
+            country='USA',
+            postal_code='73301',
+            status='approved'
+        )
+        self.service = Service.objects.create(
+            provider=self.provider,
+            category=self.category,
+            title='Emergency Plumbing Repair',
+            description='Description',
+            base_price=100
+        )
+
+    def labels(self, response):
+        return [(item['type'], item['label']) for item in response.data]
+
+    def test_prefix_matches_word_starts(self):
+        """Test prefixes match any word, with whole-label matches first"""
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/services/autocomplete/', {'q': 'plum'})
+        self.assertEqual(self.labels(response), [
+            ('category', 'Plumbing'),
+            ('provider', 'Plumb Perfect'),
+            ('service', 'Emergency Plumbing Repair'),
+        ])
+
+        # Later lookups are served from memory
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/services/autocomplete/', {'q': 'REP', 'type': 'service'})
+        self.assertEqual(self.labels(response), [('service', 'Emergency Plumbing Repair')])
+
+    def test_changes_update_index_incrementally(self):
+        """Test committed changes are applied without a full rebuild"""
+        self.client.get('/api/services/autocomplete/', {'q': 'plum'})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.service.title = 'Drain Cleaning'
+            self.service.save()
+            self.provider.status = 'suspended'
+            self.provider.save()
+
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/services/autocomplete/', {'q': 'plum'})
+        self.assertEqual(self.labels(response), [('category', 'Plumbing')])
+        response = self.client.get('/api/services/autocomplete/', {'q': 'drain'})
+        self.assertEqual(self.labels(response), [('service', 'Drain Cleaning')])
+
+    def test_changes_swap_in_new_lists(self):
+        """Test replays never modify the lists a running search may be reading"""
+        self.client.get('/api/services/autocomplete/', {'q': 'plum'})
+        entries = autocomplete_index.entries
+        service_entries = list(entries['service'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.service.title = 'Drain Cleaning'
+            self.service.save()
+        self.client.get('/api/services/autocomplete/', {'q': 'drain'})
+
+        self.assertEqual(entries['service'], service_entries)
+        self.assertIsNot(autocomplete_index.entries, entries)
+        self.assertIs(autocomplete_index.entries['category'], entries['category'])
+
+    def test_other_processes_replay_change_log(self):
+        """Test a stale index catches up from the shared change log"""
+        self.client.get('/api/services/autocomplete/', {'q': 'plum'})
+        stale_sequence = autocomplete_index.sequence
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.name = 'Pipes'
+            self.category.save()
+        # Simulate a process that has not seen the change yet
+        autocomplete_index.sequence = stale_sequence
+        autocomplete_index.dirty = False
+        autocomplete_index.checked_at = 0
+
+        response = self.client.get('/api/services/autocomplete/', {'q': 'pip'})
+        self.assertEqual(self.labels(response), [('category', 'Pipes')])
+
+    def test_invalid_params(self):
+        """Test invalid limits and types are rejected"""
+        response = self.client.get('/api/services/autocomplete/', {'q': 'plum', 'type': 'user'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get('/api/services/autocomplete/', {'q': 'plum', 'limit': 100})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BulkImportTest(APITestCase):
+    """Test cases for bulk service import"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(phone='+15550000011')
+        self.provider = Provider.objects.create(
+            user=self.user,
+            business_name='Catalog Co',
+            hourly_rate=40.00,
+            city='Austin',
+            state='TX',
+            country='USA',
+            postal_code='73301',
+            status='approved'
+        )
+        self.category = ServiceCategory.objects.create(name='Repairs')
+        self.client.force_authenticate(user=self.user)
+
+    def upload(self, name, content):
+        upload = SimpleUploadedFile(name, content.encode())
+        return self.client.post('/api/services/import/', {'file': upload}, format='multipart')
+
+    def test_jsonl_upsert_with_faqs(self):
+        """Test rows are created, then updated by external_id with their FAQs replaced"""
+        rows = [
+            {
+                'external_id': f'svc-{i}', 'category': self.category.id, 'title': f'Repair {i}',
+                'description': 'Description', 'pricing_type': 'fixed', 'base_price': '99.00',
+                'faqs': [{'question': 'Warranty?', 'answer': 'One year'}]
+            }
+            for i in range(3)
+        ]
+        response = self.upload('services.jsonl', '\n'.join(json.dumps(row) for row in rows))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['created'], response.data['updated']), (3, 0))
+        self.assertEqual(ServiceFAQ.objects.filter(service__provider=self.provider).count(), 3)
+
+        rows[0].update(title='Repair zero', faqs=[{'question': 'Parts?', 'answer': 'Included'}])
+        response = self.upload('services.jsonl', json.dumps(rows[0]))
+
+        self.assertEqual((response.data['created'], response.data['updated']), (0, 1))
+        service = Service.objects.get(provider=self.provider, external_id='svc-0')
+        self.assertEqual(service.title, 'Repair zero')
+        self.assertEqual(list(service.faqs.values_list('question', flat=True)), ['Parts?'])
+        self.assertEqual(Service.objects.filter(provider=self.provider).count(), 3)
+        self.assertEqual(
+            Service.objects.filter(pk=service.pk, search_vector__isnull=False).count(), 1
+        )
+
+    def test_row_errors_do_not_abort_batch(self):
+        """Test invalid rows are reported while valid rows are imported"""
+        content = (
+            'external_id,category,title,description,pricing_type,base_price,hourly_rate\n'
+            f'a,{self.category.id},Valid,Description,hourly,50,25\n'
+            f'b,{self.category.id},No rate,Description,hourly,50,\n'
+            'c,9999,Bad category,Description,fixed,50,\n'
+            f'a,{self.category.id},Duplicate,Description,fixed,50,\n'
+        )
+        response = self.upload('services.csv', content)
+
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(response.data['failed'], 3)
+        self.assertEqual(
+            {error['row']: list(error['errors']) for error in response.data['errors']},
+            {2: ['hourly_rate'], 3: ['category'], 4: ['external_id']}
+        )
+
+    def test_import_in_batches(self):
+        """Test the query count grows with batches, not rows"""
+        lines = StringIO('\n'.join(
+            json.dumps({
+                'external_id': f'bulk-{i}', 'category': self.category.id, 'title': f'Bulk {i}',
+                'description': 'Description', 'pricing_type': 'fixed', 'base_price': 10
+            })
+            for i in range(250)
+        ))
+        with CaptureQueriesContext(connection) as queries:
+            result = import_services(self.provider, lines, 'jsonl', batch_size=100)
+
+        self.assertEqual(result['created'], 250)
+        self.assertLess(len(queries), 30)
+
+    def test_requires_provider(self):
+        """Test only providers can import services"""
+        self.client.force_authenticate(user=User.objects.create_user(phone='+15550000012'))
+        response = self.upload('services.jsonl', '')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class ImageVariantTest(APITestCase):
+    """Test cases for resized image variants"""
+
+    def setUp(self):
+        cache.clear()
+        celery_app.conf.task_always_eager = True
+        self.addCleanup(setattr, celery_app.conf, 'task_always_eager', False)
+        self.client = APIClient()
+        self.category = ServiceCategory.objects.create(name='Photography')
+        self.provider = Provider.objects.create(
+            user=User.objects.create_user(phone='+15550000013'),
+            business_name='Shutter Co',
+            hourly_rate=40.00,
+            city='Austin',
+            state='TX',
+            country='USA',
+            postal_code='73301',
+            status='approved'
+        )
+
+    def make_image(self, name='photo.png', size=(1600, 900)):
+        buffer = BytesIO()
+        Image.new('RGBA', size, (200, 80, 40, 255)).save(buffer, format='PNG')
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+    def create_service(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Service.objects.create(
+                provider=self.provider,
+                category=self.category,
+                title='Portraits',
+                description='Description',
+                base_price=100,
+                image=self.make_image()
+            )
+
+    def test_upload_renders_variants(self):
+        """Test saving an image renders every size in both formats"""
+        service = self.create_service()
+        service.refresh_from_db()
+
+        variants = service.image_variants
+        self.assertEqual(variants['source'], service.image.name)
+        self.assertEqual((variants['sizes']['small']['width'], variants['sizes']['small']['height']), (480, 270))
+        self.assertTrue(variants['placeholder'].startswith('data:image/webp;base64,'))
+        with default_storage.open(variants['sizes']['thumb']['webp']) as file:
+            self.assertEqual(Image.open(file).format, 'WEBP')
+        with default_storage.open(variants['sizes']['medium']['jpeg']) as file:
+            self.assertEqual(Image.open(file).size, (1024, 576))
+
+    def test_serializers_expose_size_urls(self):
+        """Test list responses include per-size URLs"""
+        self.create_service()
+        response = self.client.get('/api/services/')
+
+        variants = response.data['results'][0]['image_variants']
+        self.assertTrue(variants['small']['webp'].startswith('http://testserver/media/variants/'))
+        self.assertTrue(variants['small']['jpeg'].endswith('/small.jpeg'))
+
+    def test_replaced_image_hides_stale_variants(self):
+        """Test variants of a replaced image are not served until re-rendered"""
+        service = self.create_service()
+        service.refresh_from_db()
+        celery_app.conf.task_always_eager = False
+
+        service.image = self.make_image('other.png', (300, 300))
+        service.save()
+        self.assertIsNone(ServiceListSerializer(service).data['image_variants'])
+
+        call_command('backfill_image_variants', '--sync', '--model', 'services.Service', stdout=StringIO())
+        service.refresh_from_db()
+        self.assertEqual(service.image_variants['source'], service.image.name)
+        # Small originals are re-encoded but never upscaled
+        self.assertEqual(service.image_variants['sizes']['medium']['width'], 300)
+
+
+class SparseFieldsetTest(APITestCase):
+    """Test cases for ?fields= and ?expand="""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.category = ServiceCategory.objects.create(name='Cleaning')
+        self.customer = User.objects.create_user(phone='+15550000014')
+        self.provider = self.create_provider('+15550000015')
+        self.service = self.create_service(self.provider)
+
+    def create_provider(self, phone):
+        provider = Provider.objects.create(
+            user=User.objects.create_user(phone=phone),
+            business_name=f'Sparkle {phone[-2:]}',
+            hourly_rate=40.00,
+            city='Austin',
+            state='TX',
+            country='USA',
+            postal_code='73301',
+            status='approved'
+        )
+        provider.categories.add(self.category)
+        return provider
+
+    def create_service(self, provider):
+        return Service.objects.create(
+            provider=provider,
+            category=self.category,
+            title='Deep Clean',
+            description='Description',
+            base_price=100
+        )
+
+    def create_booking(self, provider):
+        return Booking.objects.create(
+            customer=self.customer,
+            provider=provider,
+            service_title='Deep Clean',
+            service_description='Description',
+            # A day each, as a provider's bookings cannot overlap
+            booking_date=datetime.date.today() - datetime.timedelta(days=Booking.objects.count()),
+            start_time=datetime.time(10, 0),
+            end_time=datetime.time(12, 0),
+            duration_hours=2.0,
+            service_address='123 Main St',
+            city='Austin',
+            postal_code='73301',
+            hourly_rate=provider.hourly_rate
+        )
+
+    def test_fields_prune_nested_serializers(self):
+        """Test only the requested fields are returned and fetched"""
+        with self.assertNumQueries(7):
+            response = self.client.get(f'/api/services/{self.service.id}/')
+        self.assertIn('categories', response.data['provider'])
+
+        cache.clear()
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                f'/api/services/{self.service.id}/?fields=title,provider.business_name'
+            )
+        self.assertEqual(response.data, {
+            'id': self.service.id,
+            'title': 'Deep Clean',
+            'provider': {'id': self.provider.id, 'business_name': self.provider.business_name},
+        })
+
+    def test_fields_on_list(self):
+        """Test list items are pruned and unknown names are ignored"""
+        response = self.client.get('/api/services/?fields=title,base_price,nonexistent')
+        self.assertEqual(set(response.data['results'][0]), {'id', 'title', 'base_price'})
+
+    def test_expand_without_n_plus_one(self):
+        """Test expanded relations are fetched in a constant number of queries"""
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/services/?expand=provider')
+        provider = response.data['results'][0]['provider']
+        self.assertEqual(provider['business_name'], self.provider.business_name)
+        self.assertEqual(provider['categories'][0]['name'], 'Cleaning')
+
+        for i in range(5):
+            self.create_service(self.create_provider(f'+155500001{i:02d}'))
+        cache.clear()
+        # The provider's categories are no longer requested, so not prefetched either
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/services/?expand=provider&fields=title,provider.city')
+        self.assertEqual(set(response.data['results'][0]['provider']), {'id', 'city'})
+
+    def test_booking_list_without_n_plus_one(self):
+        """Test bookings of many providers are listed in a constant number of queries"""
+        self.client.force_authenticate(self.customer)
+        self.create_booking(self.provider)
+        self.client.get('/api/bookings/')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/bookings/')
+
+        for i in range(5):
+            self.create_booking(self.create_provider(f'+155500002{i:02d}'))
+        with self.assertNumQueries(len(queries)):
+            response = self.client.get('/api/bookings/?expand=cancelled_by')
+        self.assertEqual(len(response.data['results']), 6)
+
+        with self.assertNumQueries(len(queries) - 2):
+            response = self.client.get('/api/bookings/?fields=status,provider.business_name')
+        self.assertEqual(set(response.data['results'][0]), {'id', 'status', 'provider'})
+
+
+class ConditionalGetTest(APITestCase):
+    """Test cases for ETag and Last-Modified support"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.customer = User.objects.create_user(phone='+15550000016')
+        self.category = ServiceCategory.objects.create(name='Gardening')
+        self.provider = Provider.objects.create(
+            user=User.objects.create_user(phone='+15550000017'),
+            business_name='Green Co',
+            hourly_rate=40.00,
+            city='Austin',
+            state='TX',
+            country='USA',
+            postal_code='73301',
+            status='approved'
+        )
+        self.service = Service.objects.create(
+            provider=self.provider,
+            category=self.category,
+            title='Lawn Care',
+            description='Description',
+            base_price=100
+        )
+        # Authenticated requests bypass the response cache, so only the ETag can skip serializing
+        self.client.force_authenticate(self.customer)
+
+    def test_not_modified_skips_serializer(self):
+        """Test a matching If-None-Match returns 304 without serializing"""
+        url = f'/api/services/{self.service.id}/'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('"'))
+        self.assertIn('Last-Modified', response)
+
+        with mock.patch.object(ServiceDetailSerializer, 'to_representation') as to_representation:
+            with self.assertNumQueries(1):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        to_representation.assert_not_called()
+
+    def test_nested_changes_change_etag(self):
+        """Test changes to nested objects give the response a new ETag"""
+        url = f'/api/services/{self.service.id}/'
+        etag = self.client.get(url)['ETag']
+
+        ServiceFAQ.objects.create(service=self.service, question='Tools?', answer='Yes')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['faqs']), 1)
+
+        etag = response['ETag']
+        self.provider.business_name = 'Greener Co'
+        self.provider.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['provider']['business_name'], 'Greener Co')
+
+    def test_flushed_views_change_etag(self):
+        """Test flushing view counts gives the service a new ETag"""
+        url = f'/api/services/{self.service.id}/'
+        etag = self.client.get(url)['ETag']
+
+        self.assertEqual(flush_service_views(now=time.time() + 600), 1)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['views_count'], 1)
+
+    def test_representations_have_own_etags(self):
+        """Test sparse fieldsets of the same service have different ETags"""
+        url = f'/api/services/{self.service.id}/'
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(f'{url}?fields=title', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_hidden_service_is_not_confirmed(self):
+        """Test a service that is no longer visible returns 404 instead of 304"""
+        url = f'/api/services/{self.service.id}/'
+        etag = self.client.get(url)['ETag']
+        Service.objects.filter(pk=self.service.pk).update(status='draft')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_if_modified_since(self):
+        """Test If-Modified-Since is answered from the Last-Modified time"""
+        response = self.client.get('/api/providers/categories/')
+        last_modified = response['Last-Modified']
+
+        with mock.patch('providers.views.ServiceCategorySerializer.to_representation') as to_representation:
+            response = self.client.get('/api/providers/categories/', HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        to_representation.assert_not_called()
+
+    def test_provider_and_profile(self):
+        """Test provider details and the user profile support conditional GET"""
+        for url in (f'/api/providers/{self.provider.id}/', '/api/users/profile/'):
+            etag = self.client.get(url)['ETag']
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.customer.first_name = 'Ada'
+        self.customer.save()
+        response = self.client.get('/api/users/profile/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['first_name'], 'Ada')
+
+
+class RecommendationTest(APITestCase):
+    """Test cases for "customers also booked" recommendations"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.repairs = ServiceCategory.objects.create(name='Repairs')
+        self.cleaning = ServiceCategory.objects.create(name='Cleaning')
+        self.providers = [self.create_provider(i) for i in range(4)]
+        a, b, c, d = self.providers
+        self.a_repairs = self.create_service(a, self.repairs)
+        self.b_repairs = self.create_service(b, self.repairs)
+        self.b_cleaning = self.create_service(b, self.cleaning)
+        self.c_repairs = self.create_service(c, self.repairs)
+        self.d_repairs = self.create_service(d, self.repairs)
+
+        # Two customers booked A and B, one booked A and C, one cancelled on D
+        for i, providers in enumerate(([a, b, b], [a, b], [a, c])):
+            customer = User.objects.create_user(phone=f'+155500003{i:02d}')
+            for provider in providers:
+                self.create_booking(customer, provider)
+        self.create_booking(customer, d, status='cancelled')
+
+    def create_provider(self, i):
+        return Provider.objects.create(
+            user=User.objects.create_user(phone=f'+155500004{i:02d}'),
+            business_name=f'Provider {i}',
+            hourly_rate=40.00,
+            city='Austin',
+            state='TX',
+            country='USA',
+            postal_code='73301',
+            status='approved'
+        )
+
+    def create_service(self, provider, category):
+        return Service.objects.create(
+            provider=provider,
+            category=category,
+            title=f'{category.name} by {provider.business_name}',
+            description='Description',
+            base_price=100
+        )
+
+    def create_booking(self, customer, provider, status='completed'):
+        return Booking.objects.create(
+            customer=customer,
+            provider=provider,
+            service_title='Visit',
+            service_description='Description',
+            # A day each, as a provider's bookings cannot overlap
+            booking_date=datetime.date.today() - datetime.timedelta(days=Booking.objects.count()),
+            start_time=datetime.time(10, 0),
+            end_time=datetime.time(12, 0),
+            duration_hours=2.0,
+            service_address='123 Main St',
+            city='Austin',
+            postal_code='73301',
+            hourly_rate=provider.hourly_rate,
+            status=status
+        )
+
+    def get_similar(self, service):
+        return list(
+            SimilarService.objects.filter(service=service).values_list('similar_id', 'score')
+        )
+
+    def test_rebuild_ranks_by_co_bookings(self):
+        """Test similar services follow shared customers, same category first"""
+        result = rebuild_recommendations()
+        self.assertEqual(result['providers'], 3)
+
+        similar = self.get_similar(self.a_repairs)
+        self.assertEqual([pk for pk, _ in similar], [self.b_repairs.id, self.c_repairs.id, self.b_cleaning.id])
+        # Cosine of the customer sets: A has 3 customers, B 2 and C 1
+        self.assertAlmostEqual(similar[0][1], 2 / 6 ** 0.5)
+        self.assertAlmostEqual(similar[1][1], 1 / 3 ** 0.5)
+        self.assertEqual([pk for pk, _ in self.get_similar(self.c_repairs)], [self.a_repairs.id])
+        self.assertEqual(self.get_similar(self.d_repairs), [])
+
+    def test_chunked_build_matches_single_pass(self):
+        """Test building in small chunks gives the same result as one chunk"""
+        rebuild_recommendations()
+        expected = list(SimilarService.objects.values_list('service_id', 'similar_id', 'score', 'rank'))
+        rebuild_recommendations(chunk_size=1)
+        self.assertEqual(list(SimilarService.objects.values_list('service_id', 'similar_id', 'score', 'rank')), expected)
+
+    def test_min_co_bookings_and_k(self):
+        """Test weakly related providers and extra neighbours are dropped"""
+        rebuild_recommendations(k=1, min_co_bookings=2)
+        self.assertEqual([pk for pk, _ in self.get_similar(self.a_repairs)], [self.b_repairs.id])
+        self.assertEqual(self.get_similar(self.c_repairs), [])
+
+    def test_similar_endpoint(self):
+        """Test the endpoint serves the stored list and falls back to featured services"""
+        call_command('rebuild_recommendations', stdout=StringIO())
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/api/services/{self.a_repairs.id}/similar/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item['id'] for item in response.data],
+            [self.b_repairs.id, self.c_repairs.id, self.b_cleaning.id]
+        )
+
+        response = self.client.get(f'/api/services/{self.d_repairs.id}/similar/')
+        ids = [item['id'] for item in response.data]
+        self.assertNotIn(self.d_repairs.id, ids)
+        self.assertIn(self.a_repairs.id, ids)
+
+
+class CategoryPriceStatsTest(APITestCase):
+    """Test cases for the category price distribution rollup"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.category = ServiceCategory.objects.create(name='Plumbing')
+        self.empty = ServiceCategory.objects.create(name='Empty')
+        provider = Provider.objects.create(
+            user=User.objects.create_user(phone='+15550000018'),
+            business_name='Pipes Co',
+            hourly_rate=40.00,
+            city='Austin',
+            state='TX',
+            country='USA',
+            postal_code='73301',
+            status='approved'
+        )
+        # Base prices 10, 20, ..., 100 and hourly rates on half of them
+        for i in range(1, 11):
+            Service.objects.create(
+                provider=provider,
+                category=self.category,
+                title=f'Fix {i}',
+                description='Description',
+                base_price=i * 10,
+                hourly_rate=i * 5 if i % 2 else None
+            )
+        Service.objects.create(
+            provider=provider,
+            category=self.category,
+            title='Draft',
+            description='Description',
+            base_price=10000,
+            status='draft'
+        )
+
+    def test_refresh_computes_distribution(self):
+        """Test percentiles and histogram bins are computed in the database"""
+        self.assertEqual(refresh_price_stats(), 1)
+        stats = CategoryPriceStats.objects.get(pk=self.category.pk)
+
+        self.assertEqual(stats.service_count, 10)
+        self.assertEqual((stats.base_price['min'], stats.base_price['max']), (10.0, 100.0))
+        self.assertEqual(stats.base_price['percentiles']['p50'], 55.0)
+        self.assertEqual(stats.base_price['percentiles']['p90'], 91.0)
+        self.assertEqual(len(stats.base_price['histogram']), 10)
+        self.assertEqual([b['count'] for b in stats.base_price['histogram']], [1] * 10)
+        self.assertEqual(stats.base_price['histogram'][0], {'min': 10.0, 'max': 19.0, 'count': 1})
+
+        self.assertEqual(stats.hourly_rate['count'], 5)
+        self.assertEqual(stats.hourly_rate['percentiles']['p50'], 25.0)
+        self.assertFalse(CategoryPriceStats.objects.filter(pk=self.empty.pk).exists())
+
+    def test_single_price_category(self):
+        """Test a category whose services all cost the same has one bin"""
+        Service.objects.filter(category=self.category).update(base_price=50, hourly_rate=None)
+        refresh_price_stats()
+        stats = CategoryPriceStats.objects.get(pk=self.category.pk)
+        self.assertEqual(stats.base_price['histogram'], [{'min': 50.0, 'max': 50.0, 'count': 10}])
+        self.assertIsNone(stats.hourly_rate)
+
+    def test_endpoint_is_single_read(self):
+        """Test the endpoint reads one rollup row"""
+        call_command('refresh_price_stats', stdout=StringIO())
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/api/services/categories/{self.category.id}/price-stats/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['base_price']['percentiles']['p25'], 32.5)
+
+        response = self.client.get(f'/api/services/categories/{self.empty.id}/price-stats/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -1,10 +1,11 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ServiceViewSet
+from .views import CategoryPriceStatsView, ServiceViewSet
 
 router = DefaultRouter()
 router.register(r'', ServiceViewSet, basename='service')
 
 urlpatterns = [
+    path('categories/<int:pk>/price-stats/', CategoryPriceStatsView.as_view(), name='category-price-stats'),
     path('', include(router.urls)),
 ]
@@ -0,0 +1,172 @@
+"""
+Write-behind view counter for services
+
+Views are counted in the cache (Redis in production, locmem in DEBUG) and
+periodically applied to Service.views_count with bulk F() updates, so the
+service detail endpoint never writes to the services table.
+
+Counts are collected in time buckets of SERVICE_VIEW_FLUSH_INTERVAL seconds.
+A bucket is only flushed once it is closed, so no increment can land in a
+bucket that has already been written to the database. The first view of a
+bucket appends it to a list of buckets with views, so a flush only visits
+those, however long the counter sat idle. One flush walks that list at a
+time and the position of the last flushed bucket only moves forward, so
+overlapping flushes from requests and the periodic task never stall it.
+"""
+import time
+from collections import defaultdict
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from utils.cache import invalidate_tags
+
+KEY_PREFIX = 'service_views'
+KEY_TIMEOUT = 60 * 60 * 24  # Keep unflushed counts for a day
+REQUEST_FLUSH_BUCKETS = 3  # Most buckets a request flushes, the periodic task does the rest
+WALK_LOCK_TIMEOUT = 60  # Seconds before a flush that died is assumed gone
+
+
+def get_flush_interval():
+    """Get the flush interval in seconds"""
+    return max(1, int(getattr(settings, 'SERVICE_VIEW_FLUSH_INTERVAL', 60)))
+
+
+def get_bucket(now=None):
+    """Get the bucket number for a timestamp"""
+    return int((now if now is not None else time.time()) // get_flush_interval())
+
+
+def record_service_view(service_id):
+    """
+    Count a view for a service in the cache
+
+    Args:
+        service_id: ID of the viewed service
+    """
+    bucket = get_bucket()
+    counter_key = f'{KEY_PREFIX}:{bucket}:{service_id}'
+
+    # The first view of a service in a bucket registers its ID for the flush,
+    # and the first view of the bucket registers the bucket
+    if cache.add(counter_key, 0, timeout=KEY_TIMEOUT):
+        cache.add(f'{KEY_PREFIX}:{bucket}:size', 0, timeout=KEY_TIMEOUT)
+        slot = cache.incr(f'{KEY_PREFIX}:{bucket}:size')
+        cache.set(f'{KEY_PREFIX}:{bucket}:slot:{slot}', service_id, timeout=KEY_TIMEOUT)
+        if slot == 1:
+            register_bucket(bucket)
+
+    cache.incr(counter_key)
+
+    # Flush opportunistically so per-process caches (locmem) are written too
+    oldest = cache.get(f'{KEY_PREFIX}:buckets:slot:{get_flushed_slot() + 1}')
+    if oldest is not None and oldest < bucket - 1:
+        flush_service_views(max_buckets=REQUEST_FLUSH_BUCKETS)
+
+
+def register_bucket(bucket):
+    """Append a bucket to the buckets with views"""
+    cache.add(f'{KEY_PREFIX}:buckets:size', 0, timeout=None)
+    slot = cache.incr(f'{KEY_PREFIX}:buckets:size')
+    cache.set(f'{KEY_PREFIX}:buckets:slot:{slot}', bucket, timeout=None)
+
+
+def get_flushed_slot():
+    """Get the position of the last flushed bucket in the buckets with views"""
+    return cache.get(f'{KEY_PREFIX}:buckets:flushed') or 0
+
+
+def set_flushed_slot(slot):
+    """Move the position of the last flushed bucket forward, never back"""
+    if slot > get_flushed_slot():
+        cache.set(f'{KEY_PREFIX}:buckets:flushed', slot, timeout=None)
+
+
+def flush_bucket(bucket):
+    """
+    Apply the view counts collected in a closed bucket
+
+    Returns:
+        int: Number of views written to the database
+    """
+    # Only one worker may flush a bucket
+    if not cache.add(f'{KEY_PREFIX}:{bucket}:lock', True, timeout=KEY_TIMEOUT):
+        return 0
+
+    size = cache.get(f'{KEY_PREFIX}:{bucket}:size') or 0
+    slot_keys = [f'{KEY_PREFIX}:{bucket}:slot:{slot}' for slot in range(1, size + 1)]
+    service_ids = list(cache.get_many(slot_keys).values())
+    counter_keys = {f'{KEY_PREFIX}:{bucket}:{service_id}': service_id for service_id in service_ids}
+    counts = cache.get_many(list(counter_keys))
+
+    # Group services by increment so each distinct count is one UPDATE
+    services_by_count = defaultdict(list)
+    for key, count in counts.items():
+        if count:
+            services_by_count[count].append(counter_keys[key])
+
+    if services_by_count:
+        from .models import Service
+        with transaction.atomic():
+            for count, ids in services_by_count.items():
+                Service.objects.filter(pk__in=ids).update(views_count=F('views_count') + count)
+        # The update skips the model signals, and cached details and ETags show views_count
+        invalidate_tags(*[f'service:{pk}' for ids in services_by_count.values() for pk in ids])
+
+    cache.delete_many(slot_keys + list(counter_keys) + [f'{KEY_PREFIX}:{bucket}:size'])
+    return sum(count * len(ids) for count, ids in services_by_count.items())
+
+
+def flush_service_views(now=None, max_buckets=None):
+    """
+    Flush the closed buckets with views to the database, oldest first
+
+    The bucket currently being written and the one before it are left
+    alone, so requests that picked a bucket just before it closed still
+    land in an unflushed bucket.
+
+    Args:
+        now: Optional timestamp used to determine the current bucket
+        max_buckets: Optional limit on the number of buckets flushed
+
+    Returns:
+        int: Number of views written to the database
+    """
+    # Only one worker walks the buckets; the others have nothing left to do
+    lock_key = f'{KEY_PREFIX}:buckets:lock'
+    if not cache.add(lock_key, True, timeout=WALK_LOCK_TIMEOUT):
+        return 0
+
+    try:
+        last_closed = get_bucket(now) - 2
+        size = cache.get(f'{KEY_PREFIX}:buckets:size') or 0
+        first = get_flushed_slot() + 1
+        last = size if max_buckets is None else min(size, first + max_buckets - 1)
+        slot_keys = {slot: f'{KEY_PREFIX}:buckets:slot:{slot}' for slot in range(first, last + 1)}
+        buckets = cache.get_many(list(slot_keys.values()))
+        closed_slots = [
+            slot for slot, slot_key in slot_keys.items()
+            if buckets.get(slot_key) is not None and buckets[slot_key] <= last_closed
+        ]
+
+        total = 0
+        for slot, slot_key in slot_keys.items():
+            bucket = buckets.get(slot_key)
+            if bucket is None:
+                # Already flushed by a walk that lost its lock, or evicted. A bucket
+                # registered moments ago is open, so it never precedes a closed one.
+                if not closed_slots or closed_slots[-1] < slot:
+                    break
+            elif bucket > last_closed:
+                break
+            else:
+                total += flush_bucket(bucket)
+            set_flushed_slot(slot)
+            cache.delete(slot_key)
+    finally:
+        cache.delete(lock_key)
+
+    if total:
+        from .rankings import mark_rankings_stale
+        mark_rankings_stale()
+    return total
@@ -1,19 +1,78 @@
-from rest_framework import viewsets, filters, status
+from rest_framework import generics, viewsets, filters, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q, Avg, Count
-from .models import Service, ServiceImage, ServiceFAQ
+from django.db.models import Q, Avg
+import io
+from .autocomplete import KINDS as AUTOCOMPLETE_KINDS, index as autocomplete_index
+from .bulk_import import FORMATS as IMPORT_FORMATS, get_format, import_services
+from .facets import compute_facets
+from .models import CategoryPriceStats, Service, ServiceImage, ServiceFAQ
+from .rankings import compute_ranking, get_ranking
+from .recommendations import NEIGHBOURS
+from .search import search_services
 from .serializers import (
     ServiceListSerializer, ServiceDetailSerializer,
     ServiceCreateUpdateSerializer, ServiceImageSerializer,
-    ServiceFAQSerializer
+    ServiceFAQSerializer, ServiceSearchSerializer, ServiceNearbySerializer,
+    CategoryPriceStatsSerializer
 )
+from .view_counter import record_service_view
+from providers.geo import get_location_params, nearest, within_radius
+from utils.cache import cache_response
+from utils.conditional import conditional_response
+from utils.pagination import OptionalKeysetPagination
+from utils.sparse_fields import SparseFieldsetMixin
 from utils.permissions import IsProviderOwner
 
 
-class ServiceViewSet(viewsets.ModelViewSet):
+def get_provider_id(item):
+    """Get the provider ID of a serialized service, whether or not the provider is expanded"""
+    provider = item.get('provider')
+    return provider.get('id') if isinstance(provider, dict) else provider
+
+
+def get_service_tags(items):
+    """
+    Cache tags for serialized services and their providers
+
+    ?fields= can leave out the provider but keep fields that follow it, such
+    as provider_name or the ratings written with the provider's, so missing
+    provider IDs are looked up by service.
+    """
+    provider_ids = {item['id']: get_provider_id(item) for item in items}
+    missing = [pk for pk, provider_id in provider_ids.items() if provider_id is None]
+    if missing:
+        provider_ids.update(Service.objects.filter(pk__in=missing).values_list('id', 'provider_id'))
+    return (
+        [f'service:{pk}' for pk in provider_ids]
+        + [f'provider:{provider_id}' for provider_id in set(provider_ids.values()) if provider_id]
+    )
+
+
+def service_list_tags(data):
+    """Cache tags for a page of services and their providers"""
+    return get_service_tags(data['results'] if isinstance(data, dict) and 'results' in data else data)
+
+
+def service_detail_tags(data):
+    """Cache tags for a service and its nested provider"""
+    return get_service_tags([data])
+
+
+def service_conditional_tags(view, request, pk):
+    """Conditional GET tags for a service the user can see, from one primary key lookup"""
+    if not pk.isdigit():
+        return None
+    provider_id = view.get_queryset().filter(pk=pk).order_by().values_list('provider_id', flat=True).first()
+    if provider_id is None:
+        return None
+    return [f'service:{pk}', f'provider:{provider_id}']
+
+
+class ServiceViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing services
     
@@ -22,17 +81,25 @@ class ServiceViewSet(viewsets.ModelViewSet):
     Create: Create new service (provider only)
     Update: Update service (owner only)
     Delete: Delete service (owner only)
+    
+    Reads accept ?fields= and ?expand= (see utils.sparse_fields).
     """
     queryset = Service.objects.select_related('provider', 'category').prefetch_related('images', 'faqs')
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['category', 'pricing_type', 'status', 'is_remote', 'is_onsite']
     search_fields = ['title', 'description', 'short_description', 'provider__business_name']
-    ordering_fields = ['created_at', 'base_price', 'views_count', 'bookings_count', 'title']
+    ordering_fields = [
+        'created_at', 'base_price', 'views_count', 'bookings_count', 'title',
+        'average_rating', 'total_reviews'
+    ]
     ordering = ['-created_at']
+    pagination_class = OptionalKeysetPagination
     
     def get_permissions(self):
         """Set permissions based on action"""
-        if self.action in ['list', 'retrieve', 'search', 'featured', 'popular']:
+        if self.action in [
+            'list', 'retrieve', 'search', 'autocomplete', 'nearby', 'facets', 'similar', 'featured', 'popular'
+        ]:
             return [AllowAny()]
         elif self.action == 'create':
             return [IsAuthenticated()]
@@ -41,10 +108,14 @@ class ServiceViewSet(viewsets.ModelViewSet):
         
     def get_serializer_class(self):
         """Return appropriate serializer class"""
-        if self.action == 'list':
+        if self.action in ['list', 'similar']:
             return ServiceListSerializer
         elif self.action == 'retrieve':
             return ServiceDetailSerializer
+        elif self.action == 'search':
+            return ServiceSearchSerializer
+        elif self.action == 'nearby':
+            return ServiceNearbySerializer
         else:
             return ServiceCreateUpdateSerializer
     
@@ -53,7 +124,7 @@ class ServiceViewSet(viewsets.ModelViewSet):
         queryset = super().get_queryset()
         
         # For list/retrieve, show only active services to non-owners
-        if self.action in ['list', 'retrieve']:
+        if self.action in ['list', 'retrieve', 'search', 'nearby', 'facets', 'similar']:
             if not self.request.user.is_authenticated:
                 queryset = queryset.filter(status='active')
             elif hasattr(self.request.user, 'provider_profile'):
@@ -77,32 +148,152 @@ class ServiceViewSet(viewsets.ModelViewSet):
         if max_price:
             queryset = queryset.filter(base_price__lte=max_price)
         
+        min_rating = self.request.query_params.get('min_rating', None)
+        if min_rating:
+            try:
+                min_rating = float(min_rating)
+            except ValueError:
+                raise ValidationError({'min_rating': 'A number is required.'})
+            queryset = queryset.filter(average_rating__gte=min_rating)
+        
         return queryset
     
+    @cache_response(tags=('services', 'categories'), item_tags=service_list_tags)
+    def list(self, request, *args, **kwargs):
+        """List services (cached for anonymous users)"""
+        return super().list(request, *args, **kwargs)
+    
     def retrieve(self, request, *args, **kwargs):
         """Retrieve service and increment view count"""
+        response = self.get_service_detail(request, *args, **kwargs)
+        if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            record_service_view(int(kwargs['pk']))
+        return response
+    
+    @conditional_response(tags=('categories',), item_tags=service_conditional_tags)
+    @cache_response(tags=('categories',), item_tags=service_detail_tags)
+    def get_service_detail(self, request, *args, **kwargs):
+        """Serialize service details (cached for anonymous users)"""
         instance = self.get_object()
-        instance.increment_views()
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
-    def featured(self, request):
-        """Get featured services (high ratings and bookings)"""
-        queryset = self.get_queryset().filter(status='active')
-        queryset = queryset.annotate(
-            booking_count=Count('provider__bookings')
-        ).order_by('-booking_count', '-views_count')[:10]
+    def search(self, request):
+        """Full-text search over services, ranked by relevance"""
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response(
+                {'error': 'Query parameter "q" is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        serializer = ServiceListSerializer(queryset, many=True)
+        queryset = search_services(self.filter_queryset(self.get_queryset()), query)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        
+        serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['get'])
+    def autocomplete(self, request):
+        """Suggest service titles, categories and providers for a typed prefix"""
+        query = request.query_params.get('q', '')
+        kinds = request.query_params.get('type', '')
+        kinds = tuple(kinds.split(',')) if kinds else AUTOCOMPLETE_KINDS
+        try:
+            limit = int(request.query_params.get('limit', 10))
+        except ValueError:
+            limit = 0
+        
+        if not 1 <= limit <= 20 or set(kinds) - set(AUTOCOMPLETE_KINDS):
+            return Response(
+                {'error': 'Invalid limit or type'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        return Response(autocomplete_index.search(query, limit, kinds))
+    
+    @action(detail=False, methods=['get'])
+    @cache_response(tags=('services', 'categories'))
+    def facets(self, request):
+        """Facet counts for the current list filters (cached per filter set)"""
+        return Response(compute_facets(self.filter_queryset(self.get_queryset())))
+    
+    @action(detail=False, methods=['get'])
+    def nearby(self, request):
+        """
+        Find services whose providers are near a location, nearest first
+        
+        With `radius` (km) all matching services within the radius are
+        returned, paginated. Otherwise the `limit` nearest are returned.
+        """
+        try:
+            location = get_location_params(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        queryset = self.filter_queryset(self.get_queryset()).filter(provider__status='approved')
+        if location['radius_km'] is None:
+            services = nearest(
+                queryset, location['latitude'], location['longitude'], location['limit'],
+                prefix='provider__'
+            )
+            return Response(self.get_serializer(services, many=True).data)
+        
+        queryset = within_radius(
+            queryset, location['latitude'], location['longitude'], location['radius_km'],
+            prefix='provider__'
+        )
+        page = self.paginate_queryset(queryset)
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
+    
+    @action(detail=True, methods=['get'])
+    def similar(self, request, pk=None):
+        """
+        Services often booked by customers of this service's provider, best match first
+        
+        Until recommendations have been built for the service, the featured
+        services of its category are returned instead.
+        """
+        service = self.get_object()
+        similar = list(
+            self.filter_queryset(Service.objects.filter(status='active', similar_to__service=service))
+            .order_by('similar_to__rank')
+        )
+        if similar:
+            return Response(self.get_serializer(similar, many=True).data)
+        
+        featured = get_ranking('featured', service.category_id)
+        return Response([item for item in featured if item['id'] != service.id][:NEIGHBOURS])
+    
+    def get_ranking_response(self, kind):
+        """Serve a precomputed ranking, computing it live for ad-hoc filters"""
+        params = self.request.query_params
+        category_id = params.get('category')
+        if category_id is not None and not category_id.isdigit():
+            return Response(
+                {'error': 'Invalid category'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Only the catalog-wide and per-category rankings are precomputed
+        if set(params) - {'category'}:
+            return Response(compute_ranking(kind, category_id, self.get_queryset()))
+        
+        return Response(get_ranking(kind, category_id))
+    
+    @action(detail=False, methods=['get'])
+    def featured(self, request):
+        """Get featured services (high ratings and bookings)"""
+        return self.get_ranking_response('featured')
+    
     @action(detail=False, methods=['get'])
     def popular(self, request):
         """Get popular services by views"""
-        queryset = self.get_queryset().filter(status='active').order_by('-views_count')[:10]
-        serializer = ServiceListSerializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.get_ranking_response('popular')
     
     @action(detail=False, methods=['get'])
     def my_services(self, request):
@@ -122,6 +313,36 @@ class ServiceViewSet(viewsets.ModelViewSet):
         serializer = ServiceListSerializer(queryset, many=True)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['post'], url_path='import')
+    def bulk_import(self, request):
+        """
+        Create or update the provider's services from an uploaded CSV or JSON Lines file
+        
+        Rows are matched to existing services by external_id. Invalid rows
+        are reported and skipped without aborting the import.
+        """
+        if not hasattr(request.user, 'provider_profile'):
+            return Response(
+                {'error': 'You must be a provider to access this endpoint'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': 'A file is required'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        file_format = request.data.get('format') or get_format(upload.name)
+        if file_format not in IMPORT_FORMATS:
+            return Response(
+                {'error': f'Format must be one of: {", ".join(IMPORT_FORMATS)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Rows are decoded and parsed as they are read from the upload
+        lines = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        result = import_services(request.user.provider_profile, lines, file_format)
+        return Response(result)
+    
     @action(detail=True, methods=['post'])
     def add_image(self, request, pk=None):
         """Add an image to service"""
@@ -169,3 +390,14 @@ class ServiceViewSet(viewsets.ModelViewSet):
             return Response({'message': 'FAQ deleted successfully'}, status=status.HTTP_204_NO_CONTENT)
         except ServiceFAQ.DoesNotExist:
             return Response({'error': 'FAQ not found'}, status=status.HTTP_404_NOT_FOUND)
+
+
+class CategoryPriceStatsView(generics.RetrieveAPIView):
+    """
+    Price distribution of a category's active services
+    
+    Served from the rollup refreshed by the refresh_category_price_stats task.
+    """
+    queryset = CategoryPriceStats.objects.all()
+    serializer_class = CategoryPriceStatsSerializer
+    permission_classes = [AllowAny]
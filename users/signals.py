@@ -0,0 +1,12 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from utils.cache import invalidate_tags
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, **kwargs):
+    """Change the ETag of the user's profile"""
+    invalidate_tags(f'user:{instance.pk}')
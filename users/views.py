@@ -3,6 +3,7 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import get_user_model
+from utils.conditional import conditional_response
 from .serializers import (
     UserSerializer,
     SendOTPSerializer,
@@ -203,6 +204,10 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
     def get_object(self):
         return self.request.user
     
+    @conditional_response(item_tags=lambda view, request: [f'user:{request.user.pk}'])
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+    
     def update(self, request, *args, **kwargs):
         serializer = UserProfileUpdateSerializer(
             self.get_object(),
@@ -0,0 +1,174 @@
+"""
+Tag-invalidated response cache for public read endpoints
+
+Views opt in with the @cache_response decorator. Anonymous GET responses
+are cached per view and normalized query string, and every entry is tagged
+with the objects it contains (e.g. 'service:12', 'providers'). Each tag has
+a version number in the cache; an entry is only served while all of its
+tags still have the versions it was stored with, so invalidating a tag is
+a single increment and never has to find the affected entries.
+
+Versions are kept at or above the time of the tag's last change in
+milliseconds, so they also give a Last-Modified time (see
+utils.conditional).
+"""
+import hashlib
+import time
+from functools import wraps
+from urllib.parse import urlencode
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+KEY_PREFIX = 'response_cache'
+CACHED_VIEWS = set()
+
+
+def get_cache_timeout():
+    """Get the response cache timeout in seconds"""
+    return getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300)
+
+
+def get_tag_key(tag):
+    """Get the cache key holding a tag's version"""
+    return f'{KEY_PREFIX}:tag:{tag}'
+
+
+def get_tag_versions(tags):
+    """
+    Get the current version of each tag, creating missing ones
+
+    Returns:
+        dict: Tag to version
+    """
+    keys = {get_tag_key(tag): tag for tag in tags}
+    versions = cache.get_many(list(keys))
+    for key, tag in keys.items():
+        if key not in versions:
+            # Start from the clock so an evicted tag never reuses a version
+            cache.add(key, int(time.time() * 1000), timeout=None)
+            versions[key] = cache.get(key)
+    return {keys[key]: version for key, version in versions.items()}
+
+
+def invalidate_tags(*tags):
+    """Invalidate every cached response tagged with any of the given tags"""
+    now = int(time.time() * 1000)
+    for tag in set(tags):
+        # The increment guarantees a new version even within the same millisecond
+        try:
+            version = cache.incr(get_tag_key(tag))
+        except ValueError:
+            version = 0
+        if version < now:
+            cache.set(get_tag_key(tag), now, timeout=None)
+
+
+def result_ids(data):
+    """Get the object IDs from a detail, list or paginated response"""
+    if isinstance(data, dict) and 'results' in data:
+        data = data['results']
+    if isinstance(data, dict):
+        data = [data]
+    return [item['id'] for item in data if isinstance(item, dict) and 'id' in item]
+
+
+def get_request_key(view_name, request, kwargs):
+    """Build the cache key for a request from its normalized query string"""
+    params = sorted(
+        (key, value)
+        for key, values in request.query_params.lists()
+        for value in values
+        if value != ''
+    )
+    path_args = sorted(kwargs.items())
+    digest = hashlib.md5(urlencode(path_args + params).encode()).hexdigest()
+    return f'{KEY_PREFIX}:entry:{view_name}:{digest}'
+
+
+def record_cache_event(view_name, event):
+    """Count a cache hit or miss for a view"""
+    key = f'{KEY_PREFIX}:stats:{view_name}:{event}'
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        pass
+
+
+def get_cache_stats():
+    """
+    Get hit/miss counts for every cached view
+
+    Returns:
+        dict: View name to {'hits', 'misses', 'hit_rate'}
+    """
+    keys = [
+        f'{KEY_PREFIX}:stats:{view_name}:{event}'
+        for view_name in sorted(CACHED_VIEWS)
+        for event in ('hit', 'miss')
+    ]
+    counts = cache.get_many(keys)
+    stats = {}
+    for view_name in sorted(CACHED_VIEWS):
+        hits = counts.get(f'{KEY_PREFIX}:stats:{view_name}:hit', 0)
+        misses = counts.get(f'{KEY_PREFIX}:stats:{view_name}:miss', 0)
+        total = hits + misses
+        stats[view_name] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / total, 4) if total else 0,
+        }
+    return stats
+
+
+def cache_response(tags=(), item_tags=None, timeout=None):
+    """
+    Cache a view method's response for anonymous GET requests
+
+    Args:
+        tags: Collection tags for the entry (e.g. 'services'). Their versions
+            are read before the view runs, so a change made while the
+            response is being built still invalidates it.
+        item_tags: Optional callable taking the response data and returning
+            the tags for the objects it contains (e.g. 'service:12')
+        timeout: Optional timeout in seconds (defaults to RESPONSE_CACHE_TIMEOUT)
+
+    Usage:
+        @cache_response(tags=('services',), item_tags=lambda data: [f'service:{pk}' for pk in result_ids(data)])
+        def list(self, request, *args, **kwargs):
+            ...
+    """
+    def decorator(method):
+        view_name = method.__qualname__
+        CACHED_VIEWS.add(view_name)
+
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            if request.method != 'GET' or request.user.is_authenticated:
+                return method(self, request, *args, **kwargs)
+
+            key = get_request_key(view_name, request, kwargs)
+            entry = cache.get(key)
+            if entry is not None and get_tag_versions(entry['tags']) == entry['tags']:
+                record_cache_event(view_name, 'hit')
+                response = Response(entry['data'], status=entry['status'])
+                response['X-Cache'] = 'HIT'
+                return response
+
+            record_cache_event(view_name, 'miss')
+            versions = get_tag_versions(tags)
+            response = method(self, request, *args, **kwargs)
+            if response.status_code == 200:
+                if item_tags is not None:
+                    versions.update(get_tag_versions(set(item_tags(response.data)) - set(versions)))
+                cache.set(key, {
+                    'data': response.data,
+                    'status': response.status_code,
+                    'tags': versions,
+                }, timeout=timeout or get_cache_timeout())
+            response['X-Cache'] = 'MISS'
+            return response
+
+        return wrapper
+    return decorator
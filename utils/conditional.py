@@ -0,0 +1,86 @@
+"""
+Conditional GET for read endpoints
+
+Views opt in with the @conditional_response decorator. The ETag and
+Last-Modified of a response are derived from the versions of the same
+cache tags the response cache uses (see utils.cache), so they change
+whenever anything the response contains changes. A request whose
+If-None-Match or If-Modified-Since still matches gets a 304 after reading
+the tag versions, without running the view or its serializer.
+
+The ETag also covers the query string, host and Accept header, so every
+representation of a resource has its own strong ETag.
+"""
+import hashlib
+from functools import wraps
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from .cache import get_tag_versions
+
+
+def get_etag(view_name, request, versions):
+    """Build a strong ETag from the tag versions and the requested representation"""
+    params = sorted(
+        (key, value)
+        for key, values in request.query_params.lists()
+        for value in values
+    )
+    source = repr((
+        view_name,
+        sorted(versions.items()),
+        params,
+        request.get_host(),
+        request.META.get('HTTP_ACCEPT', ''),
+    ))
+    return quote_etag(hashlib.md5(source.encode()).hexdigest())
+
+
+def conditional_response(tags=(), item_tags=None):
+    """
+    Answer GET requests with 304 Not Modified while the tag versions are unchanged
+
+    Args:
+        tags: Collection tags the response depends on (e.g. 'categories')
+        item_tags: Optional callable taking the view, request and URL kwargs
+            and returning the tags of the objects the response contains.
+            It should be a single indexed lookup at most. Returning None
+            (e.g. for a missing object) skips the check so the view can
+            respond normally.
+
+    Usage:
+        @conditional_response(tags=('categories',), item_tags=lambda view, request, pk: [f'provider:{pk}'])
+        def retrieve(self, request, *args, **kwargs):
+            ...
+    """
+    def decorator(method):
+        view_name = method.__qualname__
+
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return method(self, request, *args, **kwargs)
+
+            response_tags = list(tags)
+            if item_tags is not None:
+                extra_tags = item_tags(self, request, **kwargs)
+                if extra_tags is None:
+                    return method(self, request, *args, **kwargs)
+                response_tags += extra_tags
+
+            # Versions are read before the view runs, so a change made while
+            # the response is being built gives the next request a new ETag
+            versions = get_tag_versions(response_tags)
+            etag = get_etag(view_name, request, versions)
+            last_modified = max(versions.values()) // 1000 if versions else None
+
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = method(self, request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                response['ETag'] = etag
+                if last_modified is not None:
+                    response['Last-Modified'] = http_date(last_modified)
+            return response
+
+        return wrapper
+    return decorator
@@ -113,6 +113,34 @@ def send_booking_confirmation_email(booking):
     )
 
 
+def send_booking_reminder_email(booking):
+    """Send booking reminder email to customer"""
+    subject = f'Reminder: {booking.service_title} on {booking.booking_date}'
+    message = f"""
+    Hi {booking.customer.first_name or 'there'},
+    
+    This is a reminder of your upcoming service appointment.
+    
+    Service: {booking.service_title}
+    Provider: {booking.provider.business_name}
+    Date: {booking.booking_date}
+    Time: {booking.start_time} - {booking.end_time}
+    Location: {booking.service_address}
+    
+    If you need to reschedule, please contact the provider through our messaging system.
+    
+    Best regards,
+    ServiceHub Team
+    """
+    
+    return send_email(
+        subject=subject,
+        message=message.strip(),
+        recipient_list=[booking.customer.email],
+        user=booking.customer
+    )
+
+
 def send_booking_notification_to_provider(booking):
     """Send new booking notification to provider"""
     subject = f'New Booking Request - {booking.service_title}'
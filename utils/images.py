@@ -0,0 +1,178 @@
+"""
+Resized image variants
+
+Uploads are stored as-is. A background task then renders every configured
+size as WebP and JPEG, plus a tiny blurred placeholder that is inlined as a
+data URI. The result is saved in a JSON field next to the image (e.g.
+Service.image_variants), so serializers can return per-size URLs without
+extra queries or storage calls. The stored `source` is the name of the
+image the variants were rendered from; variants whose source no longer
+matches the image are treated as missing and rendered again.
+"""
+import base64
+import io
+import os
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageFilter, ImageOps
+from rest_framework import serializers
+
+# Model label to (image field, variants field)
+IMAGE_FIELDS = {
+    'services.Service': ('image', 'image_variants'),
+    'services.ServiceImage': ('image', 'image_variants'),
+    'providers.ServiceCategory': ('icon', 'icon_variants'),
+    'providers.ProviderPortfolio': ('image', 'image_variants'),
+    'reviews.ReviewImage': ('image', 'image_variants'),
+}
+
+VARIANT_FORMATS = {'webp': ('WEBP', 80), 'jpeg': ('JPEG', 82)}
+PLACEHOLDER_WIDTH = 16
+
+
+def get_variant_sizes():
+    """Get the variant names and their maximum widths in pixels"""
+    return getattr(settings, 'IMAGE_VARIANT_SIZES', {'thumb': 160, 'small': 480, 'medium': 1024})
+
+
+def get_variant_name(name, size, extension):
+    """Get the storage name of a variant, next to its original"""
+    root, _ = os.path.splitext(name)
+    return f'variants/{root}/{size}.{extension}'
+
+
+def encode(image, format, quality):
+    buffer = io.BytesIO()
+    image.save(buffer, format=format, quality=quality)
+    return buffer.getvalue()
+
+
+def render_variants(field_file):
+    """
+    Render and store the variants of an image
+
+    Args:
+        field_file: FieldFile of the original image
+
+    Returns:
+        dict: Source name, original dimensions, placeholder data URI and the
+            storage name and dimensions of every size
+    """
+    with field_file.open('rb'):
+        image = ImageOps.exif_transpose(Image.open(field_file))
+        image.load()
+
+    # JPEG has no alpha channel, so flatten transparent images onto white
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+    elif image.mode != 'RGB':
+        image = image.convert('RGB')
+
+    sizes = {}
+    for size, width in get_variant_sizes().items():
+        resized = image.copy()
+        # Never upscale; small originals are only re-encoded
+        resized.thumbnail((width, width * 10), Image.LANCZOS)
+        sizes[size] = {'width': resized.width, 'height': resized.height}
+        for extension, (format, quality) in VARIANT_FORMATS.items():
+            name = get_variant_name(field_file.name, size, extension)
+            if default_storage.exists(name):
+                default_storage.delete(name)
+            sizes[size][extension] = default_storage.save(name, ContentFile(encode(resized, format, quality)))
+
+    placeholder = image.copy()
+    placeholder.thumbnail((PLACEHOLDER_WIDTH, PLACEHOLDER_WIDTH * 10))
+    placeholder = placeholder.filter(ImageFilter.GaussianBlur(1))
+    data = base64.b64encode(encode(placeholder, 'WEBP', 30)).decode()
+
+    return {
+        'source': field_file.name,
+        'width': image.width,
+        'height': image.height,
+        'placeholder': f'data:image/webp;base64,{data}',
+        'sizes': sizes,
+    }
+
+
+def has_current_variants(instance):
+    """Check whether an instance's variants match its current image"""
+    image_field, variants_field = IMAGE_FIELDS[instance._meta.label]
+    image = getattr(instance, image_field)
+    variants = getattr(instance, variants_field) or {}
+    return variants.get('source') == (image.name or None)
+
+
+def update_image_variants(model_label, pk):
+    """
+    Render the variants of an instance's image and save them
+
+    Saving goes through the model so the usual cache invalidation runs.
+
+    Returns:
+        bool: Whether variants were rendered
+    """
+    model = apps.get_model(model_label)
+    image_field, variants_field = IMAGE_FIELDS[model_label]
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None or has_current_variants(instance):
+        return False
+
+    image = getattr(instance, image_field)
+    setattr(instance, variants_field, render_variants(image) if image else {})
+    instance.save(update_fields=[variants_field])
+    return True
+
+
+def schedule_image_variants(instance):
+    """Queue variant rendering after commit if the image is new or replaced"""
+    if has_current_variants(instance):
+        return
+
+    from .tasks import generate_image_variants
+    model_label, pk = instance._meta.label, instance.pk
+    transaction.on_commit(lambda: generate_image_variants.delay(model_label, pk))
+
+
+class ImageVariantsField(serializers.Field):
+    """
+    Read-only per-size URLs of an image's variants
+
+    Returns None until the variants of the current image have been rendered.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def get_url(self, name):
+        url = default_storage.url(name)
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request is not None else url
+
+    def to_representation(self, instance):
+        if not has_current_variants(instance):
+            return None
+        variants = getattr(instance, IMAGE_FIELDS[instance._meta.label][1])
+        if not variants:
+            return None
+
+        return {
+            'width': variants['width'],
+            'height': variants['height'],
+            'placeholder': variants['placeholder'],
+            **{
+                size: {
+                    'width': variant['width'],
+                    'height': variant['height'],
+                    **{extension: self.get_url(variant[extension]) for extension in VARIANT_FORMATS},
+                }
+                for size, variant in variants['sizes'].items()
+            },
+        }
@@ -0,0 +1,192 @@
+"""
+Keyset (cursor) pagination
+
+PageNumberPagination runs a COUNT(*) for every page and an OFFSET scan that
+grows with the page number. KeysetPagination instead remembers the ordering
+values of the last row in an opaque cursor and fetches the next page with a
+WHERE clause on those values, so every page costs the same index range scan
+and no count is needed. The WHERE clause bounds the leading ordering column
+on its own as well, so Postgres starts the scan of a matching composite
+index (e.g. created_at, id) at the cursor instead of filtering every row
+before it.
+
+List views opt in with `pagination_class = OptionalKeysetPagination`, which
+keeps page numbers by default and switches to cursors for requests with
+`?pagination=cursor` (or a `cursor` from a previous response).
+"""
+import base64
+import datetime
+import decimal
+import json
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def flip(field_name):
+    """Reverse the direction of an ordering field"""
+    return field_name[1:] if field_name.startswith('-') else f'-{field_name}'
+
+
+def encode_value(value):
+    """Make an ordering value JSON serializable without losing precision"""
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    return value
+
+
+class KeysetPagination(BasePagination):
+    """Cursor pagination over the queryset ordering plus the primary key"""
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+    default_ordering = ('-created_at', '-id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = self.get_ordering(queryset)
+        self.fields = [self.get_field(queryset.model, name) for name in self.ordering]
+        cursor = self.decode_cursor(request)
+
+        self.reverse = bool(cursor and cursor['reverse'])
+        ordering = [flip(name) for name in self.ordering] if self.reverse else list(self.ordering)
+        queryset = queryset.order_by(*ordering)
+        if cursor:
+            queryset = queryset.filter(self.build_filter(ordering, cursor['values']))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if self.reverse:
+            rows.reverse()
+
+        self.cursor = cursor
+        self.has_next = bool(cursor) if self.reverse else has_more
+        self.has_previous = has_more if self.reverse else bool(cursor)
+        self.rows = rows
+        return rows
+
+    def get_ordering(self, queryset):
+        """Get the queryset ordering with the primary key as a tiebreaker"""
+        ordering = list(queryset.query.order_by or queryset.model._meta.ordering or self.default_ordering)
+        if not all(isinstance(name, str) for name in ordering):
+            raise ValidationError('Cursor pagination is not supported for this ordering')
+
+        ordering = ['-id' if name == '-pk' else 'id' if name == 'pk' else name for name in ordering]
+        if 'id' not in ordering and '-id' not in ordering:
+            ordering.append('-id' if ordering[-1].startswith('-') else 'id')
+        return ordering
+
+    def get_field(self, model, name):
+        """Get the model field for an ordering entry"""
+        try:
+            field = model._meta.get_field(name.lstrip('-'))
+        except FieldDoesNotExist:
+            raise ValidationError('Cursor pagination is not supported for this ordering')
+        if field.null:
+            raise ValidationError(f'Cursor pagination is not supported when ordering by {field.name}')
+        return field
+
+    def build_filter(self, ordering, values):
+        """Build (a, b) > (x, y) as a >= x AND ((a > x) OR (a = x AND b > y))"""
+        condition = Q()
+        for i, name in enumerate(ordering):
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            clause = Q(**{f'{self.fields[i].attname}__{lookup}': values[i]})
+            for j in range(i):
+                clause &= Q(**{self.fields[j].attname: values[j]})
+            condition |= clause
+        # Redundant, but usable as an index condition where the OR is not
+        bound = 'lte' if ordering[0].startswith('-') else 'gte'
+        return Q(**{f'{self.fields[0].attname}__{bound}': values[0]}) & condition
+
+    def get_position(self, row):
+        """Get the ordering values of a row"""
+        return [encode_value(getattr(row, field.attname)) for field in self.fields]
+
+    def encode_cursor(self, values, reverse=False):
+        """Encode a position into an opaque cursor string"""
+        payload = json.dumps({'v': values, 'r': reverse}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, request):
+        """Decode the cursor from the request, if any"""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4)))
+            values = payload['v']
+            if len(values) != len(self.fields):
+                raise ValueError
+            return {
+                'values': [field.to_python(value) for field, value in zip(self.fields, values)],
+                'reverse': bool(payload.get('r')),
+            }
+        except (TypeError, ValueError, KeyError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_link(self, values, reverse):
+        url = remove_query_param(self.request.build_absolute_uri(), 'page')
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(values, reverse))
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if self.rows:
+            return self.get_link(self.get_position(self.rows[-1]), reverse=False)
+        return self.get_link([encode_value(value) for value in self.cursor['values']], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if self.rows:
+            return self.get_link(self.get_position(self.rows[0]), reverse=True)
+        return self.get_link([encode_value(value) for value in self.cursor['values']], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class OptionalKeysetPagination(PageNumberPagination):
+    """Page number pagination, or keyset pagination with ?pagination=cursor"""
+    mode_query_param = 'pagination'
+    keyset_class = KeysetPagination
+
+    def use_keyset(self, request):
+        return (
+            request.query_params.get(self.mode_query_param) == 'cursor'
+            or self.keyset_class.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.keyset_class() if self.use_keyset(request) else None
+        if self.keyset is not None:
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,249 @@
+"""
+Query budgets and N+1 detection for API views
+
+Views declare how many SQL queries a request may run, authentication
+included, with the @query_budget decorator (on a view class, or above
+@api_view on a function view). In development and tests
+QueryBudgetMiddleware records every query a request runs and:
+
+    - adds X-Query-Count (and X-Query-Budget) headers to the response
+    - flags query shapes that ran QUERY_BUDGET_REPEAT_THRESHOLD or more
+      times, the signature of an N+1 (a query per row of a list)
+    - logs a warning when the budget is exceeded, or raises
+      QueryBudgetExceeded instead when QUERY_BUDGET_STRICT is set, so
+      the test making the request fails
+    - appends the request's view, query count, overrun and N+1 flags to
+      QUERY_BUDGET_STATS_FILE for the query_budget_report command
+
+The stats file is shared by every worker process, unlike the development
+cache, and each request is a single short append so concurrent writers do
+not interleave. A query's shape is its SQL with the parameters left out
+and IN lists collapsed, so the same query for different rows has the same
+shape. The middleware also sends query_log_recorded for every request,
+which the query_log pytest fixture (see conftest.py) uses to fail tests
+whose requests run N+1s.
+"""
+import json
+import logging
+import os
+import re
+from collections import Counter
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.dispatch import Signal
+
+logger = logging.getLogger(__name__)
+
+IGNORED_STATEMENTS = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')
+IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+WHITESPACE = re.compile(r'\s+')
+
+# Sent after every recorded request with the view name, request, log and budget
+query_log_recorded = Signal()
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A request ran more queries than its view's budget"""
+
+
+def query_budget(budget):
+    """
+    Declare the most queries a view may run per request
+
+    Usage:
+        @query_budget(4)
+        class ChatRoomListView(generics.ListAPIView):
+            ...
+
+        @query_budget(2)
+        @api_view(['GET'])
+        def unread_messages_count(request):
+            ...
+    """
+    def decorator(view):
+        view.query_budget = budget
+        return view
+    return decorator
+
+
+def get_view_class(view_func):
+    """Get the class behind a view function, or the function itself"""
+    return getattr(view_func, 'view_class', None) or getattr(view_func, 'cls', None) or view_func
+
+
+def get_view_name(view_func):
+    """Get the dotted name a view is reported under"""
+    view = get_view_class(view_func)
+    return f'{view.__module__}.{view.__qualname__}'
+
+
+def get_budget(view_func):
+    """Get the declared query budget of a view, or None"""
+    budget = getattr(view_func, 'query_budget', None)
+    if budget is None:
+        budget = getattr(get_view_class(view_func), 'query_budget', None)
+    return budget
+
+
+def get_query_shape(sql):
+    """Get the shape of a parameterized query, the same for every set of parameters"""
+    return IN_LIST.sub('IN (...)', WHITESPACE.sub(' ', sql).strip())
+
+
+def get_repeat_threshold():
+    """Get how many runs of the same query shape are flagged as an N+1"""
+    return getattr(settings, 'QUERY_BUDGET_REPEAT_THRESHOLD', 3)
+
+
+class QueryLog:
+    """
+    Database execute wrapper recording every query it sees
+
+    Usage:
+        log = QueryLog()
+        with connection.execute_wrapper(log):
+            ...
+        log.count, log.get_repeated()
+    """
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if not sql.startswith(IGNORED_STATEMENTS):
+            self.queries.append(sql)
+        return execute(sql, params, many, context)
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    def get_repeated(self, threshold=None):
+        """
+        Get the query shapes that ran at least `threshold` times
+
+        Returns:
+            list: (shape, times run), most repeated first
+        """
+        threshold = threshold or get_repeat_threshold()
+        shapes = Counter(get_query_shape(sql) for sql in self.queries)
+        return [(shape, times) for shape, times in shapes.most_common() if times >= threshold]
+
+
+def get_stats_file():
+    """Get the path of the file query stats are appended to, or None to not record them"""
+    return getattr(settings, 'QUERY_BUDGET_STATS_FILE', None)
+
+
+def record_query_stats(view_name, log, over_budget, repeated):
+    """Append a request's queries to the stats file"""
+    path = get_stats_file()
+    if not path:
+        return
+    line = json.dumps([view_name, log.count, int(over_budget), int(bool(repeated))]) + '\n'
+    try:
+        with open(path, 'a') as stats_file:
+            stats_file.write(line)
+    except OSError:
+        logger.exception('Recording the query stats of %s failed', view_name)
+
+
+def read_query_stats():
+    """
+    Read the recorded requests
+
+    Yields:
+        list: [view name, queries, over budget, repeated] of each request
+    """
+    path = get_stats_file()
+    if not path or not os.path.exists(path):
+        return
+    with open(path) as stats_file:
+        for line in stats_file:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # A write cut short by a crash
+                continue
+
+
+def get_query_stats(view_names):
+    """
+    Get the recorded query stats of views
+
+    Returns:
+        dict: View name to {'requests', 'queries', 'max_queries',
+            'over_budget', 'repeated', 'average_queries'}, for the views
+            with recorded requests
+    """
+    view_names = set(view_names)
+    stats = {}
+    for view_name, queries, over_budget, repeated in read_query_stats():
+        if view_name not in view_names:
+            continue
+        view_stats = stats.setdefault(view_name, {
+            'requests': 0, 'queries': 0, 'max_queries': 0, 'over_budget': 0, 'repeated': 0,
+        })
+        view_stats['requests'] += 1
+        view_stats['queries'] += queries
+        view_stats['max_queries'] = max(view_stats['max_queries'], queries)
+        view_stats['over_budget'] += over_budget
+        view_stats['repeated'] += repeated
+    for view_stats in stats.values():
+        view_stats['average_queries'] = round(view_stats['queries'] / view_stats['requests'], 1)
+    return stats
+
+
+def reset_query_stats(view_names):
+    """Forget the recorded query stats of views"""
+    view_names = set(view_names)
+    kept = [request for request in read_query_stats() if request[0] not in view_names]
+    path = get_stats_file()
+    if path and os.path.exists(path):
+        with open(path, 'w') as stats_file:
+            stats_file.writelines(json.dumps(request) + '\n' for request in kept)
+
+
+class QueryBudgetMiddleware:
+    """Record the queries of every request and check them against the view's budget"""
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_BUDGET_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        log = QueryLog()
+        with connection.execute_wrapper(log):
+            response = self.get_response(request)
+
+        view_func = getattr(request, '_query_budget_view', None)
+        if view_func is None:
+            return response
+
+        view_name = get_view_name(view_func)
+        budget = get_budget(view_func)
+        over_budget = budget is not None and log.count > budget
+        repeated = log.get_repeated()
+        record_query_stats(view_name, log, over_budget, repeated)
+        query_log_recorded.send(sender=self.__class__, view_name=view_name, request=request, log=log, budget=budget)
+
+        response['X-Query-Count'] = log.count
+        if budget is not None:
+            response['X-Query-Budget'] = budget
+        for shape, times in repeated:
+            logger.warning('Possible N+1 in %s (%s %s): ran %d times: %s',
+                           view_name, request.method, request.path, times, shape)
+        if over_budget:
+            message = (
+                f'{view_name} ({request.method} {request.path}) ran {log.count} queries, '
+                f'over its budget of {budget}'
+            )
+            if getattr(settings, 'QUERY_BUDGET_STRICT', False):
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._query_budget_view = view_func
@@ -181,9 +181,9 @@ def send_booking_reminder_sms(booking):
     ServiceHub
     """
     
-    if booking.customer.phone_number:
+    if booking.customer.phone:
         return send_sms(
-            booking.customer.phone_number,
+            booking.customer.phone,
             message.strip(),
             booking.customer
         )
@@ -0,0 +1,205 @@
+"""
+Sparse fieldsets and expansion for read endpoints
+
+Clients choose what a response contains with two query parameters:
+
+    ?fields=id,title,provider.business_name
+    ?expand=provider,provider.user
+
+`fields` keeps only the listed fields, using dots to select fields of
+nested serializers (a nested serializer listed without a dot is kept
+whole). `expand` replaces fields named in a serializer's
+`Meta.expandable_fields` with a nested representation, e.g. a provider ID
+with the provider object. `id` is always kept and unknown names are
+ignored.
+
+The queryset follows the serializer that is actually used: select_related
+and prefetch_related are derived from the remaining fields, so pruned
+relations are never joined or fetched and expanded ones never cause N+1
+queries. Fields whose source is not a model relation (e.g.
+SerializerMethodField) can declare the relations they read with
+`Meta.field_relations`.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.utils.module_loading import import_string
+from rest_framework import serializers
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+SAFE_METHODS = ('GET', 'HEAD')
+
+
+def parse_field_tree(value):
+    """
+    Parse a comma-separated list of dotted field paths
+
+    Returns:
+        dict: Nested dict of field names, or None if the value is empty
+            (e.g. 'id,provider.city' -> {'id': {}, 'provider': {'city': {}}})
+    """
+    tree = {}
+    for path in (value or '').split(','):
+        node = tree
+        for name in path.strip().split('.'):
+            if not name:
+                break
+            node = node.setdefault(name, {})
+    return tree or None
+
+
+def get_child(serializer):
+    """Get the serializer that renders each item of a list serializer"""
+    return serializer.child if isinstance(serializer, serializers.ListSerializer) else serializer
+
+
+def expand_fields(serializer, tree):
+    """
+    Replace expandable fields named in the tree with nested serializers
+
+    Serializers declare them in `Meta.expandable_fields` as field name to
+    (dotted serializer path, keyword arguments), for example:
+
+        expandable_fields = {
+            'provider': ('providers.serializers.ProviderListSerializer', {'read_only': True}),
+        }
+    """
+    serializer = get_child(serializer)
+    if not isinstance(serializer, serializers.Serializer):
+        return
+    expandable = getattr(getattr(serializer, 'Meta', None), 'expandable_fields', {})
+    for name, subtree in tree.items():
+        if name in expandable and name in serializer.fields:
+            path, kwargs = expandable[name]
+            serializer.fields[name] = import_string(path)(**kwargs)
+        if subtree and name in serializer.fields:
+            expand_fields(serializer.fields[name], subtree)
+
+
+def prune_fields(serializer, tree):
+    """Drop every field that is not in the tree"""
+    serializer = get_child(serializer)
+    if not isinstance(serializer, serializers.Serializer):
+        return
+    if not set(tree) & set(serializer.fields):
+        # Nothing requested exists at this level, so keep it whole rather than empty
+        return
+    for name in list(serializer.fields):
+        # IDs are always kept so objects can be linked and cached
+        if name not in tree and name != 'id':
+            serializer.fields.pop(name)
+        elif tree.get(name):
+            prune_fields(serializer.fields[name], tree[name])
+
+
+def resolve_relations(model, source_attrs):
+    """
+    Follow a field source through the model's relations
+
+    Returns:
+        list: (name, relation field) for each leading part of the source
+            that is a relation
+    """
+    relations = []
+    for name in source_attrs:
+        if model is None:
+            break
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            break
+        if not field.is_relation:
+            break
+        relations.append((name, field))
+        model = field.related_model
+    return relations
+
+
+def collect_lookups(serializer, model, prefix='', in_prefetch=False, lookups=None):
+    """
+    Collect the relation lookups a serializer's fields read
+
+    Forward and reverse single relations are joined with select_related,
+    unless they are reached through a multi-valued relation; those and
+    everything below them are prefetched.
+
+    Returns:
+        tuple: (select_related lookups, prefetch_related lookups)
+    """
+    if lookups is None:
+        lookups = (set(), set())
+    serializer = get_child(serializer)
+    field_relations = getattr(getattr(serializer, 'Meta', None), 'field_relations', {})
+
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if name in field_relations:
+            sources = [source.split('.') for source in field_relations[name]]
+        elif field.source == '*':
+            if isinstance(field, serializers.BaseSerializer):
+                collect_lookups(field, model, prefix, in_prefetch, lookups)
+            continue
+        else:
+            sources = [field.source_attrs]
+
+        for source_attrs in sources:
+            relations = resolve_relations(model, source_attrs)
+            # A plain primary key only needs the local column
+            if (
+                len(source_attrs) == 1 and relations and isinstance(field, serializers.RelatedField)
+                and relations[0][1].concrete and not relations[0][1].many_to_many
+            ):
+                continue
+
+            path, nested_prefetch = prefix, in_prefetch
+            for relation_name, relation in relations:
+                path = f'{path}__{relation_name}' if path else relation_name
+                nested_prefetch = nested_prefetch or relation.one_to_many or relation.many_to_many
+                lookups[1 if nested_prefetch else 0].add(path)
+
+            if relations and len(relations) == len(source_attrs) and isinstance(
+                get_child(field), serializers.BaseSerializer
+            ):
+                collect_lookups(field, relations[-1][1].related_model, path, nested_prefetch, lookups)
+
+    return lookups
+
+
+def optimize_queryset(queryset, serializer):
+    """Replace a queryset's select_related and prefetch_related with what the serializer reads"""
+    select_related, prefetch_related = collect_lookups(serializer, queryset.model)
+    queryset = queryset.select_related(None).prefetch_related(None)
+    if select_related:
+        queryset = queryset.select_related(*sorted(select_related))
+    if prefetch_related:
+        queryset = queryset.prefetch_related(*sorted(prefetch_related))
+    return queryset
+
+
+class SparseFieldsetMixin:
+    """
+    Support ?fields= and ?expand= on a view's read requests
+
+    The serializer is expanded and pruned in get_serializer, and
+    filter_queryset fetches exactly the relations it then reads.
+    """
+
+    def get_field_tree(self, param):
+        return parse_field_tree(self.request.query_params.get(param))
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        if self.request.method in SAFE_METHODS:
+            expand = self.get_field_tree(EXPAND_PARAM)
+            if expand:
+                expand_fields(serializer, expand)
+            fields = self.get_field_tree(FIELDS_PARAM)
+            if fields:
+                prune_fields(serializer, fields)
+        return serializer
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.request.method in SAFE_METHODS:
+            queryset = optimize_queryset(queryset, self.get_serializer())
+        return queryset
@@ -0,0 +1,8 @@
+from celery import shared_task
+from .images import update_image_variants
+
+
+@shared_task
+def generate_image_variants(model_label, pk):
+    """Render resized WebP/JPEG variants and a placeholder for an uploaded image"""
+    return update_image_variants(model_label, pk)